@@ -6,50 +6,65 @@
 # For license information, see LICENSE.TXT
 
 import re
+import sqlite3
 
-from modmorph import ModMorph
+from modmorph import language_file_path, modmorph_sql
+from utils import sqlite_connect_file_read_only
 
 
 class ModMorphAlphabetter:
-    def __init__(self, language):
+    def __init__(self, language, modmorph=None, language_directory=None):
         """
         Основной класс алфавиттера.
         :param language: код языка алфавиттера
+        :param modmorph: открытый экземпляр ModMorph того же языка, из которого читается алфавит
+            (None - алфавит читается отдельным запросом к файлу модели только для чтения)
+        :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
         """
-        modmorph = ModMorph(language)
-        self.__alphabet = [(alpha_letter["lower"], alpha_letter["upper"])
-                           for alpha_letter in modmorph.get_alpha_letters()]
+        if modmorph is not None:
+            alpha_letters = modmorph.get_alpha_letters()
+        else:
+            conn = sqlite_connect_file_read_only(language_file_path(language, language_directory))
+            conn.row_factory = sqlite3.Row
+            alpha_letters = tuple(dict(row) for row in conn.execute(modmorph_sql["select_alpha_letters"]))
+            conn.close()
+        self.__alphabet = [(alpha_letter["lower"], alpha_letter["upper"]) for alpha_letter in alpha_letters]
         self.__alphabet.append(("-", "-"))
-        modmorph.close()
+        upper_table = {}
+        lower_table = {}
+        for alpha_letter in self.__alphabet:
+            upper_table.setdefault(ord(alpha_letter[1]), alpha_letter[0])
+            lower_table.setdefault(ord(alpha_letter[0]), alpha_letter[1])
+        self.__upper_table = upper_table
+        self.__lower_table = lower_table
+        self.__tokenizer = re.compile(r'([' + "".join(alpha_letter[0] for alpha_letter in self.__alphabet) + ']+)',
+                                      flags=re.IGNORECASE | re.UNICODE)
 
     def upper(self, word):
-        result = []
-        for char in word:
-            found_alpha_letter = None
-            for alpha_letter in self.__alphabet:
-                if alpha_letter[1] == char:
-                    found_alpha_letter = alpha_letter
-                    break
-            if found_alpha_letter is None:
-                result.append(char)
-                continue
-            result.append(found_alpha_letter[0])
-        return "".join(result)
+        return word.translate(self.__upper_table)
 
     def lower(self, word):
-        result = []
-        for char in word:
-            found_alpha_letter = None
-            for alpha_letter in self.__alphabet:
-                if alpha_letter[0] == char:
-                    found_alpha_letter = alpha_letter
-                    break
-            if found_alpha_letter is None:
-                result.append(char)
-                continue
-            result.append(found_alpha_letter[1])
-        return "".join(result)
+        return word.translate(self.__lower_table)
 
     def tokenize(self, text):
-        return re.findall(r'([' + "".join(alpha_letter[0] for alpha_letter in self.__alphabet) + ']+)', text,
-                          flags=re.IGNORECASE | re.UNICODE)
+        return self.__tokenizer.findall(text)
+
+    def tokenize_stream(self, chunks):
+        """
+        Выделяет слова из потока фрагментов текста.
+        Слово, достигающее конца фрагмента, откладывается до следующего фрагмента,
+        поэтому разрезанные границей фрагментов слова не дробятся.
+        :param chunks: итерируемый набор фрагментов текста
+        :return: генератор слов
+        """
+        rest = ""
+        for chunk in chunks:
+            text = rest + chunk
+            rest = ""
+            for match in self.__tokenizer.finditer(text):
+                if match.end() == len(text):
+                    rest = match.group(1)
+                else:
+                    yield match.group(1)
+        if rest:
+            yield rest
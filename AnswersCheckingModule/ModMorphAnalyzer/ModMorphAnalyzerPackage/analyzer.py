@@ -5,25 +5,80 @@
 # URL: <http://modmorph.turklang.net>
 # For license information, see LICENSE.TXT
 
+import itertools
 import os
 import sys
+import time
+import warnings
 
 from alphabetter import ModMorphAlphabetter
+from cache import AnalysisCache
+from instrumentation import Instrumentation
 from modmorph import ModMorph
+from persistent_cache import PersistentAnalysisCache
+from results import AnalysisNode, RecordPool, from_tuples, to_tuples
 from utils import remove_prefix
 
+# Порядок корней ленивого анализа (см. ModMorphAnalyzer.iter_parses)
+RANKINGS = (None, "longest_root")
+# Предел числа запомненных проверок следующего слова (см. __normalize_next_word)
+NEXT_WORD_CANDIDATES_LIMIT = 100000
+
 
 class ModMorphAnalyzer:
-    def __init__(self, language, verbose=False):
+    def __init__(self, language, verbose=False, indexed=False, cache_size=0, cache_memory_limit=None,
+                 load_mode="backup", mmap_size=None, compact=False, persistent_cache=None, modmorph=None,
+                 instrument=False):
         """
         Основной класс морфоанализатора.
         :param language: код языка морфоанализа
         :param verbose: режим вывода промежуточной информации в консоль -
             False (не выводить), True (выводить)
+        :param indexed: режим индекса языковой модели в памяти -
+            False (запросы к базе на каждое слово), True (морфотактика загружается в память при создании)
+        :param cache_size: максимальное число результатов анализа в LRU-кэше (0 - кэш отключён).
+            Закэшированные результаты возвращаются в виде неизменяемых вложенных кортежей
+        :param cache_memory_limit: приблизительный предел памяти кэша в байтах (None - без ограничения)
+        :param load_mode: способ загрузки базы языковой модели - "dump", "backup" или "readonly" (см. ModMorph);
+            "readonly" без indexed=True заметно замедляет анализ и сопровождается предупреждением
+        :param mmap_size: размер отображения файла модели в память для режима "readonly"
+        :param compact: формат деревьев морфоанализа - False (вложенные кортежи и списки),
+            True (кортежи узлов results.AnalysisNode с общими интернированными записями корней и алломорфов;
+            узлы сравниваются по значению; прежний формат получается через results.to_tuples)
+        :param persistent_cache: путь к файлу постоянного кэша результатов анализа между запусками
+            (None - не использовать). Кэш сбрасывается при смене версии языковой модели. Файл открывается одним
+            анализатором в монопольном режиме, анализатор с кэшем используется только в создавшем его потоке
+        :param modmorph: готовый экземпляр ModMorph языка language (None - создаётся анализатором).
+            Переданный экземпляр не закрывается в close(), параметры indexed, load_mode и mmap_size не применяются
+        :param instrument: сбор статистики работы - число вызовов и время запросов ModMorph, время анализа
+            и лемматизации слов и порождения разборов, глубина и ветвление поиска по словам,
+            обработчики замеров (см. stats и add_hook).
+            Без него накладных расходов нет
         """
         self.__verbose = verbose
-        self.__modmorph = ModMorph(language)
-        self.__alphabetter = ModMorphAlphabetter(language)
+        self.__records = RecordPool() if compact else None
+        self.__cache = AnalysisCache(cache_size, cache_memory_limit) if cache_size > 0 else None
+        self.__owns_modmorph = modmorph is None
+        if modmorph is None:
+            if load_mode == "readonly" and not indexed:
+                warnings.warn("load_mode='readonly' without indexed=True runs every query without SQL indexes "
+                              "and makes analysis several times slower (see modmorph.LOAD_MODES)",
+                              RuntimeWarning, stacklevel=2)
+            modmorph = ModMorph(language, indexed=indexed, load_mode=load_mode, mmap_size=mmap_size)
+        self.__modmorph = modmorph
+        self.__alphabetter = ModMorphAlphabetter(language, modmorph=self.__modmorph)
+        self.__persistent_cache = None
+        if persistent_cache is not None:
+            self.__persistent_cache = PersistentAnalysisCache(persistent_cache, self.__modmorph.get_metadata())
+        self.__instrumentation = None
+        self.__search = None
+        self.__next_word_candidates = {}
+        self.__analyze_word = self.__process_word
+        self.__lemmatize = self.__lemmatize_word
+        if instrument:
+            self.__instrumentation = self.__modmorph.instrument(Instrumentation())
+            self.__analyze_word = self.__process_word_instrumented
+            self.__lemmatize = self.__lemmatize_word_instrumented
 
     def __enter__(self):
         return self
@@ -36,7 +91,71 @@ class ModMorphAnalyzer:
         Освобождает занятые анализатором ресурсы
         Применяется в конце работы с анализатором
         """
-        self.__modmorph.close()
+        if self.__persistent_cache is not None:
+            self.__persistent_cache.close()
+        if self.__owns_modmorph:
+            self.__modmorph.close()
+
+    def cache_stats(self):
+        """
+        Возвращает статистику кэша результатов анализа
+        :return: словарь счётчиков (entries, memory, hits, misses, evictions) или None, если кэш отключён
+        """
+        return self.__cache.stats() if self.__cache is not None else None
+
+    def persistent_cache_stats(self):
+        """
+        Возвращает статистику постоянного кэша результатов анализа
+        :return: словарь счётчиков (entries, hits, misses, writes) или None, если кэш не используется
+        """
+        return self.__persistent_cache.stats() if self.__persistent_cache is not None else None
+
+    def stats(self):
+        """
+        Возвращает снимок статистики работы анализатора
+        :return: словарь - calls (число вызовов и время по методам ModMorph и по словам для process_word,
+            lemmatize_word и iter_parses), counters (words, roots, parses, search_branches, search_states_reused),
+            maximums (search_depth),
+            cache и persistent_cache (см. cache_stats и persistent_cache_stats).
+            Без параметра instrument разделы calls, counters и maximums пусты
+        """
+        snapshot = self.__instrumentation.stats() if self.__instrumentation is not None else \
+            {"calls": {}, "counters": {}, "maximums": {}}
+        snapshot["cache"] = self.cache_stats()
+        snapshot["persistent_cache"] = self.persistent_cache_stats()
+        return snapshot
+
+    def reset_stats(self):
+        """
+        Сбрасывает статистику работы анализатора и счётчики кэша
+        """
+        if self.__instrumentation is not None:
+            self.__instrumentation.reset()
+        if self.__cache is not None:
+            self.__cache.reset_stats()
+
+    def add_hook(self, callback):
+        """
+        Подключает обработчик замеров анализа слов. Обработчик вызывается со словарём
+        method (process_word, lemmatize_word или iter_parses), word, next_word, seconds, processed_next_word
+        и счётчиками слова: roots, search_branches, search_states_reused, search_depth для process_word,
+        roots для lemmatize_word, parses для iter_parses
+        :param callback: функция одного аргумента
+        """
+        if self.__instrumentation is None:
+            raise RuntimeError("Hooks require an analyzer created with instrument=True")
+        self.__instrumentation.add_hook(callback)
+
+    def remove_hook(self, callback):
+        if self.__instrumentation is not None:
+            self.__instrumentation.remove_hook(callback)
+
+    def clear_cache(self):
+        """
+        Очищает кэш результатов анализа
+        """
+        if self.__cache is not None:
+            self.__cache.clear()
 
     def process_text(self, text):
         """
@@ -55,57 +174,264 @@ class ModMorphAnalyzer:
     def process_words(self, words):
         """
         Производит морфоаналитическую обработку входного массива слов
-        :param words: Массив слов
+        :param words: Массив слов или итерируемый набор слов (читается по мере обработки)
         :return: Генератор результатов морфоаналитической обработки
             Каждый элемент результатов представляет собой кортеж пары вида
             "Исходное слово/словосочетание", "Дерево морфоанализа"
         """
-        processed_next_word = False
-        for index, word in enumerate(words):
-            if processed_next_word:
-                processed_next_word = False
-                continue
-            word = self.__alphabetter.lower(word)
-            if index < (len(words)-1):
-                next_word = self.__alphabetter.lower(words[index+1])
-                processing_result, processed_next_word = self.__process_word(word, next_word)
-                if processed_next_word:
-                    word += " " + next_word
-            else:
-                processing_result, processed_next_word = self.__process_word(word)
+        words = (self.__alphabetter.lower(word) for word in words)
+        for word, processing_result in merge_words(words, self.__analyze):
             if self.__verbose:
                 print(f"{word} : {processing_result}")
             yield word, processing_result
 
+    def process_stream(self, stream, chunk_size=65536):
+        """
+        Производит потоковую морфоаналитическую обработку текста без загрузки его в память целиком
+        :param stream: Текстовый файловый объект (читается фрагментами) или итерируемый набор фрагментов текста
+        :param chunk_size: размер фрагмента в символах при чтении из файлового объекта
+        :return: Генератор результатов морфоаналитической обработки (см. process_words)
+        """
+        chunks = iter(lambda: stream.read(chunk_size), "") if hasattr(stream, "read") else stream
+        return self.process_words(self.__alphabetter.tokenize_stream(chunks))
+
+    def process_document(self, text):
+        """
+        Производит морфоаналитическую обработку документа с однократным анализом каждой словоформы
+        :param text: Входной текст (UNICODE)
+        :return: Список результатов морфоаналитической обработки в порядке слов текста
+            (см. process_documents)
+        """
+        return self.process_documents([text])[0]
+
+    def process_documents(self, texts):
+        """
+        Производит пакетную морфоаналитическую обработку набора документов.
+        Каждая уникальная пара "слово, следующее слово" анализируется один раз на весь пакет,
+        после чего результаты разворачиваются в исходный порядок слов с тем же объединением
+        двух слов, что и в process_words. Повторяющиеся слова разделяют один объект результата.
+        :param texts: Итерируемый набор входных текстов (UNICODE)
+        :return: Список по документам, каждый элемент - список кортежей пар вида
+            "Исходное слово/словосочетание", "Дерево морфоанализа"
+        """
+        lowered_words = {}
+        processing_results = {}
+
+        def lower(word):
+            lowered_word = lowered_words.get(word)
+            if lowered_word is None:
+                lowered_word = lowered_words[word] = self.__alphabetter.lower(word)
+            return lowered_word
+
+        def analyze(word, next_word=None):
+            key = (word, next_word)
+            processing_result = processing_results.get(key)
+            if processing_result is None:
+                processing_result = processing_results[key] = self.__analyze(word, next_word)
+            return processing_result
+
+        documents_results = []
+        for text in texts:
+            words = [lower(word) for word in self.__alphabetter.tokenize(text)]
+            documents_results.append(list(merge_words(words, analyze)))
+        if self.__verbose:
+            print(f"Got {sum(len(results) for results in documents_results)} results "
+                  f"for {len(processing_results)} unique words")
+        return documents_results
+
     def process_pair(self, pair):
         word = self.__alphabetter.lower(pair[0])
         if pair[1] is not None:
             next_word = self.__alphabetter.lower(pair[1])
-            processing_result, _ = self.__process_word(word, next_word)
+            processing_result, _ = self.__analyze(word, next_word)
         else:
-            processing_result, _ = self.__process_word(word)
+            processing_result, _ = self.__analyze(word)
         if self.__verbose:
             print(f"{word} : {processing_result}")
         yield word, processing_result
 
+    def iter_parses(self, word, next_word=None, max_parses=None, max_depth=None, time_budget=None, ranking=None):
+        """
+        Ленивый морфоанализ слова: разборы порождаются по одному по мере обхода, без построения полного дерева.
+        Разбор - путь от корня до листа дерева process_words; без ограничений разборы идут в порядке обхода
+        дерева в глубину и в совокупности совпадают с его листьями.
+        :param word: слово
+        :param next_word: следующее слово или None
+        :param max_parses: максимальное число разборов (None - без ограничения)
+        :param max_depth: максимальное число морфем после корня в разборе (аффиксы, частица, послелог,
+            вспомогательный глагол); более длинные разборы не строятся (None - без ограничения)
+        :param time_budget: время на слово в секундах, по истечении которого порождение прекращается
+            (None - без ограничения)
+        :param ranking: порядок корней - None (по id, как в process_words), "longest_root" (сначала длинные корни)
+        :return: генератор пар (разбор, флаг обработки следующего слова). Разбор - кортеж кортежей полей узлов
+            без дочерних узлов: корень (id, value, pos, concept_id, concept_name), далее морфемы
+            (id, value, gram_value_id, gram_value)
+        """
+        if ranking not in RANKINGS:
+            raise ValueError(f"Unknown ranking: {ranking}. Expected one of: {', '.join(map(str, RANKINGS))}")
+        word = self.__alphabetter.lower(word)
+        if next_word is not None:
+            next_word = self.__alphabetter.lower(next_word)
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        parses = self.__iter_word_parses(word, next_word, max_depth, deadline, ranking)
+        if max_parses is not None:
+            parses = itertools.islice(parses, max_parses)
+        if self.__instrumentation is not None:
+            parses = self.__iter_parses_instrumented(word, next_word, parses)
+        return parses
+
+    def process_words_lazy(self, words, max_parses=None, max_depth=None, time_budget=None, ranking=None):
+        """
+        Морфоаналитическая обработка массива слов с ограничениями на разбор каждого слова (см. iter_parses).
+        Два слова объединяются, если хотя бы один из построенных разборов обработал следующее слово;
+        без ограничений объединение совпадает с process_words.
+        :param words: Массив слов или итерируемый набор слов (читается по мере обработки)
+        :return: Генератор пар "Исходное слово/словосочетание", список разборов (None, если разборов нет)
+        """
+        def analyze(word, next_word=None):
+            parses = list(self.iter_parses(word, next_word, max_parses, max_depth, time_budget, ranking))
+            return [parse for parse, _ in parses] or None, any(processed for _, processed in parses)
+
+        words = (self.__alphabetter.lower(word) for word in words)
+        yield from merge_words(words, analyze)
+
+    def lemmatize_words(self, words):
+        """
+        Лемматизация массива слов: для каждого слова (словосочетания) определяется только множество значений
+        его корней, без построения дерева морфоанализа. Корень принимается, как только найдена одна полная
+        цепочка аффиксов; следующее слово проверяется только если оно может быть частицей, послелогом или
+        вспомогательным глаголом. Множества корней и объединение двух слов совпадают с process_words.
+        Каждая пара "слово, следующее слово" лемматизируется один раз на вызов.
+        :param words: Массив слов или итерируемый набор слов (читается по мере обработки)
+        :return: Генератор пар "Исходное слово/словосочетание", frozenset значений корней (None, если разборов нет)
+        """
+        words = (self.__alphabetter.lower(word) for word in words)
+        for word, lemmas in merge_words(words, self.__lemmatizer()):
+            yield word, frozenset(lemmas) if lemmas is not None else None
+
+    def lemmatize_documents(self, texts):
+        """
+        Пакетная лемматизация набора документов (см. lemmatize_words, process_documents)
+        :param texts: Итерируемый набор входных текстов (UNICODE)
+        :return: Список по документам, каждый элемент - список пар "Исходное слово/словосочетание",
+            кортеж различных значений корней в порядке дерева морфоанализа (None, если разборов нет)
+        """
+        lowered_words = {}
+
+        def lower(word):
+            lowered_word = lowered_words.get(word)
+            if lowered_word is None:
+                lowered_word = lowered_words[word] = self.__alphabetter.lower(word)
+            return lowered_word
+
+        lemmatize = self.__lemmatizer()
+        return [list(merge_words([lower(word) for word in self.__alphabetter.tokenize(text)], lemmatize))
+                for text in texts]
+
+    def __analyze(self, word, next_word=None):
+        if self.__cache is None and self.__persistent_cache is None:
+            return self.__analyze_word(word, next_word)
+        # Оба кэша используют один ключ, в котором необрабатываемое следующее слово заменено на None;
+        # поэтому записи, сохранённые для слова без контекста (см. persistent_cache.prewarm), находятся в тексте
+        next_word = self.__normalize_next_word(next_word)
+        key = (word, next_word)
+        if self.__cache is not None:
+            cached = self.__cache.get(key)
+            if cached is not None:
+                return cached
+        result = self.__load_persistent(word, next_word)
+        if result is None:
+            result = self.__analyze_word(word, next_word)
+            self.__store_persistent(word, next_word, result)
+        if self.__cache is not None:
+            result = self.__cache.put(key, result)
+        return result
+
+    def __load_persistent(self, word, next_word):
+        if self.__persistent_cache is None:
+            return None
+        result = self.__persistent_cache.get(word, next_word)
+        if result is None or self.__records is None:
+            return result
+        return from_tuples(result[0], self.__records), result[1]
+
+    def __store_persistent(self, word, next_word, result):
+        if self.__persistent_cache is None:
+            return
+        if self.__records is not None:
+            result = (to_tuples(result[0]), result[1])
+        self.__persistent_cache.put(word, next_word, result)
+
+    def __process_word_instrumented(self, word, next_word=None):
+        self.__search = search = [0, 0, 0, 0]
+        started = time.perf_counter()
+        try:
+            result = self.__process_word(word, next_word)
+        finally:
+            self.__search = None
+        seconds = time.perf_counter() - started
+        self.__record_word("process_word", word, next_word, seconds, result[1],
+                           roots=len(result[0]) if result[0] is not None else 0,
+                           search_branches=search[2], search_states_reused=search[3], search_depth=search[1])
+        return result
+
+    def __lemmatize_word_instrumented(self, word, next_word=None):
+        started = time.perf_counter()
+        result = self.__lemmatize_word(word, next_word)
+        seconds = time.perf_counter() - started
+        self.__record_word("lemmatize_word", word, next_word, seconds, result[1],
+                           roots=len(result[0]) if result[0] is not None else 0)
+        return result
+
+    def __iter_parses_instrumented(self, word, next_word, parses):
+        # Учитывается только время порождения разборов, без времени их обработки потребителем;
+        # замер записывается и при досрочном закрытии генератора
+        seconds = 0
+        count = 0
+        processed_next_word = False
+        started = time.perf_counter()
+        try:
+            for parse in parses:
+                seconds += time.perf_counter() - started
+                count += 1
+                processed_next_word = processed_next_word or parse[1]
+                yield parse
+                started = time.perf_counter()
+            seconds += time.perf_counter() - started
+        finally:
+            self.__record_word("iter_parses", word, next_word, seconds, processed_next_word, parses=count)
+
+    def __record_word(self, method, word, next_word, seconds, processed_next_word, **counts):
+        instrumentation = self.__instrumentation
+        instrumentation.record(f"ModMorphAnalyzer.{method}", seconds)
+        instrumentation.increment("words")
+        for name, value in counts.items():
+            if name == "search_depth":
+                instrumentation.maximum(name, value)
+            else:
+                instrumentation.increment(name, value)
+        if instrumentation.has_hooks():
+            event = {"method": method, "word": word, "next_word": next_word, "seconds": seconds,
+                     "processed_next_word": processed_next_word}
+            event.update(counts)
+            instrumentation.notify(event)
+
     def __process_word(self, word, next_word=None):
-        root_candidates = [word[:i] for i in range(1, len(word) + 1)]
-        roots = self.__modmorph.get_root_morphemes_by_values(root_candidates)
+        roots = self.__modmorph.get_root_morphemes_by_word(word)
+        states = {}
         processing_result = []
         processed_next_words = []
         for root in roots:
             if root["type_id"] is None:
                 continue
             if word != root["value_lower"]:
-                root["morph"] = root["value_lower"][:len(root["value_lower"]) - root["strip"]]
+                morph = root["value_lower"][:len(root["value_lower"]) - root["strip"]]
             else:
-                root["morph"] = root["value_lower"]
-            rest = remove_prefix(word, root["morph"])
+                morph = root["value_lower"]
+            rest = remove_prefix(word, morph)
             if rest == "":
-                analytical_result = self.__process_next_word(next_word, root, True)
-                processing_result.append((root["id"], root["value"], root["pos"],  root["concept_id"],
-                                          root["concept_en_name"] + " : " + root["concept_ru_name"],
-                                          analytical_result))
+                analytical_result = self.__process_next_word(next_word, states, root, True)
+                processing_result.append(self.__root_node(root, analytical_result))
                 processed_next_words.append(len(analytical_result) > 0)
                 continue
             else:
@@ -113,15 +439,31 @@ class ModMorphAnalyzer:
                 if len(allomorph_ids) == 0:
                     continue
                 allomorph_results, processed_next_word_temp = \
-                    self.__process_allomorphs(rest, allomorph_ids, first=True, next_word=next_word)
+                    self.__process_allomorphs(rest, allomorph_ids, states, first=True, next_word=next_word)
                 processed_next_words.append(processed_next_word_temp)
                 if len(allomorph_results) == 0:
                     continue
-                processing_result.append((root["id"], root["value"], root["pos"],  root["concept_id"],
-                                          root["concept_en_name"] + " : " + root["concept_ru_name"],
-                                          allomorph_results))
+                processing_result.append(self.__root_node(root, allomorph_results))
         processed_next_word = True in processed_next_words
-        return (processing_result, processed_next_word) if len(processing_result) > 0 else (None, processed_next_word)
+        if len(processing_result) == 0:
+            return None, processed_next_word
+        if self.__records is not None:
+            processing_result = tuple(processing_result)
+        return processing_result, processed_next_word
+
+    def __root_node(self, root, children):
+        if self.__records is None:
+            return (root["id"], root["value"], root["pos"],  root["concept_id"],
+                    root["concept_en_name"] + " : " + root["concept_ru_name"],
+                    children)
+        return AnalysisNode(self.__records.root(root), tuple(children))
+
+    def __morph_node(self, kind, morph, children):
+        if self.__records is None:
+            return (morph["id"], morph["value"],
+                    morph["gram_value_id"], morph["gram_value"],
+                    children)
+        return AnalysisNode(self.__records.morph(kind, morph), tuple(children))
 
     def __get_next_allomorph_ids(self, prev_type, prev_id):
         if prev_type == "type":
@@ -131,7 +473,31 @@ class ModMorphAnalyzer:
         elif prev_type == "particle":
             return self.__modmorph.get_allomorph_ids_by_particle_id(prev_id)
 
-    def __process_allomorphs(self, rest_allomorphs, allomorph_ids, first=False, next_word=None):
+    def __process_allomorphs(self, rest_allomorphs, allomorph_ids, states, first=False, next_word=None):
+        # Разные корни и цепочки алломорфов часто приходят к одному и тому же состоянию
+        # (остаток слова, допустимые алломорфы, следующее слово) - оно разбирается один раз на слово.
+        # Неизменяемые узлы компактного формата разделяются между ветвями, а в формате кортежей со списками
+        # каждая ветвь получает свою копию, чтобы изменение одного разбора не затрагивало другие
+        state = (rest_allomorphs, allomorph_ids, first, next_word)
+        result = states.get(state)
+        search = self.__search
+        if result is None:
+            if search is not None:
+                search[0] += 1
+                search[2] += 1
+                search[1] = max(search[1], search[0])
+            result = states[state] = self.__expand_allomorphs(rest_allomorphs, allomorph_ids, states,
+                                                              first, next_word)
+            if search is not None:
+                search[0] -= 1
+        else:
+            if search is not None:
+                search[3] += 1
+            if self.__records is None:
+                result = copy_result(result[0]), result[1]
+        return result
+
+    def __expand_allomorphs(self, rest_allomorphs, allomorph_ids, states, first, next_word):
         allomorph_candidates = [rest_allomorphs[:i] for i in range(1, len(rest_allomorphs) + 1)]
         if first:
             allomorphs = self.__modmorph.get_allomorphs_by_linked_ids_and_values(allomorph_ids, allomorph_candidates)
@@ -147,27 +513,23 @@ class ModMorphAnalyzer:
             if rest == "":
                 if not allomorph["is_final"]:
                     continue
-                analytical_result = self.__process_next_word(next_word, allomorph)
-                processing_result.append((allomorph["id"], allomorph["value"],
-                                          allomorph["gram_value_id"], allomorph["gram_value"],
-                                          analytical_result))
+                analytical_result = self.__process_next_word(next_word, states, allomorph)
+                processing_result.append(self.__morph_node("allomorph", allomorph, analytical_result))
                 processed_next_words.append(len(analytical_result) > 0)
             else:
                 allomorph_ids = self.__get_next_allomorph_ids("allomorph", allomorph["id"])
                 if len(allomorph_ids) == 0:
                     continue
                 allomorph_results, processed_next_word_temp = \
-                    self.__process_allomorphs(rest, allomorph_ids, next_word=next_word)
+                    self.__process_allomorphs(rest, allomorph_ids, states, next_word=next_word)
                 processed_next_words.append(processed_next_word_temp)
                 if len(allomorph_results) == 0:
                     continue
-                processing_result.append((allomorph["id"], allomorph["value"],
-                                          allomorph["gram_value_id"], allomorph["gram_value"],
-                                          allomorph_results))
+                processing_result.append(self.__morph_node("allomorph", allomorph, allomorph_results))
         processed_next_word = True in processed_next_words
         return processing_result, processed_next_word
 
-    def __process_next_word(self, next_word, prev_allomorph=None, is_root=False):
+    def __process_next_word(self, next_word, states, prev_allomorph=None, is_root=False):
         processing_result = []
         if next_word is None:
             return processing_result
@@ -180,43 +542,303 @@ class ModMorphAnalyzer:
             particle_allomorphs = self.__modmorph.get_particle_allomorphs_by_ids_and_values(particle_allomorph_ids, particle_candidates)
             if len(particle_allomorphs) > 0:
                 for particle in particle_allomorphs:
-                    if next_word != particle["value_lower"]:
-                        particle["morph"] = particle["value_lower"][:len(particle["value_lower"])]
-                    else:
-                        particle["morph"] = particle["value_lower"]
-                    rest = remove_prefix(next_word, particle["morph"])
+                    rest = remove_prefix(next_word, particle["value_lower"])
                     if rest == "":
-                        processing_result.append((particle["id"], particle["value"],
-                                                  particle["gram_value_id"], particle["gram_value"],
-                                                  []))
+                        processing_result.append(self.__morph_node("particle", particle, []))
                     else:
                         allomorph_ids = self.__get_next_allomorph_ids("particle", particle["id"])
                         if len(allomorph_ids) == 0:
                             continue
                         allomorph_results, processed_next_word_temp = \
-                            self.__process_allomorphs(rest, allomorph_ids)
+                            self.__process_allomorphs(rest, allomorph_ids, states)
                         if len(allomorph_results) == 0:
                             continue
-                        processing_result.append((particle["id"], particle["value"],
-                                                  particle["gram_value_id"], particle["gram_value"],
-                                                  allomorph_results))
+                        processing_result.append(self.__morph_node("particle", particle, allomorph_results))
                 return processing_result
         adpositions = self.__modmorph.get_adpositions_by_value(next_word)
         if len(adpositions) > 0:
             adposition = adpositions[0]
-            processing_result.append((adposition["id"], adposition["value"],
-                                      adposition["gram_value_id"], adposition["gram_value"],
-                                      []))
+            processing_result.append(self.__morph_node("adposition", adposition, []))
             return processing_result
         auxilary_verbs = self.__modmorph.get_auxilary_verbs_by_value(next_word)
         if len(auxilary_verbs) > 0:
             auxilary_verb = auxilary_verbs[0]
-            processing_result.append((auxilary_verb["id"], auxilary_verb["value"],
-                                      auxilary_verb["gram_value_id"], auxilary_verb["gram_value"],
-                                      []))
+            processing_result.append(self.__morph_node("auxilary_verb", auxilary_verb, []))
             return processing_result
         return processing_result
 
+    def __iter_word_parses(self, word, next_word, max_depth, deadline, ranking):
+        states = {}
+        roots = []
+        for root in self.__modmorph.get_root_morphemes_by_word(word):
+            if root["type_id"] is None:
+                continue
+            if word != root["value_lower"]:
+                morph = root["value_lower"][:len(root["value_lower"]) - root["strip"]]
+            else:
+                morph = root["value_lower"]
+            roots.append((morph, root))
+        if ranking == "longest_root":
+            roots.sort(key=lambda root: len(root[0]), reverse=True)
+        for morph, root in roots:
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            parse = ((root["id"], root["value"], root["pos"], root["concept_id"],
+                      root["concept_en_name"] + " : " + root["concept_ru_name"]), )
+            rest = remove_prefix(word, morph)
+            if rest == "":
+                yield from self.__iter_next_word_parses(parse, next_word, states, root, True, max_depth, deadline)
+                continue
+            allomorph_ids = self.__get_next_allomorph_ids("type", root["type_id"])
+            if len(allomorph_ids) == 0:
+                continue
+            yield from self.__iter_allomorph_parses(parse, rest, allomorph_ids, states, True, next_word,
+                                                    max_depth, deadline)
+
+    def __iter_allomorph_parses(self, parse, rest_allomorphs, allomorph_ids, states, first, next_word,
+                                max_depth, deadline):
+        if max_depth is not None and len(parse) > max_depth:
+            return
+        if deadline is not None and time.perf_counter() > deadline:
+            return
+        allomorph_candidates = [rest_allomorphs[:i] for i in range(1, len(rest_allomorphs) + 1)]
+        if first:
+            allomorphs = self.__modmorph.get_allomorphs_by_linked_ids_and_values(allomorph_ids, allomorph_candidates)
+        else:
+            allomorphs = self.__modmorph.get_allomorphs_by_ids_and_values(allomorph_ids, allomorph_candidates)
+        for allomorph in allomorphs:
+            if first:
+                rest = remove_prefix(rest_allomorphs, allomorph["morph"])
+            else:
+                rest = remove_prefix(rest_allomorphs, allomorph["value"])
+            allomorph_parse = parse + ((allomorph["id"], allomorph["value"],
+                                        allomorph["gram_value_id"], allomorph["gram_value"]), )
+            if rest == "":
+                if not allomorph["is_final"]:
+                    continue
+                yield from self.__iter_next_word_parses(allomorph_parse, next_word, states, allomorph, False,
+                                                        max_depth, deadline)
+            else:
+                next_allomorph_ids = self.__get_next_allomorph_ids("allomorph", allomorph["id"])
+                if len(next_allomorph_ids) == 0:
+                    continue
+                yield from self.__iter_allomorph_parses(allomorph_parse, rest, next_allomorph_ids, states, False,
+                                                        next_word, max_depth, deadline)
+
+    def __iter_next_word_parses(self, parse, next_word, states, prev_allomorph, is_root, max_depth, deadline):
+        # Разбор без следующего слова допускается, только если следующее слово не разбирается вовсе,
+        # поэтому глубина отсекается по готовым разборам следующего слова, а не при их построении
+        processed_next_word = False
+        for leaf_parse in self.__iter_next_word_leaves(parse, next_word, states, prev_allomorph, is_root, deadline):
+            processed_next_word = True
+            if max_depth is None or len(leaf_parse) - 1 <= max_depth:
+                yield leaf_parse, True
+        if not processed_next_word and (deadline is None or time.perf_counter() <= deadline):
+            yield parse, False
+
+    def __iter_next_word_leaves(self, parse, next_word, states, prev_allomorph, is_root, deadline):
+        # Ленивый аналог __process_next_word: разборы порождаются в том же порядке, время проверяется на каждом шаге
+        if next_word is None:
+            return
+        if deadline is not None and time.perf_counter() > deadline:
+            return
+        if is_root:
+            particle_allomorph_ids = self.__modmorph.get_particle_ids_by_type_id(prev_allomorph["type_id"])
+        else:
+            particle_allomorph_ids = self.__modmorph.get_particle2_ids_by_allomorph1_id(prev_allomorph["id"])
+        particle_candidates = [next_word[:i] for i in range(1, len(next_word) + 1)]
+        particle_allomorphs = self.__modmorph.get_particle_allomorphs_by_ids_and_values(particle_allomorph_ids,
+                                                                                       particle_candidates)
+        if len(particle_allomorphs) > 0:
+            for particle in particle_allomorphs:
+                particle_parse = parse + ((particle["id"], particle["value"],
+                                           particle["gram_value_id"], particle["gram_value"]), )
+                rest = remove_prefix(next_word, particle["value_lower"])
+                if rest == "":
+                    yield particle_parse
+                    continue
+                allomorph_ids = self.__get_next_allomorph_ids("particle", particle["id"])
+                if len(allomorph_ids) == 0:
+                    continue
+                for leaf_parse, _ in self.__iter_allomorph_parses(particle_parse, rest, allomorph_ids, states, False,
+                                                                  None, None, deadline):
+                    yield leaf_parse
+            return
+        adpositions = self.__modmorph.get_adpositions_by_value(next_word)
+        if len(adpositions) > 0:
+            adposition = adpositions[0]
+            yield parse + ((adposition["id"], adposition["value"],
+                            adposition["gram_value_id"], adposition["gram_value"]), )
+            return
+        auxilary_verbs = self.__modmorph.get_auxilary_verbs_by_value(next_word)
+        if len(auxilary_verbs) > 0:
+            auxilary_verb = auxilary_verbs[0]
+            yield parse + ((auxilary_verb["id"], auxilary_verb["value"],
+                            auxilary_verb["gram_value_id"], auxilary_verb["gram_value"]), )
+
+    def __lemmatizer(self):
+        # Множество корней слова не зависит от следующего слова, а следующее слово, которое
+        # не может быть обработано ни после какого разбора, не входит в ключ (см. __normalize_next_word)
+        lemmatized_words = {}
+
+        def lemmatize(word, next_word=None):
+            next_word = self.__normalize_next_word(next_word)
+            key = (word, next_word)
+            result = lemmatized_words.get(key)
+            if result is None:
+                result = lemmatized_words[key] = self.__lemmatize(word, next_word)
+            return result
+
+        return lemmatize
+
+    def __normalize_next_word(self, next_word):
+        # Следующее слово, которое не может быть частицей, послелогом или вспомогательным глаголом,
+        # не меняет результат анализа слова и заменяется на None, чтобы не дробить ключи кэшей
+        if next_word is None:
+            return None
+        is_candidate = self.__next_word_candidates.get(next_word)
+        if is_candidate is None:
+            if len(self.__next_word_candidates) >= NEXT_WORD_CANDIDATES_LIMIT:
+                self.__next_word_candidates.clear()
+            is_candidate = self.__next_word_candidates[next_word] = self.__is_next_word_candidate(next_word)
+        return next_word if is_candidate else None
+
+    def __is_next_word_candidate(self, next_word):
+        particle_candidates = [next_word[:i] for i in range(1, len(next_word) + 1)]
+        return len(self.__modmorph.get_particle_allomorphs_by_values(particle_candidates)) > 0 or \
+            len(self.__modmorph.get_adpositions_by_value(next_word)) > 0 or \
+            len(self.__modmorph.get_auxilary_verbs_by_value(next_word)) > 0
+
+    def __lemmatize_word(self, word, next_word=None):
+        # Для каждого корня достаточно доказать существование одного разбора; пока объединение со следующим
+        # словом не установлено, поиск корня продолжается до разбора, обрабатывающего следующее слово
+        states = {}
+        lemmas = {}
+        processed_next_word = False
+        for root in self.__modmorph.get_root_morphemes_by_word(word):
+            if root["type_id"] is None:
+                continue
+            if word != root["value_lower"]:
+                morph = root["value_lower"][:len(root["value_lower"]) - root["strip"]]
+            else:
+                morph = root["value_lower"]
+            pending_next_word = next_word if not processed_next_word else None
+            rest = remove_prefix(word, morph)
+            if rest == "":
+                lemmas.setdefault(root["value"])
+                if pending_next_word is not None:
+                    processed_next_word = self.__processes_next_word(pending_next_word, states, root, True)
+                continue
+            allomorph_ids = self.__get_next_allomorph_ids("type", root["type_id"])
+            if len(allomorph_ids) == 0:
+                continue
+            found, processed_next_word_temp = \
+                self.__prove_allomorphs(rest, allomorph_ids, states, True, pending_next_word)
+            if found:
+                lemmas.setdefault(root["value"])
+            processed_next_word = processed_next_word or processed_next_word_temp
+        return tuple(lemmas) or None, processed_next_word
+
+    def __prove_allomorphs(self, rest_allomorphs, allomorph_ids, states, first, next_word):
+        # Результат - (есть полный разбор, есть полный разбор с обработкой next_word);
+        # при next_word = None поиск прекращается на первом полном разборе
+        state = (rest_allomorphs, allomorph_ids, first, next_word)
+        result = states.get(state)
+        if result is None:
+            result = states[state] = self.__search_allomorphs(rest_allomorphs, allomorph_ids, states,
+                                                              first, next_word)
+        return result
+
+    def __search_allomorphs(self, rest_allomorphs, allomorph_ids, states, first, next_word):
+        allomorph_candidates = [rest_allomorphs[:i] for i in range(1, len(rest_allomorphs) + 1)]
+        if first:
+            allomorphs = self.__modmorph.get_allomorphs_by_linked_ids_and_values(allomorph_ids, allomorph_candidates)
+        else:
+            allomorphs = self.__modmorph.get_allomorphs_by_ids_and_values(allomorph_ids, allomorph_candidates)
+        found = False
+        for allomorph in allomorphs:
+            if first:
+                rest = remove_prefix(rest_allomorphs, allomorph["morph"])
+            else:
+                rest = remove_prefix(rest_allomorphs, allomorph["value"])
+            if rest == "":
+                if not allomorph["is_final"]:
+                    continue
+                if next_word is None:
+                    return True, False
+                if self.__processes_next_word(next_word, states, allomorph):
+                    return True, True
+                found = True
+            else:
+                next_allomorph_ids = self.__get_next_allomorph_ids("allomorph", allomorph["id"])
+                if len(next_allomorph_ids) == 0:
+                    continue
+                found_temp, processed_next_word = \
+                    self.__prove_allomorphs(rest, next_allomorph_ids, states, False, next_word)
+                if processed_next_word:
+                    return True, True
+                if found_temp and next_word is None:
+                    return True, False
+                found = found or found_temp
+        return found, False
+
+    def __processes_next_word(self, next_word, states, prev_allomorph, is_root=False):
+        # Логический аналог __process_next_word: непустой ли его результат
+        if is_root:
+            particle_allomorph_ids = self.__modmorph.get_particle_ids_by_type_id(prev_allomorph["type_id"])
+        else:
+            particle_allomorph_ids = self.__modmorph.get_particle2_ids_by_allomorph1_id(prev_allomorph["id"])
+        particle_candidates = [next_word[:i] for i in range(1, len(next_word) + 1)]
+        particle_allomorphs = self.__modmorph.get_particle_allomorphs_by_ids_and_values(particle_allomorph_ids,
+                                                                                       particle_candidates)
+        if len(particle_allomorphs) > 0:
+            for particle in particle_allomorphs:
+                rest = remove_prefix(next_word, particle["value_lower"])
+                if rest == "":
+                    return True
+                allomorph_ids = self.__get_next_allomorph_ids("particle", particle["id"])
+                if len(allomorph_ids) == 0:
+                    continue
+                if self.__prove_allomorphs(rest, allomorph_ids, states, False, None)[0]:
+                    return True
+            return False
+        return len(self.__modmorph.get_adpositions_by_value(next_word)) > 0 or \
+            len(self.__modmorph.get_auxilary_verbs_by_value(next_word)) > 0
+
+
+def copy_result(processing_result):
+    """
+    Копирует дерево результата анализа в формате кортежей со списками дочерних узлов
+    :param processing_result: список узлов
+    :return: новый список с новыми узлами на всех уровнях
+    """
+    return [node[:-1] + (copy_result(node[-1]), ) for node in processing_result]
+
+
+def merge_words(words, analyze):
+    """
+    Объединяет слово со следующим, если анализ слова обработал следующее слово
+    (частица, послелог или вспомогательный глагол)
+    :param words: итерируемый набор слов в нижнем регистре
+    :param analyze: функция (слово, следующее слово или None) -> (результат, флаг обработки следующего слова)
+    :return: генератор пар "Исходное слово/словосочетание", результат
+    """
+    words = iter(words)
+    word = next(words, None)
+    while word is not None:
+        next_word = next(words, None)
+        if next_word is None:
+            processing_result, _ = analyze(word)
+            yield word, processing_result
+            break
+        processing_result, processed_next_word = analyze(word, next_word)
+        if processed_next_word:
+            yield word + " " + next_word, processing_result
+            word = next(words, None)
+        else:
+            yield word, processing_result
+            word = next_word
+
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
@@ -224,12 +846,6 @@ if __name__ == '__main__':
         print(f"Usage: {program_name} language")
         exit()
     language = sys.argv[1]
-    input_text = ""
-    while True:
-        try:
-            input_text += input()
-        except EOFError:
-            break
-    morph_analyzer = ModMorphAnalyzer(language)
-    for result in morph_analyzer.process_text(input_text):
-        print(result)
+    with ModMorphAnalyzer(language) as morph_analyzer:
+        for result in morph_analyzer.process_stream(sys.stdin):
+            print(result)
@@ -0,0 +1,197 @@
+# Turkic Morpheme Model Library: Asynchronous Analyzer and Scorer Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import asyncio
+import gc
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.util import Finalize
+
+from registry import check_analyzer_options, preload, sharing_context
+from service import ScoringService
+
+EXECUTORS = ("thread", "process")
+
+_worker_service = None
+
+
+def _init_worker(language, model_path, service_options):
+    global _worker_service
+    _worker_service = ScoringService(language, model_path, workers=1, **service_options)
+    Finalize(_worker_service, _worker_service.close, exitpriority=10)
+
+
+def _call_worker(method_name, *args):
+    return getattr(_worker_service, method_name)(*args)
+
+
+class AsyncScoringService:
+    def __init__(self, language, model_path=None, executor="thread", workers=4, max_concurrency=None,
+                 timeout=None, **analyzer_options):
+        """
+        Асинхронный интерфейс морфоанализатора и оценки ответов для обработчиков asyncio.
+        Работа выполняется в пуле потоков или процессов с заранее созданными анализаторами,
+        так что цикл событий не блокируется анализом.
+        Число одновременно выполняемых запросов ограничено: сверх предела запросы ожидают свободного места
+        (обратное давление), а не накапливаются в очереди пула. Запрос, превысивший время ожидания
+        или отменённый, снимается с очереди пула, если ещё не начал выполняться; начавшийся запрос
+        доводится до конца в фоне и продолжает занимать своё место до завершения.
+        :param language: код языка морфоанализа
+        :param model_path: путь к векторам слов для score и score_batch (None - только process_text)
+        :param executor: "thread" - потоки одного процесса с общим индексом языковой модели (см. ScoringService),
+            "process" - процессы, каждый со своим ScoringService; анализ идёт параллельно на нескольких ядрах,
+            индекс языковой модели строится один раз и наследуется процессами (см. registry.preload)
+        :param workers: число потоков или процессов
+        :param max_concurrency: предел одновременно выполняемых запросов (None - число workers)
+        :param timeout: время ожидания запроса по умолчанию в секундах (None - без ограничения)
+        :param analyzer_options: параметры ScoringService и ModMorphAnalyzer (cache_size, cache_memory_limit,
+            mmap_size); indexed, load_mode и persistent_cache не принимаются (см. ScoringService)
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}. Expected one of: {', '.join(EXECUTORS)}")
+        check_analyzer_options(analyzer_options)
+        self.__workers = workers
+        self.__timeout = timeout
+        self.__max_concurrency = max_concurrency if max_concurrency is not None else workers
+        self.__semaphore = None
+        self.__loop = None
+        self.__service = None
+        if executor == "thread":
+            self.__service = ScoringService(language, model_path, workers=workers, **analyzer_options)
+            self.__executor = ThreadPoolExecutor(workers)
+        else:
+            context = sharing_context()
+            preloaded = context.get_start_method() == "fork"
+            if preloaded:
+                preload([language])
+            self.__executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                                  initargs=(language, model_path, analyzer_options))
+            if preloaded:
+                # Пул с fork запускает все процессы при первой задаче; она отправляется сразу, пока
+                # в основном процессе нет цикла событий и потоков, после чего сборка мусора восстанавливается
+                self.__executor.submit(os.getpid)
+                gc.unfreeze()
+        self.__counters = {"completed": 0, "failed": 0, "timeouts": 0, "cancelled": 0}
+        self.__running = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        """
+        Инициализирует анализаторы всех процессов пула до первого запроса
+        (в режиме потоков анализаторы создаются в конструкторе)
+        """
+        await asyncio.gather(*(self.health() for _ in range(self.__workers)))
+
+    async def close(self):
+        """
+        Дожидается выполняемых запросов, останавливает пул и закрывает анализаторы
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.__executor.shutdown)
+        if self.__service is not None:
+            self.__service.close()
+
+    def stats(self):
+        """
+        :return: счётчики запросов - completed, failed, timeouts, cancelled, running (занятые места)
+        """
+        stats = dict(self.__counters)
+        stats["running"] = self.__running
+        return stats
+
+    async def process_text(self, text, timeout=None):
+        """
+        :return: список результатов морфоаналитической обработки текста (см. ModMorphAnalyzer.process_text)
+        """
+        return await self.__run("process_text", (text, ), timeout)
+
+    async def score(self, reference, answers, timeout=None):
+        """
+        :return: список оценок ответов относительно эталона (см. ScoringService.score)
+        """
+        return await self.__run("score", (reference, list(answers)), timeout)
+
+    async def score_batch(self, references, answers, top_k=1, timeout=None):
+        """
+        :return: список результатов оценки ответов по вопросам (см. ScoringService.score_batch)
+        """
+        return await self.__run("score_batch", (list(references), list(answers), top_k), timeout)
+
+    async def health(self, timeout=None):
+        return await self.__run("health", (), timeout)
+
+    async def __run(self, method_name, args, timeout):
+        if self.__semaphore is None:
+            self.__loop = asyncio.get_running_loop()
+            self.__semaphore = asyncio.Semaphore(self.__max_concurrency)
+        timeout = timeout if timeout is not None else self.__timeout
+        await self.__semaphore.acquire()
+        try:
+            if self.__service is not None:
+                future = self.__executor.submit(getattr(self.__service, method_name), *args)
+            else:
+                future = self.__executor.submit(_call_worker, method_name, *args)
+        except BaseException:
+            self.__semaphore.release()
+            raise
+        self.__running += 1
+        # Место освобождается по фактическому завершению работы в пуле, а не по истечении ожидания
+        future.add_done_callback(self.__release)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.__counters["timeouts"] += 1
+            future.cancel()
+            raise
+        except asyncio.CancelledError:
+            self.__counters["cancelled"] += 1
+            future.cancel()
+            raise
+        except Exception:
+            self.__counters["failed"] += 1
+            raise
+        self.__counters["completed"] += 1
+        return result
+
+    def __release(self, _):
+        try:
+            self.__loop.call_soon_threadsafe(self.__finish)
+        except RuntimeError:
+            # Цикл событий уже закрыт
+            pass
+
+    def __finish(self):
+        self.__running -= 1
+        self.__semaphore.release()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language file [model_file]")
+        exit()
+
+    async def main():
+        model_path = sys.argv[3] if len(sys.argv) > 3 else None
+        with open(sys.argv[2], encoding="utf-8") as input_file:
+            lines = [line for line in input_file if line.strip()]
+        async with AsyncScoringService(sys.argv[1], model_path) as service:
+            if model_path is not None:
+                print(await service.score(lines[0], lines[1:]))
+            else:
+                for results in await asyncio.gather(*(service.process_text(line) for line in lines)):
+                    for result in results:
+                        print(result)
+            print(service.stats())
+
+    asyncio.run(main())
@@ -0,0 +1,332 @@
+# Turkic Morpheme Model Library: Morph Analyzer Benchmark
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from alphabetter import ModMorphAlphabetter
+from analyzer import ModMorphAnalyzer
+from modmorph import ModMorph, language_file_path
+
+FILES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Files")
+BENCHMARK_FILES = ("train_file_CompGraphics.txt", "trainfile.txt", "student_answers.txt")
+BENCHMARK_METHODS = ("process_text", "process_words", "process_pair")
+BENCHMARK_CONFIGURATIONS = {
+    "sql": {},
+    "indexed": {"indexed": True},
+    "indexed_cache": {"indexed": True, "cache_size": 10000},
+}
+SYNTHETIC_LANGUAGE = "SYN"
+
+synthetic_schema = (
+    'CREATE TABLE "alpha_letter" ("id" INTEGER PRIMARY KEY, "lower" TEXT, "upper" TEXT, "ordering" INTEGER)',
+    'CREATE TABLE "morphonological_type" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "name" TEXT, "strip" INTEGER)',
+    'CREATE TABLE "root_morpheme" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "value" TEXT, "value_lower" TEXT, '
+    '"value_strip" TEXT, "pos" TEXT, "type_id" INTEGER REFERENCES "morphonological_type"("id"), '
+    '"concept_id" INTEGER, "concept_en_name" TEXT, "concept_ru_name" TEXT)',
+    'CREATE TABLE "object_concept_taxonomy" ("id" INTEGER PRIMARY KEY, "taxonomical_code" TEXT)',
+    'CREATE TABLE "gram_value" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "tag" TEXT, "ru_name" TEXT, "en_name" TEXT)',
+    'CREATE TABLE "affixal_morpheme" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "value" TEXT, '
+    '"gram_value_id" INTEGER REFERENCES "gram_value"("id"))',
+    'CREATE TABLE "affixal_allomorph" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "value" TEXT, "is_final" INTEGER, '
+    '"affixal_morpheme_id" INTEGER REFERENCES "affixal_morpheme"("id"))',
+    'CREATE TABLE "particle" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "value" TEXT, '
+    '"gram_value_id" INTEGER REFERENCES "gram_value"("id"))',
+    'CREATE TABLE "particle_allomorph" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "value" TEXT, "value_lower" TEXT, '
+    '"particle_id" INTEGER REFERENCES "particle"("id"))',
+    'CREATE TABLE "adposition" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "value" TEXT, '
+    '"gram_value_id" INTEGER REFERENCES "gram_value"("id"))',
+    'CREATE TABLE "auxilary_verb" ("id" INTEGER PRIMARY KEY, "code" INTEGER, "value" TEXT, '
+    '"gram_value_id" INTEGER REFERENCES "gram_value"("id"))',
+    'CREATE TABLE "morphotactics_t2a" ("id" INTEGER PRIMARY KEY, "link_chars" TEXT, '
+    '"morphonological_type_id" INTEGER, "affixal_allomorph_id" INTEGER)',
+    'CREATE TABLE "morphotactics_t2p" ("id" INTEGER PRIMARY KEY, "morphonological_type_id" INTEGER, '
+    '"particle_allomorph_id" INTEGER)',
+    'CREATE TABLE "morphotactics_a2a" ("id" INTEGER PRIMARY KEY, "affixal_allomorph1_id" INTEGER, '
+    '"affixal_allomorph2_id" INTEGER)',
+    'CREATE TABLE "morphotactics_a2p" ("id" INTEGER PRIMARY KEY, "affixal_allomorph1_id" INTEGER, '
+    '"particle_allomorph2_id" INTEGER)',
+    'CREATE TABLE "morphotactics_p2a" ("id" INTEGER PRIMARY KEY, "particle_allomorph1_id" INTEGER, '
+    '"affixal_allomorph2_id" INTEGER)',
+    'CREATE TABLE "metadata" ("language" TEXT, "version" INTEGER, "build" INTEGER, "size" INTEGER)',
+)
+
+SYNTHETIC_ALPHABET = "аәбвгдеёжҗзийклмнңоөпрстуүфхһцчшщъыьэюя"
+SYNTHETIC_SOFT_VOWELS = "әеиөүэ"
+# Грамматическое значение: (тег, алломорфы для твёрдого типа, алломорфы для мягкого типа)
+SYNTHETIC_AFFIXES = (
+    ("PL", ("лар", "нар"), ("ләр", "нәр")),
+    ("POSS_3", ("ы", "сы"), ("е", "се")),
+    ("LOC", ("да", "та", "нда"), ("дә", "тә", "ндә")),
+    ("DAT", ("га", "ка", "на"), ("гә", "кә", "нә")),
+    ("ACC", ("ны", "н"), ("не", "н")),
+    ("GEN", ("ның", ), ("нең", )),
+    ("ABL", ("дан", "тан", "ннан"), ("дән", "тән", "ннән")),
+)
+SYNTHETIC_PARTICLES = (("PTCL_ADD", ("да", "та"), ("дә", "тә")), ("PTCL_LIM", ("гына", "кына"), ("генә", "кенә")))
+SYNTHETIC_ADPOSITIONS = (("POST_INSTR", "белән"), ("POST_BENEF", "өчен"), ("POST_ACCORD", "буенча"),
+                         ("POST_ABOUT", "турында"))
+
+
+def build_synthetic_language(file_path, texts):
+    """
+    Создаёт небольшую синтетическую языковую модель по словам текстов для офлайн-замеров.
+    Корнями становятся словоформы текстов без распознанных окончаний, морфотактика -
+    несколько именных аффиксов и частиц с разбиением на твёрдый и мягкий типы.
+    :param file_path: путь создаваемого файла модели
+    :param texts: тексты, из слов которых выделяются корни
+    """
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    conn = sqlite3.connect(file_path)
+    for create_table in synthetic_schema:
+        conn.execute(create_table)
+    for ordering, letter in enumerate(SYNTHETIC_ALPHABET, start=1):
+        conn.execute('INSERT INTO "alpha_letter" VALUES (?, ?, ?, ?)', (ordering, letter.upper(), letter, ordering))
+    conn.execute('INSERT INTO "morphonological_type" VALUES (1, 1, ?, 0)', ("synthetic hard", ))
+    conn.execute('INSERT INTO "morphonological_type" VALUES (2, 2, ?, 0)', ("synthetic soft", ))
+
+    allomorph_ids = {1: {}, 2: {}}
+    allomorph_id = 0
+    for gram_value_id, (tag, hard, soft) in enumerate(SYNTHETIC_AFFIXES, start=1):
+        conn.execute('INSERT INTO "gram_value" VALUES (?, ?, ?, ?, ?)', (gram_value_id, gram_value_id, tag, tag, tag))
+        conn.execute('INSERT INTO "affixal_morpheme" VALUES (?, ?, ?, ?)',
+                     (gram_value_id, gram_value_id, hard[0], gram_value_id))
+        for type_id, values in ((1, hard), (2, soft)):
+            for value in values:
+                allomorph_id += 1
+                conn.execute('INSERT INTO "affixal_allomorph" VALUES (?, ?, ?, 1, ?)',
+                             (allomorph_id, allomorph_id, value, gram_value_id))
+                conn.execute('INSERT INTO "morphotactics_t2a" ("link_chars", "morphonological_type_id", '
+                             '"affixal_allomorph_id") VALUES (NULL, ?, ?)', (type_id, allomorph_id))
+                allomorph_ids[type_id].setdefault(tag, []).append(allomorph_id)
+    for type_id, tags in allomorph_ids.items():
+        for first_tag, next_tags in (("PL", ("POSS_3", "LOC", "DAT", "ACC", "GEN", "ABL")),
+                                     ("POSS_3", ("LOC", "DAT", "ACC", "GEN", "ABL"))):
+            for allomorph1_id in tags[first_tag]:
+                for next_tag in next_tags:
+                    for allomorph2_id in tags[next_tag]:
+                        conn.execute('INSERT INTO "morphotactics_a2a" ("affixal_allomorph1_id", '
+                                     '"affixal_allomorph2_id") VALUES (?, ?)', (allomorph1_id, allomorph2_id))
+
+    gram_value_id = len(SYNTHETIC_AFFIXES)
+    particle_allomorph_id = 0
+    for particle_id, (tag, hard, soft) in enumerate(SYNTHETIC_PARTICLES, start=1):
+        gram_value_id += 1
+        conn.execute('INSERT INTO "gram_value" VALUES (?, ?, ?, ?, ?)', (gram_value_id, gram_value_id, tag, tag, tag))
+        conn.execute('INSERT INTO "particle" VALUES (?, ?, ?, ?)', (particle_id, particle_id, hard[0], gram_value_id))
+        for type_id, values in ((1, hard), (2, soft)):
+            for value in values:
+                particle_allomorph_id += 1
+                conn.execute('INSERT INTO "particle_allomorph" VALUES (?, ?, ?, ?, ?)',
+                             (particle_allomorph_id, particle_allomorph_id, value, value, particle_id))
+                conn.execute('INSERT INTO "morphotactics_t2p" ("morphonological_type_id", "particle_allomorph_id") '
+                             'VALUES (?, ?)', (type_id, particle_allomorph_id))
+                for ids in allomorph_ids[type_id].values():
+                    for allomorph1_id in ids:
+                        conn.execute('INSERT INTO "morphotactics_a2p" ("affixal_allomorph1_id", '
+                                     '"particle_allomorph2_id") VALUES (?, ?)', (allomorph1_id, particle_allomorph_id))
+    for adposition_id, (tag, value) in enumerate(SYNTHETIC_ADPOSITIONS, start=1):
+        gram_value_id += 1
+        conn.execute('INSERT INTO "gram_value" VALUES (?, ?, ?, ?, ?)', (gram_value_id, gram_value_id, tag, tag, tag))
+        conn.execute('INSERT INTO "adposition" VALUES (?, ?, ?, ?)', (adposition_id, adposition_id, value,
+                                                                      gram_value_id))
+
+    suffixes = sorted({value for _, hard, soft in SYNTHETIC_AFFIXES for value in hard + soft}, key=len, reverse=True)
+    roots = set()
+    for text in texts:
+        for word in text.lower().split():
+            word = "".join(char for char in word if char in SYNTHETIC_ALPHABET)
+            for _ in range(2):
+                suffix = next((suffix for suffix in suffixes
+                               if word.endswith(suffix) and len(word) - len(suffix) >= 3), None)
+                if suffix is None:
+                    break
+                word = word[:-len(suffix)]
+            if len(word) >= 2:
+                roots.add(word)
+    for root_id, root in enumerate(sorted(roots), start=1):
+        type_id = 2 if any(char in SYNTHETIC_SOFT_VOWELS for char in root) else 1
+        conn.execute('INSERT INTO "root_morpheme" VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     (root_id, root_id, root, root, root, "NOUN", type_id, root_id, root, root))
+    conn.execute('INSERT INTO "metadata" VALUES (?, 1, 0, ?)', ("LANGUAGE_SYNTHETIC", len(roots)))
+    conn.commit()
+    conn.close()
+
+
+def read_benchmark_texts(files_directory=FILES_DIRECTORY, file_names=BENCHMARK_FILES):
+    texts = {}
+    for file_name in file_names:
+        with open(os.path.join(files_directory, file_name), encoding="utf-8") as input_file:
+            texts[file_name] = input_file.read()
+    return texts
+
+
+def _percentiles(latencies):
+    if len(latencies) < 2:
+        latency = latencies[0] if latencies else 0.0
+        return {"p50": latency * 1000, "p95": latency * 1000, "p99": latency * 1000}
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": quantiles[49] * 1000, "p95": quantiles[94] * 1000, "p99": quantiles[98] * 1000}
+
+
+def _timed_results(results):
+    latencies = []
+    count = 0
+    started = time.perf_counter()
+    while True:
+        result_started = time.perf_counter()
+        try:
+            next(results)
+        except StopIteration:
+            break
+        latencies.append(time.perf_counter() - result_started)
+        count += 1
+    return count, time.perf_counter() - started, latencies
+
+
+def benchmark_configuration(language, language_directory, configuration, texts):
+    """
+    Замеряет один набор параметров анализатора для каждого метода обработки
+    :param language: код языка модели
+    :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+    :param configuration: параметры ModMorphAnalyzer
+    :param texts: словарь "имя файла" - "текст"
+    :return: словарь с временем загрузки, пиковой памятью процесса и метриками по методам
+    """
+    queries = [0]
+
+    def count_query(_):
+        queries[0] += 1
+
+    methods = {}
+    load_times = []
+    for method in BENCHMARK_METHODS:
+        started = time.perf_counter()
+        modmorph = ModMorph(language, indexed=configuration.get("indexed", False),
+                            load_mode=configuration.get("load_mode", "backup"),
+                            mmap_size=configuration.get("mmap_size"), language_directory=language_directory)
+        analyzer_options = {key: value for key, value in configuration.items()
+                            if key not in ("indexed", "load_mode", "mmap_size")}
+        morph_analyzer = ModMorphAnalyzer(language, modmorph=modmorph, **analyzer_options)
+        load_times.append(time.perf_counter() - started)
+        alphabetter = ModMorphAlphabetter(language, modmorph=modmorph)
+        documents = [alphabetter.tokenize(text) for text in texts.values()]
+        words = sum(len(document) for document in documents)
+        queries[0] = 0
+        modmorph.set_trace_callback(count_query)
+        results = 0
+        seconds = 0.0
+        latencies = []
+        for text, document in zip(texts.values(), documents):
+            if method == "process_text":
+                generator = morph_analyzer.process_text(text)
+            elif method == "process_words":
+                generator = morph_analyzer.process_words(document)
+            else:
+                generator = (result for index, word in enumerate(document)
+                             for result in morph_analyzer.process_pair(
+                                 (word, document[index + 1] if index + 1 < len(document) else None)))
+            count, elapsed, text_latencies = _timed_results(generator)
+            results += count
+            seconds += elapsed
+            latencies.extend(text_latencies)
+        modmorph.set_trace_callback(None)
+        morph_analyzer.close()
+        modmorph.close()
+        methods[method] = {
+            "words": words,
+            "results": results,
+            "seconds": seconds,
+            "words_per_second": words / seconds if seconds > 0 else 0.0,
+            "latency_ms": _percentiles(latencies),
+            "sql_queries": queries[0],
+            "sql_queries_per_word": queries[0] / words if words else 0.0,
+        }
+    return {
+        "load_seconds": min(load_times),
+        "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "methods": methods,
+    }
+
+
+def run_benchmark(language="TAT", configurations=None, synthetic=None, texts=None):
+    """
+    Запускает замеры всех наборов параметров, каждый в отдельном процессе
+    :param language: код языка модели
+    :param configurations: словарь "имя" - "параметры ModMorphAnalyzer" (None - BENCHMARK_CONFIGURATIONS)
+    :param synthetic: использовать синтетическую модель - True, False или None (только при отсутствии файла модели)
+    :param texts: словарь "имя файла" - "текст" (None - тексты из Files)
+    :return: машиночитаемый отчёт
+    """
+    configurations = configurations or BENCHMARK_CONFIGURATIONS
+    texts = texts or read_benchmark_texts()
+    if synthetic is None:
+        synthetic = not os.path.exists(language_file_path(language))
+    report = {
+        "language": SYNTHETIC_LANGUAGE if synthetic else language,
+        "synthetic": synthetic,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "texts": {name: len(text) for name, text in texts.items()},
+        "configurations": {},
+    }
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        language_directory = None
+        if synthetic:
+            language_directory = temporary_directory
+            language = SYNTHETIC_LANGUAGE
+            build_synthetic_language(language_file_path(language, language_directory), texts.values())
+        context = multiprocessing.get_context("spawn")
+        for name, configuration in configurations.items():
+            with context.Pool(1) as pool:
+                report["configurations"][name] = pool.apply(
+                    benchmark_configuration, (language, language_directory, configuration, texts))
+    return report
+
+
+def print_report(report, file=sys.stderr):
+    print(f"language: {report['language']} (synthetic: {report['synthetic']})", file=file)
+    print(f"{'configuration':<16}{'method':<16}{'load, s':>9}{'words/s':>11}{'p50, ms':>9}{'p95, ms':>9}"
+          f"{'p99, ms':>9}{'queries':>10}{'peak, MB':>10}", file=file)
+    for name, configuration in report["configurations"].items():
+        for method, metrics in configuration["methods"].items():
+            latency = metrics["latency_ms"]
+            print(f"{name:<16}{method:<16}{configuration['load_seconds']:>9.3f}{metrics['words_per_second']:>11.0f}"
+                  f"{latency['p50']:>9.3f}{latency['p95']:>9.3f}{latency['p99']:>9.3f}{metrics['sql_queries']:>10}"
+                  f"{configuration['peak_memory_kb'] / 1024:>10.1f}", file=file)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="ModMorphAnalyzer throughput and latency benchmark")
+    parser.add_argument("language", nargs="?", default="TAT")
+    parser.add_argument("--synthetic", action="store_true", help="use a synthetic language database")
+    parser.add_argument("--configurations", default=",".join(BENCHMARK_CONFIGURATIONS),
+                        help="comma-separated subset of: " + ", ".join(BENCHMARK_CONFIGURATIONS))
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    arguments = parser.parse_args()
+    benchmark_report = run_benchmark(
+        arguments.language,
+        {name: BENCHMARK_CONFIGURATIONS[name] for name in arguments.configurations.split(",")},
+        synthetic=True if arguments.synthetic else None)
+    print_report(benchmark_report)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as output_file:
+            json.dump(benchmark_report, output_file, ensure_ascii=False, indent=2)
+    else:
+        json.dump(benchmark_report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
@@ -0,0 +1,107 @@
+# Turkic Morpheme Model Library: Analysis Cache Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+from collections import OrderedDict
+
+# Приблизительный размер записи кэша (ключ, элемент OrderedDict, пара результата) и одного узла дерева в байтах
+ENTRY_SIZE = 400
+NODE_SIZE = 250
+
+
+def freeze(value):
+    """
+    Переводит результат анализа в неизменяемые вложенные кортежи за один проход
+    :return: пара (неизменяемое значение, число узлов - списков и кортежей - для оценки занимаемой памяти)
+    """
+    if isinstance(value, (list, tuple)):
+        nodes = 1
+        items = []
+        for item in value:
+            if isinstance(item, (list, tuple)):
+                item, item_nodes = freeze(item)
+                nodes += item_nodes
+            items.append(item)
+        return tuple(items), nodes
+    return value, 0
+
+
+class AnalysisCache:
+    def __init__(self, max_entries, max_memory=None):
+        """
+        Ограниченный LRU-кэш результатов анализа слов.
+        Результаты хранятся в неизменяемом виде (вложенные кортежи) и разделяются между вызовами.
+        :param max_entries: максимальное число записей
+        :param max_memory: приблизительный предел занимаемой памяти в байтах (None - без ограничения)
+        """
+        self.__max_entries = max_entries
+        self.__max_memory = max_memory
+        self.__entries = OrderedDict()
+        self.__memory = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key):
+        """
+        Возвращает закэшированное значение и отмечает его как недавно использованное
+        :param key: ключ (слово, следующее слово)
+        :return: значение или None, если ключ отсутствует
+        """
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        self.__entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        """
+        Сохраняет значение, вытесняя давно не использованные записи при превышении пределов
+        :param key: ключ (слово, следующее слово)
+        :param value: результат анализа
+        :return: сохранённое неизменяемое значение
+        """
+        # Размер оценивается по числу узлов, посчитанному при переводе в кортежи, без обхода дерева
+        # через sys.getsizeof; узлы results.AnalysisNode разделяют записи и считаются по корням
+        value, nodes = freeze(value)
+        size = ENTRY_SIZE + NODE_SIZE * nodes
+        previous = self.__entries.pop(key, None)
+        if previous is not None:
+            self.__memory -= previous[1]
+        self.__entries[key] = (value, size)
+        self.__memory += size
+        while self.__entries and (len(self.__entries) > self.__max_entries or
+                                  (self.__max_memory is not None and self.__memory > self.__max_memory)):
+            _, (_, evicted_size) = self.__entries.popitem(last=False)
+            self.__memory -= evicted_size
+            self.__evictions += 1
+        return value
+
+    def clear(self):
+        self.__entries.clear()
+        self.__memory = 0
+
+    def stats(self):
+        """
+        :return: словарь счётчиков кэша - entries, memory, hits, misses, evictions
+        """
+        return {
+            "entries": len(self.__entries),
+            "memory": self.__memory,
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "evictions": self.__evictions,
+        }
+
+    def reset_stats(self):
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
@@ -0,0 +1,619 @@
+# Turkic Morpheme Model Library: Compiled Language Model Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+
+from alphabetter import ModMorphAlphabetter
+from analyzer import merge_words
+from modmorph import ModMorphIndex, connect_language_file, language_file_path, modmorph_sql
+from results import AnalysisNode, MorphRecord, RootRecord
+from utils import remove_prefix
+
+MAGIC = b"MMFST\0\0\0"
+FORMAT_VERSION = 2
+# Заголовок: сигнатура, версия формата, число разделов; далее таблица разделов: имя, смещение, число элементов
+HEADER = struct.Struct("<8sII")
+SECTION = struct.Struct("<32sQQ")
+# Разделы, хранящиеся как байты; остальные - массивы int32
+BYTES_SECTIONS = ("meta", "strings")
+# Значение int32 для NULL в таблицах записей
+NULL = -2 ** 31
+
+
+def compiled_file_path(language, language_directory=None):
+    return os.path.splitext(language_file_path(language, language_directory))[0] + ".mmfst"
+
+
+def language_file_fingerprint(file_path):
+    """
+    Отпечаток файла языковой модели, по которому скомпилированная модель связывается с исходным файлом
+    :return: словарь с размером файла и SHA-256 его содержимого
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as language_file:
+        for block in iter(lambda: language_file.read(1024 * 1024), b""):
+            digest.update(block)
+        file_size = language_file.tell()
+    return {"file_size": file_size, "sha256": digest.hexdigest()}
+
+
+class _StringPool:
+    def __init__(self):
+        self.__ids = {}
+        self.__data = bytearray()
+        self.offsets = array("i", [0])
+
+    def add(self, value):
+        if value is None:
+            return -1
+        string_id = self.__ids.get(value)
+        if string_id is None:
+            string_id = self.__ids[value] = len(self.offsets) - 1
+            self.__data += value.encode("utf-8")
+            self.offsets.append(len(self.__data))
+        return string_id
+
+    def tobytes(self):
+        return bytes(self.__data)
+
+
+class _AutomatonBuilder:
+    def __init__(self):
+        """
+        Построитель минимизированного автомата: префиксные деревья наборов строк с выходами (номерами записей)
+        в конечных состояниях сливаются в один ациклический автомат, в котором одинаковые поддеревья
+        (в том числе деревья целых состояний морфотактики с одинаковыми наборами переходов) хранятся один раз
+        """
+        self.edges = []
+        self.accepts = []
+        self.__register = {}
+
+    def add(self, items):
+        """
+        :param items: итерируемый набор пар (непустая строка, выход)
+        :return: номер начального состояния или -1, если набор пуст
+        """
+        trie = {}
+        for string, output in items:
+            if not string:
+                continue
+            node = trie
+            for char in string:
+                node = node.setdefault(char, {})
+            node.setdefault(None, set()).add(output)
+        if not trie:
+            return -1
+        return self.__freeze(trie)
+
+    def __freeze(self, node):
+        edges = tuple(sorted((ord(char), self.__freeze(child)) for char, child in node.items() if char is not None))
+        signature = (tuple(sorted(node.get(None, ()))), edges)
+        state = self.__register.get(signature)
+        if state is None:
+            state = self.__register[signature] = len(self.accepts)
+            self.accepts.append(signature[0])
+            self.edges.append(edges)
+        return state
+
+    def sections(self):
+        edge_start = array("i", [0])
+        edge_char = array("i")
+        edge_target = array("i")
+        accept_start = array("i", [0])
+        accept = array("i")
+        for edges, outputs in zip(self.edges, self.accepts):
+            for char, target in edges:
+                edge_char.append(char)
+                edge_target.append(target)
+            edge_start.append(len(edge_char))
+            accept.extend(outputs)
+            accept_start.append(len(accept))
+        return {"edge_start": edge_start, "edge_char": edge_char, "edge_target": edge_target,
+                "accept_start": accept_start, "accept": accept}
+
+
+def _int(value):
+    return NULL if value is None else value
+
+
+def compile_language(language, output_path=None, language_directory=None):
+    """
+    Компилирует языковую модель в двоичный файл для CompiledAnalyzer.
+    Морфотактика (корни с морфонологическими типами, переходы t2a/a2a/t2p/a2p/p2a с соединительными
+    символами, признаки is_final) переводится в минимизированный конечный автомат: дерево корней по value_strip
+    и для каждого состояния морфотактики (тип, алломорф, частица) - автомат допустимых следующих алломорфов
+    и частиц по их значениям. Записи корней, алломорфов, частиц, послелогов и вспомогательных глаголов
+    хранятся таблицами int32 со ссылками в общий пул строк UTF-8.
+    :param language: код языка модели
+    :param output_path: путь к файлу результата (None - рядом с файлом модели, см. compiled_file_path)
+    :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+    :return: путь к файлу результата
+    """
+    if array("i").itemsize != 4:
+        raise RuntimeError("Compiled models require 32-bit array('i')")
+    output_path = output_path or compiled_file_path(language, language_directory)
+    language_path = language_file_path(language, language_directory)
+    source = language_file_fingerprint(language_path)
+    conn = connect_language_file(language_path, load_mode="readonly")
+    conn.row_factory = sqlite3.Row
+    try:
+        index = ModMorphIndex(conn)
+        roots = [dict(row) for row in conn.execute(modmorph_sql["select_all_root_morphemes"])
+                 if row["type_id"] is not None]
+        row = conn.execute(modmorph_sql["select_metadata"]).fetchone()
+        metadata = {"language": "LANGUAGE_NONE", "version": 0, "build": 0, "size": 0}
+        if row is not None:
+            metadata.update({name: row[name] for name in metadata})
+        alpha_letters = [dict(row) for row in conn.execute(modmorph_sql["select_alpha_letters"])]
+    finally:
+        conn.close()
+
+    strings = _StringPool()
+    automaton = _AutomatonBuilder()
+    sections = {}
+
+    allomorph_ids = sorted(index.allomorphs)
+    allomorph_index = {id: i for i, id in enumerate(allomorph_ids)}
+    particle_ids = sorted(index.particles)
+    particle_index = {id: i for i, id in enumerate(particle_ids)}
+    type_ids = sorted(set(root["type_id"] for root in roots) | set(index.type_allomorphs) |
+                      set(index.type_particles))
+    type_index = {id: i for i, id in enumerate(type_ids)}
+
+    def affix_state(ids):
+        return automaton.add((index.allomorphs[id]["value"], allomorph_index[id])
+                             for id in ids if id in allomorph_index)
+
+    def particle_state(ids):
+        return automaton.add((index.particles[id]["value"], particle_index[id])
+                             for id in ids if id in particle_index)
+
+    # Корни: записи в порядке id, автомат по value_strip
+    roots.sort(key=lambda root: root["id"])
+    table = {name: array("i") for name in ("root_id", "root_value", "root_value_lower", "root_morph", "root_pos",
+                                           "root_concept_id", "root_concept_name", "root_type")}
+    for root in roots:
+        table["root_id"].append(root["id"])
+        table["root_value"].append(strings.add(root["value"]))
+        table["root_value_lower"].append(strings.add(root["value_lower"]))
+        table["root_morph"].append(strings.add(root["value_lower"][:len(root["value_lower"]) - root["strip"]]))
+        table["root_pos"].append(strings.add(root["pos"]))
+        table["root_concept_id"].append(_int(root["concept_id"]))
+        table["root_concept_name"].append(strings.add(root["concept_en_name"] + " : " + root["concept_ru_name"]))
+        table["root_type"].append(type_index[root["type_id"]])
+    sections.update(table)
+    root_state = automaton.add((root["value_strip"], i) for i, root in enumerate(roots))
+
+    # Типы: переходы t2a в порядке morphotactics_t2a. Алломорф после корня совпадает (как в
+    # ModMorph.get_allomorphs_by_linked_ids_and_values), если остаток слова начинается с символов связи и значения,
+    # либо с самого значения, не начинающегося с символов связи
+    table = {name: array("i") for name in ("type_link_start", "type_affix_state", "type_raw_state",
+                                           "type_particle_state", "link_allomorph", "link_morph")}
+    table["type_link_start"].append(0)
+    for type_id in type_ids:
+        links = []
+        for allomorph_id, link_chars in index.type_allomorphs.get(type_id, ()):
+            if allomorph_id not in allomorph_index:
+                continue
+            links.append((allomorph_id, link_chars or ""))
+        for allomorph_id, link in links:
+            table["link_allomorph"].append(allomorph_index[allomorph_id])
+            table["link_morph"].append(strings.add(link + index.allomorphs[allomorph_id]["value"]))
+        table["type_link_start"].append(len(table["link_allomorph"]))
+        table["type_affix_state"].append(automaton.add(
+            (link + index.allomorphs[allomorph_id]["value"], position)
+            for position, (allomorph_id, link) in enumerate(links)))
+        table["type_raw_state"].append(automaton.add(
+            (index.allomorphs[allomorph_id]["value"], position)
+            for position, (allomorph_id, link) in enumerate(links)
+            if link and not index.allomorphs[allomorph_id]["value"].startswith(link)))
+        table["type_particle_state"].append(particle_state(index.type_particles.get(type_id, ())))
+    sections.update(table)
+
+    table = {name: array("i") for name in ("allomorph_id", "allomorph_value", "allomorph_is_final",
+                                           "allomorph_gram_value_id", "allomorph_gram_value",
+                                           "allomorph_affix_state", "allomorph_particle_state")}
+    for allomorph_id in allomorph_ids:
+        allomorph = index.allomorphs[allomorph_id]
+        table["allomorph_id"].append(allomorph_id)
+        table["allomorph_value"].append(strings.add(allomorph["value"]))
+        table["allomorph_is_final"].append(1 if allomorph["is_final"] else 0)
+        table["allomorph_gram_value_id"].append(_int(allomorph["gram_value_id"]))
+        table["allomorph_gram_value"].append(strings.add(allomorph["gram_value"]))
+        table["allomorph_affix_state"].append(affix_state(index.allomorph_allomorphs.get(allomorph_id, ())))
+        table["allomorph_particle_state"].append(particle_state(index.allomorph_particles.get(allomorph_id, ())))
+    sections.update(table)
+
+    table = {name: array("i") for name in ("particle_id", "particle_value", "particle_value_lower",
+                                           "particle_gram_value_id", "particle_gram_value", "particle_affix_state")}
+    for particle_id in particle_ids:
+        particle = index.particles[particle_id]
+        table["particle_id"].append(particle_id)
+        table["particle_value"].append(strings.add(particle["value"]))
+        table["particle_value_lower"].append(strings.add(particle["value_lower"]))
+        table["particle_gram_value_id"].append(_int(particle["gram_value_id"]))
+        table["particle_gram_value"].append(strings.add(particle["gram_value"]))
+        table["particle_affix_state"].append(affix_state(index.particle_allomorphs.get(particle_id, ())))
+    sections.update(table)
+
+    # Послелоги и вспомогательные глаголы: точное совпадение значения, записи в порядке id
+    word_states = []
+    for kind, records in (("adposition", index.adpositions), ("auxilary_verb", index.auxilary_verbs)):
+        records = sorted((record for rows in records.values() for record in rows), key=lambda record: record["id"])
+        table = {name: array("i") for name in (f"{kind}_id", f"{kind}_value", f"{kind}_gram_value_id",
+                                               f"{kind}_gram_value")}
+        for record in records:
+            table[f"{kind}_id"].append(record["id"])
+            table[f"{kind}_value"].append(strings.add(record["value"]))
+            table[f"{kind}_gram_value_id"].append(_int(record["gram_value_id"]))
+            table[f"{kind}_gram_value"].append(strings.add(record["gram_value"]))
+        sections.update(table)
+        word_states.append(automaton.add((record["value"], i) for i, record in enumerate(records)))
+
+    sections["entry_states"] = array("i", [root_state] + word_states)
+    sections.update(automaton.sections())
+    sections["string_offsets"] = strings.offsets
+    sections["strings"] = strings.tobytes()
+    sections["meta"] = json.dumps({"metadata": metadata, "source": source, "alpha_letters": alpha_letters,
+                                   "byteorder": sys.byteorder}, ensure_ascii=False).encode("utf-8")
+    _write_sections(output_path, sections)
+    return output_path
+
+
+def _write_sections(file_path, sections):
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    blobs = []
+    for name, data in sections.items():
+        blob = data if isinstance(data, bytes) else data.tobytes()
+        offset = (offset + 7) & ~7
+        table.append(SECTION.pack(name.encode("ascii"), offset, len(data)))
+        blobs.append((offset, blob))
+        offset += len(blob)
+    directory = os.path.dirname(os.path.abspath(file_path))
+    descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(descriptor, "wb") as output_file:
+            output_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections)))
+            output_file.write(b"".join(table))
+            for offset, blob in blobs:
+                output_file.write(b"\0" * (offset - output_file.tell()))
+                output_file.write(blob)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def load_compiled(language, compiled_path=None, language_directory=None, compact=False):
+    """
+    Открывает скомпилированную модель языка, предварительно компилируя её заново, если файла нет,
+    его формат не поддерживается или он собран из другого файла языковой модели
+    :param language: код языка модели
+    :param compiled_path: путь к скомпилированной модели (None - рядом с файлом модели, см. compiled_file_path)
+    :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+    :param compact: формат деревьев морфоанализа (см. ModMorphAnalyzer)
+    :return: CompiledAnalyzer
+    """
+    language_path = language_file_path(language, language_directory)
+    compiled_path = compiled_path or compiled_file_path(language, language_directory)
+    if os.path.exists(compiled_path):
+        try:
+            return CompiledAnalyzer(compiled_path, compact, language_file=language_path)
+        except ValueError:
+            pass
+    compile_language(language, compiled_path, language_directory)
+    return CompiledAnalyzer(compiled_path, compact, language_file=language_path)
+
+
+class CompiledAnalyzer:
+    def __init__(self, file_path, compact=False, language_file=None):
+        """
+        Морфоанализатор по скомпилированной языковой модели (см. compile_language).
+        Файл отображается в память только для чтения: таблицы и автомат используются на месте без разбора
+        и копирования, поэтому загрузка почти мгновенна, а процессы, открывшие один файл, разделяют его страницы.
+        Корни и алломорфы находятся проходом по символам слова по состояниям автомата; результаты
+        и их порядок совпадают с ModMorphAnalyzer.process_words.
+        :param file_path: путь к скомпилированной модели
+        :param compact: формат деревьев морфоанализа (см. ModMorphAnalyzer)
+        :param language_file: путь к файлу языковой модели, из которого должен быть собран файл (None - без проверки);
+            если размер или содержимое файла модели изменились после компиляции - ValueError (см. load_compiled)
+        """
+        self.__file = open(file_path, "rb")
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__views = [memoryview(self.__mmap)]
+        buffer = self.__views[0]
+        magic, format_version, sections_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported compiled model file: {file_path}")
+        self.__sections = {}
+        for i in range(sections_count):
+            name, offset, count = SECTION.unpack_from(buffer, HEADER.size + i * SECTION.size)
+            name = name.rstrip(b"\0").decode("ascii")
+            if name in BYTES_SECTIONS:
+                view = buffer[offset:offset + count]
+                self.__views.append(view)
+            else:
+                view = buffer[offset:offset + 4 * count]
+                self.__views.append(view)
+                view = view.cast("i")
+                self.__views.append(view)
+            self.__sections[name] = view
+        meta = json.loads(str(self.__sections["meta"], "utf-8"))
+        if meta["byteorder"] != sys.byteorder:
+            self.close()
+            raise ValueError(f"Compiled model byte order mismatch: {meta['byteorder']}")
+        if language_file is not None and not self.__is_compiled_from(meta["source"], language_file):
+            self.close()
+            raise ValueError(f"Compiled model {file_path} is out of date with {language_file}")
+        self.__metadata = meta["metadata"]
+        self.__alpha_letters = tuple(meta["alpha_letters"])
+        self.__alphabetter = ModMorphAlphabetter(self.__metadata["language"], modmorph=self)
+        self.__string_values = [None] * (len(self.__sections["string_offsets"]) - 1)
+        self.__edge_start = self.__sections["edge_start"]
+        self.__edge_char = self.__sections["edge_char"]
+        self.__edge_target = self.__sections["edge_target"]
+        self.__accept_start = self.__sections["accept_start"]
+        self.__accept = self.__sections["accept"]
+        self.__root_state, self.__adposition_state, self.__auxilary_verb_state = self.__sections["entry_states"]
+        self.__compact = compact
+        self.__records = {}
+
+    @staticmethod
+    def __is_compiled_from(source, language_file):
+        if os.path.getsize(language_file) != source["file_size"]:
+            return False
+        return language_file_fingerprint(language_file) == source
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.__mmap is None:
+            return
+        self.__sections = {}
+        self.__edge_start = self.__edge_char = self.__edge_target = self.__accept_start = self.__accept = None
+        for view in reversed(self.__views):
+            view.release()
+        self.__views = []
+        self.__mmap.close()
+        self.__mmap = None
+        self.__file.close()
+
+    def get_metadata(self):
+        return dict(self.__metadata)
+
+    def get_alpha_letters(self):
+        return tuple(dict(alpha_letter) for alpha_letter in self.__alpha_letters)
+
+    def process_text(self, text):
+        """
+        :return: Генератор результатов морфоаналитической обработки текста (см. ModMorphAnalyzer.process_text)
+        """
+        return self.process_words(self.__alphabetter.tokenize(text))
+
+    def process_words(self, words):
+        """
+        :return: Генератор результатов морфоаналитической обработки массива слов
+            (см. ModMorphAnalyzer.process_words)
+        """
+        words = (self.__alphabetter.lower(word) for word in words)
+        return merge_words(words, self.__process_word)
+
+    def process_documents(self, texts):
+        """
+        Пакетная обработка набора документов с однократным анализом каждой пары "слово, следующее слово"
+        :return: Список по документам (см. ModMorphAnalyzer.process_documents)
+        """
+        processing_results = {}
+
+        def analyze(word, next_word=None):
+            key = (word, next_word)
+            processing_result = processing_results.get(key)
+            if processing_result is None:
+                processing_result = processing_results[key] = self.__process_word(word, next_word)
+            return processing_result
+
+        return [list(merge_words((self.__alphabetter.lower(word) for word in self.__alphabetter.tokenize(text)),
+                                 analyze))
+                for text in texts]
+
+    def __string(self, string_id):
+        if string_id < 0:
+            return None
+        value = self.__string_values[string_id]
+        if value is None:
+            offsets = self.__sections["string_offsets"]
+            value = self.__string_values[string_id] = sys.intern(
+                str(self.__sections["strings"][offsets[string_id]:offsets[string_id + 1]], "utf-8"))
+        return value
+
+    def __value(self, kind, field, i):
+        value = self.__sections[f"{kind}_{field}"][i]
+        return None if value == NULL else value
+
+    def __find_prefixes(self, state, text):
+        # Выходы всех состояний, достигнутых проходом по непустым префиксам текста
+        result = []
+        if state < 0:
+            return result
+        edge_start, edge_char, edge_target = self.__edge_start, self.__edge_char, self.__edge_target
+        accept_start = self.__accept_start
+        for char in text:
+            low, high = edge_start[state], edge_start[state + 1]
+            code = ord(char)
+            edge = bisect_left(edge_char, code, low, high)
+            if edge == high or edge_char[edge] != code:
+                break
+            state = edge_target[edge]
+            if accept_start[state] != accept_start[state + 1]:
+                result.extend(self.__accept[accept_start[state]:accept_start[state + 1]])
+        return result
+
+    def __find_exact(self, state, text):
+        if state < 0:
+            return ()
+        edge_start, edge_char, edge_target = self.__edge_start, self.__edge_char, self.__edge_target
+        for char in text:
+            low, high = edge_start[state], edge_start[state + 1]
+            code = ord(char)
+            edge = bisect_left(edge_char, code, low, high)
+            if edge == high or edge_char[edge] != code:
+                return ()
+            state = edge_target[edge]
+        return self.__accept[self.__accept_start[state]:self.__accept_start[state + 1]].tolist()
+
+    def __record(self, kind, i):
+        key = (kind, i)
+        record = self.__records.get(key)
+        if record is None:
+            sections = self.__sections
+            if kind == "root":
+                fields = (sections["root_id"][i], self.__string(sections["root_value"][i]),
+                          self.__string(sections["root_pos"][i]), self.__value("root", "concept_id", i),
+                          self.__string(sections["root_concept_name"][i]))
+                record = RootRecord(*fields) if self.__compact else fields
+            else:
+                fields = (sections[f"{kind}_id"][i], self.__string(sections[f"{kind}_value"][i]),
+                          self.__value(kind, "gram_value_id", i), self.__string(sections[f"{kind}_gram_value"][i]))
+                record = MorphRecord(*fields) if self.__compact else fields
+            self.__records[key] = record
+        return record
+
+    def __node(self, kind, i, children):
+        if self.__compact:
+            return AnalysisNode(self.__record(kind, i), tuple(children))
+        return self.__record(kind, i) + (children, )
+
+    def __process_word(self, word, next_word=None):
+        sections = self.__sections
+        states = {}
+        processing_result = []
+        processed_next_word = False
+        for root in sorted(self.__find_prefixes(self.__root_state, word)):
+            value_lower = self.__string(sections["root_value_lower"][root])
+            morph = value_lower if word == value_lower else self.__string(sections["root_morph"][root])
+            type_index = sections["root_type"][root]
+            rest = remove_prefix(word, morph)
+            if rest == "":
+                analytical_result = self.__process_next_word(next_word, states,
+                                                             sections["type_particle_state"][type_index])
+                processing_result.append(self.__node("root", root, analytical_result))
+                processed_next_word = processed_next_word or len(analytical_result) > 0
+                continue
+            if sections["type_link_start"][type_index] == sections["type_link_start"][type_index + 1]:
+                continue
+            allomorph_results, processed_next_word_temp = \
+                self.__process_allomorphs(rest, type_index, states, True, next_word)
+            processed_next_word = processed_next_word or processed_next_word_temp
+            if len(allomorph_results) == 0:
+                continue
+            processing_result.append(self.__node("root", root, allomorph_results))
+        if len(processing_result) == 0:
+            return None, processed_next_word
+        if self.__compact:
+            processing_result = tuple(processing_result)
+        return processing_result, processed_next_word
+
+    def __process_allomorphs(self, rest_allomorphs, state, states, first, next_word):
+        # Для первого алломорфа state - номер типа, иначе - состояние автомата допустимых алломорфов
+        key = (rest_allomorphs, state, first, next_word)
+        result = states.get(key)
+        if result is None:
+            sections = self.__sections
+            if first:
+                start = sections["type_link_start"][state]
+                positions = set(self.__find_prefixes(sections["type_affix_state"][state], rest_allomorphs))
+                positions.update(self.__find_prefixes(sections["type_raw_state"][state], rest_allomorphs))
+                allomorphs = [(sections["link_allomorph"][start + position],
+                               self.__string(sections["link_morph"][start + position]))
+                              for position in sorted(positions)]
+            else:
+                allomorphs = [(allomorph, self.__string(sections["allomorph_value"][allomorph]))
+                              for allomorph in sorted(self.__find_prefixes(state, rest_allomorphs))]
+            result = states[key] = self.__expand_allomorphs(rest_allomorphs, allomorphs, states, next_word)
+        return result
+
+    def __expand_allomorphs(self, rest_allomorphs, allomorphs, states, next_word):
+        sections = self.__sections
+        processing_result = []
+        processed_next_word = False
+        for allomorph, morph in allomorphs:
+            rest = remove_prefix(rest_allomorphs, morph)
+            if rest == "":
+                if not sections["allomorph_is_final"][allomorph]:
+                    continue
+                analytical_result = self.__process_next_word(next_word, states,
+                                                             sections["allomorph_particle_state"][allomorph])
+                processing_result.append(self.__node("allomorph", allomorph, analytical_result))
+                processed_next_word = processed_next_word or len(analytical_result) > 0
+            else:
+                state = sections["allomorph_affix_state"][allomorph]
+                if state < 0:
+                    continue
+                allomorph_results, processed_next_word_temp = \
+                    self.__process_allomorphs(rest, state, states, False, next_word)
+                processed_next_word = processed_next_word or processed_next_word_temp
+                if len(allomorph_results) == 0:
+                    continue
+                processing_result.append(self.__node("allomorph", allomorph, allomorph_results))
+        return processing_result, processed_next_word
+
+    def __process_next_word(self, next_word, states, particle_state):
+        processing_result = []
+        if next_word is None:
+            return processing_result
+        sections = self.__sections
+        particles = sorted(self.__find_prefixes(particle_state, next_word))
+        if len(particles) > 0:
+            for particle in particles:
+                rest = remove_prefix(next_word, self.__string(sections["particle_value_lower"][particle]))
+                if rest == "":
+                    processing_result.append(self.__node("particle", particle, []))
+                    continue
+                state = sections["particle_affix_state"][particle]
+                if state < 0:
+                    continue
+                allomorph_results, _ = self.__process_allomorphs(rest, state, states, False, None)
+                if len(allomorph_results) == 0:
+                    continue
+                processing_result.append(self.__node("particle", particle, allomorph_results))
+            return processing_result
+        for kind, state in (("adposition", self.__adposition_state), ("auxilary_verb", self.__auxilary_verb_state)):
+            records = self.__find_exact(state, next_word)
+            if len(records) > 0:
+                processing_result.append(self.__node(kind, records[0], []))
+                return processing_result
+        return processing_result
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language [compiled_file]")
+        exit()
+    compiled_path = sys.argv[2] if len(sys.argv) > 2 else None
+    started = time.perf_counter()
+    with load_compiled(sys.argv[1], compiled_path) as compiled_analyzer:
+        print(f"Loaded in {time.perf_counter() - started:.6f} s (compiling the model if it is missing or out of date)",
+              file=sys.stderr)
+        for result in compiled_analyzer.process_text(sys.stdin.read()):
+            print(result)
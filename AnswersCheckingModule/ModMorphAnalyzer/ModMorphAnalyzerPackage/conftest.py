@@ -0,0 +1,36 @@
+# Turkic Morpheme Model Library: Test Fixtures
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import glob
+import os
+
+import pytest
+
+from alphabetter import ModMorphAlphabetter
+
+FILES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Files")
+
+
+@pytest.fixture(scope="session")
+def sample_texts():
+    """
+    :return: тексты примеров из папки Files
+    """
+    texts = []
+    for file_path in sorted(glob.glob(os.path.join(FILES_DIRECTORY, "*.txt"))):
+        with open(file_path, encoding="utf-8") as input_file:
+            texts.append(input_file.read())
+    return texts
+
+
+@pytest.fixture(scope="session")
+def sample_words(sample_texts):
+    """
+    :return: слова текстов примеров, по списку на текст
+    """
+    alphabetter = ModMorphAlphabetter("TAT")
+    return [alphabetter.tokenize(text) for text in sample_texts]
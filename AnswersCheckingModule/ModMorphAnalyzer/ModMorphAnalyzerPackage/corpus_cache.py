@@ -0,0 +1,162 @@
+# Turkic Morpheme Model Library: Lemmatized Corpus Cache Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from analyzer import ModMorphAnalyzer
+from modmorph import ModMorph
+from scoring import split_sentences, lemmatize_sentences, segment_means
+
+# Версия предобработки; увеличивается при изменении split_sentences или lemmatize_sentences
+PREPROCESSING_VERSION = 1
+
+
+class LemmatizedCorpus:
+    def __init__(self, vocabulary, token_ids, offsets):
+        """
+        Компактное представление лемматизированных предложений: словарь лемм,
+        массив номеров лемм всех предложений подряд и границы предложений в нём.
+        Повторно итерируется, поэтому может передаваться в Word2Vec как корпус.
+        :param vocabulary: список лемм
+        :param token_ids: массив int32 номеров лемм в словаре
+        :param offsets: массив int64 длины число предложений + 1; предложение i - token_ids[offsets[i]:offsets[i + 1]]
+        """
+        self.vocabulary = vocabulary
+        self.token_ids = token_ids
+        self.offsets = offsets
+
+    @classmethod
+    def from_sentences(cls, sentences):
+        """
+        :param sentences: итерируемый набор предложений, каждое - список лемм
+        """
+        lemma_ids = {}
+        token_ids = []
+        offsets = [0]
+        for sentence in sentences:
+            for lemma in sentence:
+                lemma_id = lemma_ids.get(lemma)
+                if lemma_id is None:
+                    lemma_id = lemma_ids[lemma] = len(lemma_ids)
+                token_ids.append(lemma_id)
+            offsets.append(len(token_ids))
+        return cls(list(lemma_ids), np.asarray(token_ids, dtype=np.int32), np.asarray(offsets, dtype=np.int64))
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path, allow_pickle=False) as data:
+            return cls(data["vocabulary"].tolist(), data["token_ids"], data["offsets"])
+
+    def save(self, file_path):
+        """
+        Сохраняет корпус в файл npz атомарно (через временный файл в той же папке)
+        """
+        directory = os.path.dirname(os.path.abspath(file_path))
+        descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(descriptor, "wb") as output_file:
+                np.savez(output_file, vocabulary=np.asarray(self.vocabulary, dtype=str),
+                         token_ids=self.token_ids, offsets=self.offsets)
+            os.replace(temporary_path, file_path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        vocabulary = self.vocabulary
+        return [vocabulary[lemma_id] for lemma_id in self.token_ids[self.offsets[index]:self.offsets[index + 1]].tolist()]
+
+    def __iter__(self):
+        vocabulary = self.vocabulary
+        token_ids = self.token_ids.tolist()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield [vocabulary[lemma_id] for lemma_id in token_ids[start:end]]
+
+    def vectors(self, word_vectors):
+        """
+        Средние векторы предложений (как scoring.sentence_vectors) без перевода номеров лемм в строки:
+        словарь корпуса один раз сопоставляется со словарём модели, дальше работа идёт с массивами
+        :param word_vectors: KeyedVectors модели Word2Vec
+        :return: матрица float32 (число предложений x размер вектора)
+        """
+        key_to_index = word_vectors.key_to_index
+        model_ids = np.asarray([key_to_index.get(lemma, -1) for lemma in self.vocabulary], dtype=np.int64)
+        token_model_ids = model_ids[self.token_ids]
+        sentence_ids = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+        known = token_model_ids >= 0
+        return segment_means(word_vectors.vectors, token_model_ids[known], sentence_ids[known], len(self))
+
+
+class CorpusCache:
+    def __init__(self, directory, language, **analyzer_options):
+        """
+        Кэш лемматизированных корпусов на диске. Ключ - хэш содержимого файла корпуса,
+        метаданные языковой модели (language, version, build) и версия предобработки, поэтому при
+        неизменных корпусе и модели морфоанализ не выполняется и анализатор не создаётся.
+        :param directory: папка кэша
+        :param language: код языка морфоанализа
+        :param analyzer_options: параметры ModMorphAnalyzer для лемматизации при отсутствии корпуса в кэше
+        """
+        self.__directory = directory
+        self.__language = language
+        self.__analyzer_options = analyzer_options
+        self.__metadata = None
+        os.makedirs(directory, exist_ok=True)
+
+    def __get_metadata(self):
+        if self.__metadata is None:
+            modmorph = ModMorph(self.__language, load_mode="readonly")
+            try:
+                metadata = modmorph.get_metadata()
+            finally:
+                modmorph.close()
+            self.__metadata = {name: metadata[name] for name in ("language", "version", "build")}
+        return self.__metadata
+
+    def key(self, file_path):
+        digest = hashlib.sha256()
+        digest.update(json.dumps({"metadata": self.__get_metadata(), "preprocessing": PREPROCESSING_VERSION},
+                                 sort_keys=True).encode("utf-8"))
+        with open(file_path, "rb") as input_file:
+            for block in iter(lambda: input_file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_or_build(self, file_path):
+        """
+        Возвращает лемматизированные предложения файла, выполняя морфоанализ только при промахе кэша
+        :param file_path: путь к текстовому файлу корпуса (UTF-8)
+        :return: LemmatizedCorpus
+        """
+        cache_path = os.path.join(self.__directory, f"{self.key(file_path)}.npz")
+        if os.path.exists(cache_path):
+            return LemmatizedCorpus.load(cache_path)
+        with open(file_path, encoding="utf-8") as input_file:
+            text = input_file.read()
+        with ModMorphAnalyzer(self.__language, **self.__analyzer_options) as morph_analyzer:
+            corpus = LemmatizedCorpus.from_sentences(lemmatize_sentences(split_sentences(text), morph_analyzer))
+        corpus.save(cache_path)
+        return corpus
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language cache_directory corpus_file")
+        exit()
+    corpus = CorpusCache(sys.argv[2], sys.argv[1], indexed=True).get_or_build(sys.argv[3])
+    print(f"{len(corpus)} sentences, {len(corpus.token_ids)} lemmas, {len(corpus.vocabulary)} distinct")
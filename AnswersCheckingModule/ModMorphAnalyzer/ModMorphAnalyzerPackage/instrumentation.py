@@ -0,0 +1,88 @@
+# Turkic Morpheme Model Library: Instrumentation Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import functools
+import time
+
+
+class Instrumentation:
+    def __init__(self):
+        """
+        Счётчики вызовов, накопленного времени и произвольных величин с подключаемыми обработчиками событий.
+        Подключается к ModMorph и ModMorphAnalyzer только по запросу, поэтому без неё накладных расходов нет.
+        """
+        self.__calls = {}
+        self.__counters = {}
+        self.__maximums = {}
+        self.__hooks = []
+
+    def wrap(self, name, function):
+        """
+        Оборачивает функцию подсчётом числа вызовов и накопленного времени под именем name
+        """
+        calls = self.__calls
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                call = calls.get(name)
+                if call is None:
+                    calls[name] = [1, elapsed]
+                else:
+                    call[0] += 1
+                    call[1] += elapsed
+        return timed
+
+    def record(self, name, seconds):
+        call = self.__calls.get(name)
+        if call is None:
+            self.__calls[name] = [1, seconds]
+        else:
+            call[0] += 1
+            call[1] += seconds
+
+    def increment(self, name, value=1):
+        self.__counters[name] = self.__counters.get(name, 0) + value
+
+    def maximum(self, name, value):
+        if value > self.__maximums.get(name, value - 1):
+            self.__maximums[name] = value
+
+    def add_hook(self, callback):
+        """
+        Подключает обработчик событий, вызываемый со словарём события (например, замер анализа слова)
+        """
+        self.__hooks.append(callback)
+
+    def remove_hook(self, callback):
+        self.__hooks.remove(callback)
+
+    def has_hooks(self):
+        return len(self.__hooks) > 0
+
+    def notify(self, event):
+        for callback in self.__hooks:
+            callback(event)
+
+    def stats(self):
+        """
+        :return: снимок счётчиков - calls (имя: count, seconds), counters (имя: значение), maximums (имя: значение)
+        """
+        return {
+            "calls": {name: {"count": call[0], "seconds": call[1]} for name, call in self.__calls.items()},
+            "counters": dict(self.__counters),
+            "maximums": dict(self.__maximums),
+        }
+
+    def reset(self):
+        self.__calls.clear()
+        self.__counters.clear()
+        self.__maximums.clear()
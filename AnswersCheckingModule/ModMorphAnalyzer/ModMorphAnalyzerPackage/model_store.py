@@ -0,0 +1,115 @@
+# Turkic Morpheme Model Library: Word Vectors Model Store Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import gensim
+from gensim.models import Word2Vec
+from gensim.utils import SaveLoad
+
+VECTORS_FILE_NAME = "vectors.kv"
+
+# Параметры Word2Vec, не влияющие на содержание модели и не входящие в ключ
+untracked_hyperparameters = ("workers", "callbacks", "compute_loss")
+
+
+def load_word_vectors(file_path):
+    """
+    Загружает векторы слов с отображением массивов в память (mmap='r'), так что процессы,
+    загрузившие один файл, разделяют одну копию векторов в страничном кэше
+    :param file_path: путь к сохранённым KeyedVectors или модели Word2Vec
+    :return: KeyedVectors
+    """
+    loaded = SaveLoad.load(file_path, mmap='r')
+    return loaded.wv if isinstance(loaded, Word2Vec) else loaded
+
+
+def corpus_key(sentences, hyperparameters):
+    """
+    Ключ модели - хэш SHA-256 предобработанного корпуса, параметров обучения и версии gensim
+    :param sentences: итерируемый набор предложений, каждое - список слов
+    :param hyperparameters: словарь параметров Word2Vec
+    :return: шестнадцатеричная строка ключа
+    """
+    digest = hashlib.sha256()
+    tracked = {name: value for name, value in hyperparameters.items() if name not in untracked_hyperparameters}
+    digest.update(json.dumps({"gensim": gensim.__version__, "hyperparameters": tracked},
+                             sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for sentence in sentences:
+        digest.update(b"\n")
+        digest.update("\t".join(sentence).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ModelStore:
+    def __init__(self, directory):
+        """
+        Хранилище обученных векторов слов. Каждая модель лежит в отдельной папке с именем ключа
+        (см. corpus_key), массив векторов сохраняется отдельным файлом для загрузки через mmap.
+        Обучение выполняется только при отсутствии модели для данного корпуса и параметров.
+        :param directory: папка хранилища
+        """
+        self.__directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.__directory, key, VECTORS_FILE_NAME)
+
+    def get(self, key):
+        """
+        :return: KeyedVectors модели с ключом key, загруженные через mmap, или None, если модели нет
+        """
+        file_path = self.path(key)
+        if not os.path.exists(file_path):
+            return None
+        return load_word_vectors(file_path)
+
+    def get_or_train(self, sentences, **hyperparameters):
+        """
+        Возвращает векторы слов для корпуса, обучая Word2Vec только при изменении корпуса или параметров
+        :param sentences: список предложений предобработанного корпуса, каждое - список слов
+        :param hyperparameters: параметры Word2Vec (vector_size, window, min_count, epochs, ...)
+        :return: пара (ключ, KeyedVectors)
+        """
+        key = corpus_key(sentences, hyperparameters)
+        word_vectors = self.get(key)
+        if word_vectors is not None:
+            return key, word_vectors
+        model = Word2Vec(sentences, **hyperparameters)
+        temporary_directory = tempfile.mkdtemp(prefix=f"{key}.", dir=self.__directory)
+        destination = os.path.join(self.__directory, key)
+        try:
+            model.wv.save(os.path.join(temporary_directory, VECTORS_FILE_NAME), separately=["vectors"])
+            os.replace(temporary_directory, destination)
+        except OSError:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+            # Допускается только гонка, в которой модель с тем же ключом уже сохранена другим процессом
+            if not os.path.exists(self.path(key)):
+                raise
+        word_vectors = self.get(key)
+        if word_vectors is None:
+            raise RuntimeError(f"Model {key} is missing from {self.__directory} after saving")
+        return key, word_vectors
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language store_directory corpus_file")
+        exit()
+    from analyzer import ModMorphAnalyzer
+    from scoring import split_sentences, lemmatize_sentences
+    with open(sys.argv[3], encoding="utf-8") as corpus_file, \
+            ModMorphAnalyzer(sys.argv[1], indexed=True) as morph_analyzer:
+        corpus = lemmatize_sentences(split_sentences(corpus_file.read()), morph_analyzer)
+    model_key, model_vectors = ModelStore(sys.argv[2]).get_or_train(corpus, vector_size=50, window=3, min_count=3)
+    print(f"{model_key}: {len(model_vectors.key_to_index)} words")
@@ -7,9 +7,12 @@
 
 import os
 import sqlite3
+import sys
+import time
 
 from config import LANGUAGE_DIRECTORY
-from utils import remove_prefix, sqlite_connect_file_to_memory
+from utils import (json_list, remove_prefix, sqlite_backup_file_to_memory, sqlite_connect_file_read_only,
+                   sqlite_connect_file_to_memory)
 
 modmorph_sql = {
     "select_metadata": """
@@ -32,16 +35,29 @@ modmorph_sql = {
             "morphonological_type"."strip" as "strip" 
         FROM "root_morpheme" 
         INNER JOIN "morphonological_type" ON "root_morpheme"."type_id" = "morphonological_type"."id" 
-        WHERE "root_morpheme"."value_strip" IN (%s)
+        WHERE "root_morpheme"."value_strip" IN (SELECT "value" FROM json_each(?))
+        ORDER BY "root_morpheme"."id"
     """,
-    "select_allomorphs_by_id_and_values": """
+    "select_allomorphs_by_linked_ids_and_values": """
         SELECT "affixal_allomorph"."id" as "id", "affixal_allomorph"."code" as "code", 
             "affixal_allomorph"."value" as "value", "affixal_allomorph"."is_final" as "is_final", 
-            "gram_value"."id" as "gram_value_id", "gram_value"."tag" as "gram_value" 
-        FROM "affixal_allomorph" 
+            "gram_value"."id" as "gram_value_id", "gram_value"."tag" as "gram_value", 
+            "linked"."link" || "affixal_allomorph"."value" as "morph" 
+        FROM (
+            SELECT "key" as "position", json_extract("value", '$[0]') as "id", 
+                ifnull(json_extract("value", '$[1]'), '') as "link" 
+            FROM json_each(?)
+        ) as "linked" 
+        INNER JOIN "affixal_allomorph" ON "affixal_allomorph"."id" = "linked"."id" 
         INNER JOIN "affixal_morpheme" ON "affixal_allomorph"."affixal_morpheme_id" = "affixal_morpheme"."id" 
         INNER JOIN "gram_value" ON "affixal_morpheme"."gram_value_id" = "gram_value"."id" 
-        WHERE "affixal_allomorph"."id" = %s AND "affixal_allomorph"."value" IN (%s)
+        WHERE "affixal_allomorph"."value" IN (
+            SELECT CASE WHEN substr("candidate"."value", 1, length("linked"."link")) = "linked"."link" 
+                THEN substr("candidate"."value", length("linked"."link") + 1) 
+                ELSE "candidate"."value" END 
+            FROM json_each(?) as "candidate"
+        )
+        ORDER BY "linked"."position"
     """,
     "select_allomorphs_by_ids_and_values": """
         SELECT "affixal_allomorph"."id" as "id", "affixal_allomorph"."code" as "code", 
@@ -50,7 +66,9 @@ modmorph_sql = {
         FROM "affixal_allomorph" 
         INNER JOIN "affixal_morpheme" ON "affixal_allomorph"."affixal_morpheme_id" = "affixal_morpheme"."id" 
         INNER JOIN "gram_value" ON "affixal_morpheme"."gram_value_id" = "gram_value"."id" 
-        WHERE "affixal_allomorph"."id" IN (%s) AND "affixal_allomorph"."value" IN (%s)
+        WHERE "affixal_allomorph"."id" IN (SELECT "value" FROM json_each(?)) 
+            AND "affixal_allomorph"."value" IN (SELECT "value" FROM json_each(?))
+        ORDER BY "affixal_allomorph"."id"
     """,
     "select_particle_allomorphs_by_ids_and_values": """
         SELECT "particle_allomorph"."id" as "id", "particle_allomorph"."code" as "code", 
@@ -59,7 +77,19 @@ modmorph_sql = {
         FROM "particle_allomorph" 
         INNER JOIN "particle" ON "particle_allomorph"."particle_id" = "particle"."id" 
         INNER JOIN "gram_value" ON "particle"."gram_value_id" = "gram_value"."id" 
-        WHERE "particle_allomorph"."id" IN (%s) AND "particle_allomorph"."value" IN (%s)
+        WHERE "particle_allomorph"."id" IN (SELECT "value" FROM json_each(?)) 
+            AND "particle_allomorph"."value" IN (SELECT "value" FROM json_each(?))
+        ORDER BY "particle_allomorph"."id"
+    """,
+    "select_particle_allomorphs_by_values": """
+        SELECT "particle_allomorph"."id" as "id", "particle_allomorph"."code" as "code", 
+            "particle_allomorph"."value" as "value", "particle_allomorph"."value_lower" as "value_lower", 
+            "gram_value"."id" as "gram_value_id", "gram_value"."tag" as "gram_value" 
+        FROM "particle_allomorph" 
+        INNER JOIN "particle" ON "particle_allomorph"."particle_id" = "particle"."id" 
+        INNER JOIN "gram_value" ON "particle"."gram_value_id" = "gram_value"."id" 
+        WHERE "particle_allomorph"."value" IN (SELECT "value" FROM json_each(?))
+        ORDER BY "particle_allomorph"."id"
     """,
     "select_adpositions_by_value": """
         SELECT "adposition"."id" as "id", "adposition"."code" as "code", 
@@ -68,6 +98,7 @@ modmorph_sql = {
         FROM "adposition" 
         INNER JOIN "gram_value" ON "adposition"."gram_value_id" = "gram_value"."id" 
         WHERE "adposition"."value" = ?
+        ORDER BY "adposition"."id"
     """,
     "select_auxilary_verbs_by_value": """
         SELECT "auxilary_verb"."id" as "id", "auxilary_verb"."code" as "code", 
@@ -76,31 +107,37 @@ modmorph_sql = {
         FROM "auxilary_verb" 
         INNER JOIN "gram_value" ON "auxilary_verb"."gram_value_id" = "gram_value"."id" 
         WHERE "auxilary_verb"."value" = ?
+        ORDER BY "auxilary_verb"."id"
     """,
     "select_allomorph_ids_by_type_id": """
         SELECT "affixal_allomorph_id", "link_chars" 
         FROM "morphotactics_t2a" 
         WHERE "morphonological_type_id" = ?
+        ORDER BY "id"
     """,
     "select_allomorph2_ids_by_allomorph1_id": """
         SELECT "affixal_allomorph2_id" 
         FROM "morphotactics_a2a" 
         WHERE "affixal_allomorph1_id" = ?
+        ORDER BY "id"
     """,
     "select_allomorph_ids_by_particle_id": """
         SELECT "affixal_allomorph2_id" 
         FROM "morphotactics_p2a" 
         WHERE "particle_allomorph1_id" = ?
+        ORDER BY "id"
     """,
     "select_particle_ids_by_type_id": """
         SELECT "particle_allomorph_id" 
         FROM "morphotactics_t2p" 
         WHERE "morphonological_type_id" = ?
+        ORDER BY "id"
     """,
     "select_particle2_ids_by_allomorph1_id": """
         SELECT "particle_allomorph2_id" 
         FROM "morphotactics_a2p" 
         WHERE "affixal_allomorph1_id" = ?
+        ORDER BY "id"
     """,
     "select_root_morphemes_by_concept_id": """
         SELECT "root_morpheme"."id" as "id", "root_morpheme"."code" as "code", 
@@ -167,18 +204,276 @@ modmorph_sql = {
         INNER JOIN "gram_value" ON "auxilary_verb"."gram_value_id" = "gram_value"."id" 
         WHERE "gram_value"."id" = ?
     """,
+    "select_all_root_morphemes": """
+        SELECT "root_morpheme"."id" as "id", "root_morpheme"."code" as "code", 
+            "root_morpheme"."value" as "value", "root_morpheme"."value_lower" as "value_lower", 
+            "root_morpheme"."value_strip" as "value_strip", 
+            "root_morpheme"."pos" as "pos", "root_morpheme"."type_id" as "type_id", 
+            "root_morpheme"."concept_id" as "concept_id", 
+            "root_morpheme"."concept_en_name" as "concept_en_name", 
+            "root_morpheme"."concept_ru_name" as "concept_ru_name", 
+            "morphonological_type"."strip" as "strip" 
+        FROM "root_morpheme" 
+        INNER JOIN "morphonological_type" ON "root_morpheme"."type_id" = "morphonological_type"."id" 
+        ORDER BY "root_morpheme"."id"
+    """,
+    "select_all_morphotactics_t2a": """
+        SELECT "morphonological_type_id", "affixal_allomorph_id", "link_chars" 
+        FROM "morphotactics_t2a" 
+        ORDER BY "id"
+    """,
+    "select_all_morphotactics_a2a": """
+        SELECT "affixal_allomorph1_id", "affixal_allomorph2_id" 
+        FROM "morphotactics_a2a" 
+        ORDER BY "id"
+    """,
+    "select_all_morphotactics_p2a": """
+        SELECT "particle_allomorph1_id", "affixal_allomorph2_id" 
+        FROM "morphotactics_p2a" 
+        ORDER BY "id"
+    """,
+    "select_all_morphotactics_t2p": """
+        SELECT "morphonological_type_id", "particle_allomorph_id" 
+        FROM "morphotactics_t2p" 
+        ORDER BY "id"
+    """,
+    "select_all_morphotactics_a2p": """
+        SELECT "affixal_allomorph1_id", "particle_allomorph2_id" 
+        FROM "morphotactics_a2p" 
+        ORDER BY "id"
+    """,
+    "select_all_allomorphs": """
+        SELECT "affixal_allomorph"."id" as "id", "affixal_allomorph"."code" as "code", 
+            "affixal_allomorph"."value" as "value", "affixal_allomorph"."is_final" as "is_final", 
+            "gram_value"."id" as "gram_value_id", "gram_value"."tag" as "gram_value" 
+        FROM "affixal_allomorph" 
+        INNER JOIN "affixal_morpheme" ON "affixal_allomorph"."affixal_morpheme_id" = "affixal_morpheme"."id" 
+        INNER JOIN "gram_value" ON "affixal_morpheme"."gram_value_id" = "gram_value"."id" 
+        ORDER BY "affixal_allomorph"."id"
+    """,
+    "select_all_particle_allomorphs": """
+        SELECT "particle_allomorph"."id" as "id", "particle_allomorph"."code" as "code", 
+            "particle_allomorph"."value" as "value", "particle_allomorph"."value_lower" as "value_lower", 
+            "gram_value"."id" as "gram_value_id", "gram_value"."tag" as "gram_value" 
+        FROM "particle_allomorph" 
+        INNER JOIN "particle" ON "particle_allomorph"."particle_id" = "particle"."id" 
+        INNER JOIN "gram_value" ON "particle"."gram_value_id" = "gram_value"."id" 
+        ORDER BY "particle_allomorph"."id"
+    """,
+    "select_all_adpositions": """
+        SELECT "adposition"."id" as "id", "adposition"."code" as "code", 
+            "adposition"."value" as "value",
+            "gram_value"."id" as "gram_value_id", "gram_value"."tag" as "gram_value" 
+        FROM "adposition" 
+        INNER JOIN "gram_value" ON "adposition"."gram_value_id" = "gram_value"."id" 
+        ORDER BY "adposition"."id"
+    """,
+    "select_all_auxilary_verbs": """
+        SELECT "auxilary_verb"."id" as "id", "auxilary_verb"."code" as "code", 
+            "auxilary_verb"."value" as "value",
+            "gram_value"."id" as "gram_value_id", "gram_value"."tag" as "gram_value" 
+        FROM "auxilary_verb" 
+        INNER JOIN "gram_value" ON "auxilary_verb"."gram_value_id" = "gram_value"."id" 
+        ORDER BY "auxilary_verb"."id"
+    """,
 }
 
+modmorph_indexes = (
+    'CREATE INDEX IF NOT EXISTS "root_morpheme_value_strip_idx" ON "root_morpheme" ("value_strip")',
+    'CREATE INDEX IF NOT EXISTS "root_morpheme_concept_id_idx" ON "root_morpheme" ("concept_id")',
+    'CREATE INDEX IF NOT EXISTS "morphotactics_t2a_type_idx" ON "morphotactics_t2a" ("morphonological_type_id")',
+    'CREATE INDEX IF NOT EXISTS "morphotactics_t2p_type_idx" ON "morphotactics_t2p" ("morphonological_type_id")',
+    'CREATE INDEX IF NOT EXISTS "morphotactics_a2a_allomorph1_idx" ON "morphotactics_a2a" ("affixal_allomorph1_id")',
+    'CREATE INDEX IF NOT EXISTS "morphotactics_a2p_allomorph1_idx" ON "morphotactics_a2p" ("affixal_allomorph1_id")',
+    'CREATE INDEX IF NOT EXISTS "morphotactics_p2a_particle1_idx" ON "morphotactics_p2a" ("particle_allomorph1_id")',
+    'CREATE INDEX IF NOT EXISTS "adposition_value_idx" ON "adposition" ("value")',
+    'CREATE INDEX IF NOT EXISTS "auxilary_verb_value_idx" ON "auxilary_verb" ("value")',
+)
+
+
+def _group_rows(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[0], []).append(row[1:] if len(row) > 2 else row[1])
+    return {key: tuple(values) for key, values in groups.items()}
+
+
+class RootTrie:
+    def __init__(self, roots):
+        """
+        Префиксное дерево корневых морфем по полю value_strip.
+        Узел - словарь переходов по символам, записи корней хранятся под ключом None.
+        :param roots: записи корней (словари с ключом value_strip)
+        """
+        self.__root = {}
+        for root in roots:
+            node = self.__root
+            for char in root.pop("value_strip") or "":
+                node = node.setdefault(char, {})
+            node.setdefault(None, []).append(root)
+        self.__freeze(self.__root)
+
+    def __freeze(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, value in node.items():
+                if key is None:
+                    node[None] = tuple(value)
+                else:
+                    stack.append(value)
+
+    def records(self):
+        """
+        :return: генератор всех записей корней дерева (в порядке обхода, не по id)
+        """
+        stack = [self.__root]
+        while stack:
+            node = stack.pop()
+            for key, value in node.items():
+                if key is None:
+                    yield from value
+                else:
+                    stack.append(value)
+
+    def find_prefixes(self, word):
+        """
+        Находит корни, значения которых являются непустыми префиксами слова, за один проход по символам.
+        :param word: слово
+        :return: кортеж записей корней в порядке возрастания id
+        """
+        result = []
+        node = self.__root
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                break
+            result.extend(node.get(None, ()))
+        result.sort(key=lambda root: root["id"])
+        return tuple(result)
+
+
+class ModMorphIndex:
+    def __init__(self, conn):
+        """
+        Индекс морфотактики и служебных словарей языковой модели в памяти.
+        Загружает таблицы один раз, после чего геттеры ModMorph обслуживаются без SQL-запросов.
+        :param conn: соединение с базой языковой модели (row_factory = sqlite3.Row)
+        """
+        cur = conn.cursor()
+        self.roots = RootTrie(dict(row) for row in cur.execute(modmorph_sql["select_all_root_morphemes"]))
+        self.type_allomorphs = _group_rows(
+            tuple(row) for row in cur.execute(modmorph_sql["select_all_morphotactics_t2a"]))
+        self.allomorph_allomorphs = _group_rows(
+            tuple(row) for row in cur.execute(modmorph_sql["select_all_morphotactics_a2a"]))
+        self.particle_allomorphs = _group_rows(
+            tuple(row) for row in cur.execute(modmorph_sql["select_all_morphotactics_p2a"]))
+        self.type_particles = _group_rows(
+            tuple(row) for row in cur.execute(modmorph_sql["select_all_morphotactics_t2p"]))
+        self.allomorph_particles = _group_rows(
+            tuple(row) for row in cur.execute(modmorph_sql["select_all_morphotactics_a2p"]))
+        self.allomorphs = {row["id"]: dict(row) for row in cur.execute(modmorph_sql["select_all_allomorphs"])}
+        self.particles = {row["id"]: dict(row)
+                          for row in cur.execute(modmorph_sql["select_all_particle_allomorphs"])}
+        self.adpositions = _group_rows(
+            (row["value"], dict(row)) for row in cur.execute(modmorph_sql["select_all_adpositions"]))
+        self.auxilary_verbs = _group_rows(
+            (row["value"], dict(row)) for row in cur.execute(modmorph_sql["select_all_auxilary_verbs"]))
+        cur.close()
+
+    @staticmethod
+    def select_by_ids_and_values(records, ids, values):
+        values = set(values)
+        result = []
+        for id in sorted(set(ids)):
+            record = records.get(id)
+            if record is not None and record["value"] in values:
+                result.append(record)
+        return tuple(result)
+
+
+# Способы загрузки базы модели. "dump" и "backup" копируют базу в память и создают индексы modmorph_indexes;
+# "readonly" открывает файл без копии и без изменения, поэтому индексов нет: загрузка почти мгновенна,
+# но SQL-запросы анализа выполняются полным просмотром таблиц и анализ в несколько раз медленнее.
+# В режиме "readonly" следует использовать индекс в памяти (indexed=True или общий индекс registry)
+LOAD_MODES = ("dump", "backup", "readonly")
+
+
+def language_file_path(language, language_directory=None):
+    return os.path.join(language_directory or LANGUAGE_DIRECTORY, f"modmorph_{language}.sqlite")
+
+
+def connect_language_file(file_path, load_mode="backup", mmap_size=None):
+    if load_mode == "dump":
+        return sqlite_connect_file_to_memory(file_path)
+    if load_mode == "backup":
+        return sqlite_backup_file_to_memory(file_path)
+    if load_mode == "readonly":
+        return sqlite_connect_file_read_only(file_path, immutable=True, mmap_size=mmap_size)
+    raise ValueError(f"Unknown load mode: {load_mode}. Expected one of: {', '.join(LOAD_MODES)}")
+
 
 class ModMorph:
-    def __init__(self, language):
-        self.__conn = sqlite_connect_file_to_memory(os.path.join(LANGUAGE_DIRECTORY, f"modmorph_{language}.sqlite"))
+    def __init__(self, language, indexed=False, load_mode="backup", mmap_size=None, language_directory=None,
+                 index=None):
+        """
+        Класс доступа к языковой модели.
+        :param language: код языка модели
+        :param indexed: режим индекса в памяти - False (все геттеры выполняют SQL-запросы),
+            True (морфотактика, алломорфы и служебные словари загружаются в память при создании)
+        :param load_mode: способ загрузки базы модели - "dump" (копия в памяти через iterdump),
+            "backup" (копия в памяти через online backup API), "readonly" (файл открывается только для чтения,
+            без индексов SQL - для анализа только вместе с indexed=True или index, см. LOAD_MODES)
+        :param mmap_size: размер отображения файла в память в байтах для режима "readonly" (None - по умолчанию SQLite)
+        :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+        :param index: готовый ModMorphIndex того же языка (см. registry), разделяемый с другими экземплярами
+            только для чтения; при нём indexed не применяется.
+            С индексом геттеры возвращают общие записи индекса без копирования - изменять их нельзя
+        """
+        self.__conn = connect_language_file(language_file_path(language, language_directory), load_mode, mmap_size)
+        if load_mode != "readonly":
+            for create_index in modmorph_indexes:
+                self.__conn.execute(create_index)
+            self.__conn.commit()
         self.__conn.row_factory = sqlite3.Row
         self.__cur = self.__conn.cursor()
+        if index is None and indexed:
+            index = ModMorphIndex(self.__conn)
+        self.__index = index
+        self.__instrumentation = None
 
     def close(self):
         self.__conn.close()
 
+    def instrument(self, instrumentation):
+        """
+        Подключает подсчёт числа вызовов и накопленного времени всех геттеров get_*.
+        Геттеры не вызывают друг друга (общие запросы вынесены в закрытые методы), поэтому время каждого вызова
+        учитывается один раз и сумма времени геттеров не превышает времени работы с моделью.
+        Без подключения геттеры не несут накладных расходов
+        :param instrumentation: экземпляр instrumentation.Instrumentation
+        :return: подключённый экземпляр (ранее подключённый, если он уже был)
+        """
+        if self.__instrumentation is not None:
+            return self.__instrumentation
+        self.__instrumentation = instrumentation
+        for name in dir(self):
+            if name.startswith("get_"):
+                setattr(self, name, instrumentation.wrap(f"ModMorph.{name}", getattr(self, name)))
+        return instrumentation
+
+    def stats(self):
+        """
+        :return: снимок счётчиков геттеров (см. Instrumentation.stats) или None, если подсчёт не подключён
+        """
+        return self.__instrumentation.stats() if self.__instrumentation is not None else None
+
+    def set_trace_callback(self, callback):
+        """
+        Устанавливает функцию, вызываемую с текстом каждого выполняемого SQL-запроса (None - отключить)
+        """
+        self.__conn.set_trace_callback(callback)
+
     def get_metadata(self):
         metadata = {
             "language": "LANGUAGE_NONE",
@@ -200,12 +495,20 @@ class ModMorph:
         self.__cur.execute(modmorph_sql["select_alpha_letters"])
         return tuple(dict(row) for row in self.__cur.fetchall())
 
+    def explain_query(self, query_name, parameters=()):
+        self.__cur.execute("EXPLAIN QUERY PLAN " + modmorph_sql[query_name], parameters)
+        return tuple(row["detail"] for row in self.__cur.fetchall())
+
     def get_root_morphemes_by_values(self, values):
-        escaped_values = []
-        for value in values:
-            escaped_values.append(value.replace(r"'", r"''"))
-        self.__cur.execute(modmorph_sql["select_root_morphemes_by_values"]
-                           % ", ".join(f"'{value}'" for value in escaped_values))
+        return self.__select_root_morphemes_by_values(values)
+
+    def get_root_morphemes_by_word(self, word):
+        if self.__index is not None:
+            return self.__index.roots.find_prefixes(word)
+        return self.__select_root_morphemes_by_values([word[:i] for i in range(1, len(word) + 1)])
+
+    def __select_root_morphemes_by_values(self, values):
+        self.__cur.execute(modmorph_sql["select_root_morphemes_by_values"], (json_list(values), ))
         return tuple(dict(row) for row in self.__cur.fetchall())
 
     def get_object_concept_taxonomical_code_by_id(self, object_concept_id):
@@ -216,63 +519,87 @@ class ModMorph:
         return concept["taxonomical_code"]
 
     def get_allomorphs_by_linked_ids_and_values(self, linked_ids, values):
+        if self.__index is not None:
+            return self.__get_indexed_allomorphs_by_linked_ids_and_values(linked_ids, values)
+        self.__cur.execute(modmorph_sql["select_allomorphs_by_linked_ids_and_values"],
+                           (json_list(linked_ids), json_list(values)))
+        return tuple(dict(row) for row in self.__cur.fetchall())
+
+    def __get_indexed_allomorphs_by_linked_ids_and_values(self, linked_ids, values):
         result = []
+        values_by_link = {}
         for linked_id in linked_ids:
-            id = linked_id[0]
+            allomorph = self.__index.allomorphs.get(linked_id[0])
+            if allomorph is None:
+                continue
             link = linked_id[1] if linked_id[1] is not None else ""
-            escaped_values = [remove_prefix(value, link).replace(r"'", r"''") for value in values]
-            self.__cur.execute(modmorph_sql["select_allomorphs_by_id_and_values"]
-                               % (id,
-                                  ", ".join(f"'{value}'" for value in escaped_values)))
-            for row in self.__cur.fetchall():
-                row_dict = dict(row)
-                row_dict["morph"] = link + row_dict["value"]
-                result.append(row_dict)
+            if link not in values_by_link:
+                values_by_link[link] = set(remove_prefix(value, link) for value in values)
+            if allomorph["value"] not in values_by_link[link]:
+                continue
+            row_dict = dict(allomorph)
+            row_dict["morph"] = link + row_dict["value"]
+            result.append(row_dict)
         return tuple(result)
 
     def get_allomorphs_by_ids_and_values(self, ids, values):
-        escaped_values = []
-        for value in values:
-            escaped_values.append(value.replace(r"'", r"''"))
-        self.__cur.execute(modmorph_sql["select_allomorphs_by_ids_and_values"]
-                           % (", ".join(f"'{id}'" for id in ids),
-                           ", ".join(f"'{value}'" for value in escaped_values)))
+        if self.__index is not None:
+            return self.__index.select_by_ids_and_values(self.__index.allomorphs, ids, values)
+        self.__cur.execute(modmorph_sql["select_allomorphs_by_ids_and_values"], (json_list(ids), json_list(values)))
         return tuple(dict(row) for row in self.__cur.fetchall())
 
     def get_particle_allomorphs_by_ids_and_values(self, ids, values):
-        escaped_values = []
-        for value in values:
-            escaped_values.append(value.replace(r"'", r"''"))
-        self.__cur.execute(modmorph_sql["select_particle_allomorphs_by_ids_and_values"]
-                           % (", ".join(f"'{id}'" for id in ids),
-                              ", ".join(f"'{value}'" for value in escaped_values)))
+        if self.__index is not None:
+            return self.__index.select_by_ids_and_values(self.__index.particles, ids, values)
+        self.__cur.execute(modmorph_sql["select_particle_allomorphs_by_ids_and_values"],
+                           (json_list(ids), json_list(values)))
+        return tuple(dict(row) for row in self.__cur.fetchall())
+
+    def get_particle_allomorphs_by_values(self, values):
+        if self.__index is not None:
+            return self.__index.select_by_ids_and_values(self.__index.particles, self.__index.particles, values)
+        self.__cur.execute(modmorph_sql["select_particle_allomorphs_by_values"], (json_list(values), ))
         return tuple(dict(row) for row in self.__cur.fetchall())
 
     def get_adpositions_by_value(self, value):
+        if self.__index is not None:
+            return self.__index.adpositions.get(value, ())
         self.__cur.execute(modmorph_sql["select_adpositions_by_value"], (value, ))
         return tuple(dict(row) for row in self.__cur.fetchall())
 
     def get_auxilary_verbs_by_value(self, value):
+        if self.__index is not None:
+            return self.__index.auxilary_verbs.get(value, ())
         self.__cur.execute(modmorph_sql["select_auxilary_verbs_by_value"], (value,))
         return tuple(dict(row) for row in self.__cur.fetchall())
 
     def get_allomorph_ids_by_type_id(self, type_id):
+        if self.__index is not None:
+            return self.__index.type_allomorphs.get(type_id, ())
         self.__cur.execute(modmorph_sql["select_allomorph_ids_by_type_id"], (type_id, ))
         return tuple((row[0], row[1]) for row in self.__cur.fetchall())
 
     def get_allomorph2_ids_by_allomoprh1_id(self, allomorph1_id):
+        if self.__index is not None:
+            return self.__index.allomorph_allomorphs.get(allomorph1_id, ())
         self.__cur.execute(modmorph_sql["select_allomorph2_ids_by_allomorph1_id"], (allomorph1_id, ))
         return tuple(row[0] for row in self.__cur.fetchall())
 
     def get_allomorph_ids_by_particle_id(self, particle_id):
+        if self.__index is not None:
+            return self.__index.particle_allomorphs.get(particle_id, ())
         self.__cur.execute(modmorph_sql["select_allomorph_ids_by_particle_id"], (particle_id,))
         return tuple(row[0] for row in self.__cur.fetchall())
 
     def get_particle_ids_by_type_id(self, type_id):
+        if self.__index is not None:
+            return self.__index.type_particles.get(type_id, ())
         self.__cur.execute(modmorph_sql["select_particle_ids_by_type_id"], (type_id, ))
         return tuple(row[0] for row in self.__cur.fetchall())
 
     def get_particle2_ids_by_allomorph1_id(self, allomorph1_id):
+        if self.__index is not None:
+            return self.__index.allomorph_particles.get(allomorph1_id, ())
         self.__cur.execute(modmorph_sql["select_particle2_ids_by_allomorph1_id"], (allomorph1_id,))
         return tuple(row[0] for row in self.__cur.fetchall())
 
@@ -299,3 +626,90 @@ class ModMorph:
     def get_auxilary_verbs_by_gram_value(self, gram_value_id):
         self.__cur.execute(modmorph_sql["select_auxilary_verbs_by_gram_value"], (gram_value_id,))
         return tuple(dict(row) for row in self.__cur.fetchall())
+
+
+def load_report(language, repeats=3, sample_file=None):
+    """
+    Печатает время загрузки модели во всех режимах и, если задан sample_file, время анализа его текста:
+    быстрая загрузка "readonly" без индекса в памяти оборачивается медленным анализом (см. LOAD_MODES)
+    """
+    from analyzer import ModMorphAnalyzer
+    sample = None
+    if sample_file is not None:
+        with open(sample_file, encoding="utf-8") as input_file:
+            sample = input_file.read()
+    print(f"{'load mode':<20}{'indexed':<10}{'min, s':>10}{'mean, s':>10}{'analysis, s':>14}")
+    for load_mode, mmap_size in (("dump", None), ("backup", None), ("readonly", None), ("readonly", 2 ** 28)):
+        for indexed in (False, True):
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                ModMorph(language, indexed=indexed, load_mode=load_mode, mmap_size=mmap_size).close()
+                timings.append(time.perf_counter() - started)
+            analysis = ""
+            if sample is not None:
+                modmorph = ModMorph(language, indexed=indexed, load_mode=load_mode, mmap_size=mmap_size)
+                started = time.perf_counter()
+                with ModMorphAnalyzer(language, modmorph=modmorph) as morph_analyzer:
+                    for _ in morph_analyzer.process_text(sample):
+                        pass
+                analysis = f"{time.perf_counter() - started:.3f}"
+                modmorph.close()
+            mode_name = load_mode if mmap_size is None else f"{load_mode}+mmap"
+            print(f"{mode_name:<20}{str(indexed):<10}{min(timings):>10.3f}{sum(timings) / repeats:>10.3f}"
+                  f"{analysis:>14}")
+
+
+def query_report(language, word, repeats=100):
+    modmorph = ModMorph(language)
+    prefixes = [word[:i] for i in range(1, len(word) + 1)]
+    roots = modmorph.get_root_morphemes_by_word(word) or ({"type_id": None}, )
+    root = roots[-1]
+    suffixes = []
+    if root["type_id"] is not None:
+        rest = remove_prefix(word, root["value_lower"][:len(root["value_lower"]) - root["strip"]])
+        suffixes = [rest[:i] for i in range(1, len(rest) + 1)]
+    linked_ids = modmorph.get_allomorph_ids_by_type_id(root["type_id"])
+    allomorph_ids = [linked_id[0] for linked_id in linked_ids]
+    particle_ids = modmorph.get_particle_ids_by_type_id(root["type_id"])
+    queries = (
+        ("select_root_morphemes_by_values", (json_list(prefixes), ),
+         modmorph.get_root_morphemes_by_values, (prefixes, )),
+        ("select_allomorphs_by_linked_ids_and_values", (json_list(linked_ids), json_list(suffixes)),
+         modmorph.get_allomorphs_by_linked_ids_and_values, (linked_ids, suffixes)),
+        ("select_allomorphs_by_ids_and_values", (json_list(allomorph_ids), json_list(suffixes)),
+         modmorph.get_allomorphs_by_ids_and_values, (allomorph_ids, suffixes)),
+        ("select_particle_allomorphs_by_ids_and_values", (json_list(particle_ids), json_list(prefixes)),
+         modmorph.get_particle_allomorphs_by_ids_and_values, (particle_ids, prefixes)),
+        ("select_adpositions_by_value", (word, ), modmorph.get_adpositions_by_value, (word, )),
+        ("select_auxilary_verbs_by_value", (word, ), modmorph.get_auxilary_verbs_by_value, (word, )),
+        ("select_allomorph_ids_by_type_id", (root["type_id"], ),
+         modmorph.get_allomorph_ids_by_type_id, (root["type_id"], )),
+        ("select_allomorph2_ids_by_allomorph1_id", (allomorph_ids[0] if allomorph_ids else None, ),
+         modmorph.get_allomorph2_ids_by_allomoprh1_id, (allomorph_ids[0] if allomorph_ids else None, )),
+        ("select_particle_ids_by_type_id", (root["type_id"], ),
+         modmorph.get_particle_ids_by_type_id, (root["type_id"], )),
+        ("select_particle2_ids_by_allomorph1_id", (allomorph_ids[0] if allomorph_ids else None, ),
+         modmorph.get_particle2_ids_by_allomorph1_id, (allomorph_ids[0] if allomorph_ids else None, )),
+    )
+    for query_name, parameters, getter, arguments in queries:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            getter(*arguments)
+        elapsed = (time.perf_counter() - started) / repeats
+        print(f"{query_name}: {elapsed * 1e6:.1f} us")
+        for detail in modmorph.explain_query(query_name, parameters):
+            print(f"    {detail}")
+    modmorph.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language [load [repeats [sample_file]] | queries word [repeats]]")
+        exit()
+    language = sys.argv[1]
+    if len(sys.argv) > 3 and sys.argv[2] == "queries":
+        query_report(language, sys.argv[3], int(sys.argv[4]) if len(sys.argv) > 4 else 100)
+    else:
+        load_report(language, int(sys.argv[3]) if len(sys.argv) > 3 else 3, sys.argv[4] if len(sys.argv) > 4 else None)
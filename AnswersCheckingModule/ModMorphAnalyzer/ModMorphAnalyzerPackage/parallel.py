@@ -0,0 +1,120 @@
+# Turkic Morpheme Model Library: Parallel Morph Analyzer Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import gc
+import os
+import sys
+from collections import deque
+from multiprocessing.util import Finalize
+
+from analyzer import ModMorphAnalyzer
+from registry import check_analyzer_options, preload, shared_modmorph, sharing_context
+
+_worker_analyzer = None
+
+
+def _init_worker(language, analyzer_options, shared_model):
+    global _worker_analyzer
+    if shared_model:
+        analyzer_options = dict(analyzer_options)
+        modmorph = shared_modmorph(language, mmap_size=analyzer_options.pop("mmap_size", None))
+        _worker_analyzer = ModMorphAnalyzer(language, modmorph=modmorph, **analyzer_options)
+        Finalize(modmorph, modmorph.close, exitpriority=9)
+    else:
+        _worker_analyzer = ModMorphAnalyzer(language, **analyzer_options)
+    Finalize(_worker_analyzer, _worker_analyzer.close, exitpriority=10)
+
+
+def _process_chunk(texts):
+    return _worker_analyzer.process_documents(texts)
+
+
+class ModMorphParallelAnalyzer:
+    def __init__(self, language, workers=None, chunk_size=16, max_pending_chunks=None, shared_model=True,
+                 **analyzer_options):
+        """
+        Параллельный морфоанализатор на пуле процессов.
+        Каждый процесс пула один раз создаёт собственный ModMorphAnalyzer и закрывает его при завершении пула.
+        :param language: код языка морфоанализа
+        :param workers: число процессов (None - по числу ядер)
+        :param chunk_size: число текстов в одном задании процесса
+        :param max_pending_chunks: максимальное число заданий в обработке одновременно
+            (None - удвоенное число процессов); ограничивает чтение входа и память под результаты
+        :param shared_model: общий индекс языковой модели (см. registry) - True (индекс строится один раз
+            до запуска процессов и наследуется ими через fork; без fork каждый процесс строит индекс
+            по файлу модели только для чтения), False (каждый процесс загружает свою копию модели)
+        :param analyzer_options: параметры ModMorphAnalyzer для процессов пула (cache_size, ...);
+            параметры загрузки модели (indexed, load_mode) - только без shared_model, иначе ValueError;
+            persistent_cache не принимается: процессы пула писали бы в один файл кэша
+            (см. registry.check_analyzer_options)
+        """
+        check_analyzer_options(analyzer_options, shared_model)
+        self.__workers = workers if workers is not None else os.cpu_count() or 1
+        self.__chunk_size = chunk_size
+        self.__max_pending_chunks = max_pending_chunks if max_pending_chunks is not None else 2 * self.__workers
+        context = sharing_context()
+        preloaded = shared_model and context.get_start_method() == "fork"
+        if preloaded:
+            preload([language])
+        self.__pool = context.Pool(self.__workers, initializer=_init_worker,
+                                   initargs=(language, analyzer_options, shared_model))
+        if preloaded:
+            # Процессы уже получили замороженные объекты; в основном процессе сборка мусора восстанавливается
+            gc.unfreeze()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.__pool.terminate()
+            self.__pool.join()
+        else:
+            self.close()
+
+    def close(self):
+        """
+        Дожидается завершения заданий и останавливает процессы пула, закрывая их анализаторы
+        """
+        self.__pool.close()
+        self.__pool.join()
+
+    def process_texts(self, texts):
+        """
+        Производит параллельную морфоаналитическую обработку набора текстов (предложений, документов)
+        :param texts: Итерируемый набор входных текстов (UNICODE), читается по мере обработки
+        :return: Генератор результатов в порядке входных текстов. Каждый элемент - список кортежей пар вида
+            "Исходное слово/словосочетание", "Дерево морфоанализа" (см. ModMorphAnalyzer.process_documents)
+        """
+        pending = deque()
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) < self.__chunk_size:
+                continue
+            pending.append(self.__pool.apply_async(_process_chunk, (chunk,)))
+            chunk = []
+            while len(pending) >= self.__max_pending_chunks:
+                yield from pending.popleft().get()
+        if chunk:
+            pending.append(self.__pool.apply_async(_process_chunk, (chunk,)))
+        while pending:
+            yield from pending.popleft().get()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language file [workers]")
+        exit()
+    language = sys.argv[1]
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    with open(sys.argv[2], encoding="utf-8") as input_file, \
+            ModMorphParallelAnalyzer(language, workers=workers) as morph_analyzer:
+        for results in morph_analyzer.process_texts(line for line in input_file):
+            for result in results:
+                print(result)
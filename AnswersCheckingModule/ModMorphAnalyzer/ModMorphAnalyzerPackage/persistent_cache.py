@@ -0,0 +1,170 @@
+# Turkic Morpheme Model Library: Persistent Analysis Cache Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import json
+import marshal
+import os
+import sqlite3
+import sys
+
+persistent_cache_sql = {
+    "create_stamp": """
+        CREATE TABLE IF NOT EXISTS "stamp" (
+            "id" INTEGER PRIMARY KEY CHECK ("id" = 1),
+            "value" TEXT
+        )
+    """,
+    "create_analysis": """
+        CREATE TABLE IF NOT EXISTS "analysis" (
+            "word" TEXT NOT NULL,
+            "next_word" TEXT NOT NULL,
+            "result" BLOB,
+            PRIMARY KEY ("word", "next_word")
+        ) WITHOUT ROWID
+    """,
+    "select_stamp": """
+        SELECT "value" FROM "stamp" WHERE "id" = 1
+    """,
+    "replace_stamp": """
+        INSERT OR REPLACE INTO "stamp" ("id", "value") VALUES (1, ?)
+    """,
+    "delete_analysis": """
+        DELETE FROM "analysis"
+    """,
+    "select_analysis": """
+        SELECT "result" FROM "analysis" WHERE "word" = ? AND "next_word" = ?
+    """,
+    "replace_analysis": """
+        INSERT OR REPLACE INTO "analysis" ("word", "next_word", "result") VALUES (?, ?, ?)
+    """,
+    "count_analysis": """
+        SELECT COUNT(*) FROM "analysis"
+    """,
+}
+
+
+class PersistentAnalysisCache:
+    def __init__(self, file_path, metadata, commit_every=1000):
+        """
+        Постоянный кэш результатов анализа слов в локальном файле SQLite.
+        Ключ - слово и следующее слово в нижнем регистре (пустая строка, если следующего слова нет или оно
+        не может быть частицей, послелогом или вспомогательным глаголом), значение - результат анализа
+        в формате кортежей.
+        Кэш очищается автоматически, если метаданные языковой модели (language, version, build)
+        или версия Python отличаются от тех, с которыми он был заполнен.
+        Файл кэша используется одним анализатором: соединение открывается в монопольном режиме блокировок
+        и держит файл до close(), записи фиксируются пакетами по commit_every. Второй экземпляр для того же
+        файла (в другом процессе или потоке) получает RuntimeError при создании, а не ожидание блокировки
+        при записи. Экземпляр используется только в создавшем его потоке, поэтому пулы анализаторов
+        (service, async_api, parallel) параметр persistent_cache не принимают.
+        :param file_path: путь к файлу кэша
+        :param metadata: метаданные языковой модели (ModMorph.get_metadata())
+        :param commit_every: число записей, после которого изменения фиксируются в файле
+        """
+        self.__conn = sqlite3.connect(file_path, timeout=0)
+        try:
+            self.__conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+            self.__conn.execute("BEGIN EXCLUSIVE")
+            self.__conn.execute(persistent_cache_sql["create_stamp"])
+            self.__conn.execute(persistent_cache_sql["create_analysis"])
+        except sqlite3.OperationalError as e:
+            self.__conn.close()
+            raise RuntimeError(f"Persistent cache {file_path} is in use by another analyzer") from e
+        stamp = json.dumps({
+            "language": metadata["language"],
+            "version": metadata["version"],
+            "build": metadata["build"],
+            "python": list(sys.version_info[:2]),
+            "marshal": marshal.version,
+        }, sort_keys=True)
+        row = self.__conn.execute(persistent_cache_sql["select_stamp"]).fetchone()
+        if row is None or row[0] != stamp:
+            self.__conn.execute(persistent_cache_sql["delete_analysis"])
+            self.__conn.execute(persistent_cache_sql["replace_stamp"], (stamp, ))
+        self.__conn.commit()
+        self.__commit_every = commit_every
+        self.__uncommitted = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__writes = 0
+
+    def close(self):
+        self.__conn.commit()
+        self.__conn.close()
+
+    def get(self, word, next_word=None):
+        """
+        :param word: слово
+        :param next_word: следующее слово или None
+        :return: пара (результат анализа, флаг обработки следующего слова) или None, если ключ отсутствует
+        """
+        row = self.__conn.execute(persistent_cache_sql["select_analysis"],
+                                  (word, next_word if next_word is not None else "")).fetchone()
+        if row is None:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        return marshal.loads(row[0])
+
+    def put(self, word, next_word, value):
+        """
+        :param word: слово
+        :param next_word: следующее слово или None
+        :param value: пара (результат анализа в формате кортежей, флаг обработки следующего слова)
+        """
+        self.__conn.execute(persistent_cache_sql["replace_analysis"],
+                            (word, next_word if next_word is not None else "", marshal.dumps(value)))
+        self.__writes += 1
+        self.__uncommitted += 1
+        if self.__uncommitted >= self.__commit_every:
+            self.__conn.commit()
+            self.__uncommitted = 0
+
+    def stats(self):
+        """
+        :return: словарь счётчиков кэша - entries, hits, misses, writes
+        """
+        return {
+            "entries": self.__conn.execute(persistent_cache_sql["count_analysis"]).fetchone()[0],
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "writes": self.__writes,
+        }
+
+
+def prewarm(morph_analyzer, file_path, frequency_list=False):
+    """
+    Заполняет постоянный кэш анализатора по корпусу или частотному списку
+    :param morph_analyzer: ModMorphAnalyzer, созданный с параметром persistent_cache
+    :param file_path: путь к текстовому файлу корпуса или частотного списка
+    :param frequency_list: формат файла - False (произвольный текст, анализируются пары слов корпуса),
+        True (по одному слову в строке, первое поле строки; анализируется слово без контекста, и запись
+        используется для всех вхождений слова, за которым не следует частица, послелог или вспомогательный глагол)
+    :return: число обработанных слов
+    """
+    processed = 0
+    with open(file_path, encoding="utf-8") as input_file:
+        if frequency_list:
+            for line in input_file:
+                fields = line.split()
+                if fields:
+                    processed += len(list(morph_analyzer.process_pair((fields[0], None))))
+        else:
+            for _ in morph_analyzer.process_stream(input_file):
+                processed += 1
+    return processed
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language cache_file corpus_file [--frequency-list]")
+        exit()
+    from analyzer import ModMorphAnalyzer
+    with ModMorphAnalyzer(sys.argv[1], indexed=True, persistent_cache=sys.argv[2]) as morph_analyzer:
+        processed = prewarm(morph_analyzer, sys.argv[3], frequency_list="--frequency-list" in sys.argv[4:])
+        print(f"Processed {processed} words: {morph_analyzer.persistent_cache_stats()}")
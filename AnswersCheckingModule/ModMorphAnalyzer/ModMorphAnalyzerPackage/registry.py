@@ -0,0 +1,115 @@
+# Turkic Morpheme Model Library: Language Model Registry Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import gc
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+from modmorph import ModMorph, ModMorphIndex, connect_language_file, language_file_path
+
+# Индексы языковых моделей процесса: (language, language_directory) -> ModMorphIndex
+_indexes = {}
+# Параметры ModMorphAnalyzer, задающие собственную загрузку модели; с общим индексом они не применяются
+SHARED_MODEL_IGNORED_OPTIONS = ("indexed", "load_mode", "modmorph")
+# Параметры, несовместимые с пулом анализаторов: соединение постоянного кэша используется только
+# в создавшем его потоке и допускает одного пишущего (см. persistent_cache.PersistentAnalysisCache)
+POOLED_ANALYZER_UNSUPPORTED_OPTIONS = ("persistent_cache", )
+
+
+def get_index(language, language_directory=None):
+    """
+    Возвращает индекс языковой модели, построенный один раз на процесс.
+    Индекс строится по файлу модели, открытому только для чтения, без копии базы в памяти.
+    Индекс используется только для чтения и может разделяться экземплярами ModMorph и процессами.
+    :param language: код языка модели
+    :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+    :return: ModMorphIndex
+    """
+    key = (language, language_directory)
+    index = _indexes.get(key)
+    if index is None:
+        conn = connect_language_file(language_file_path(language, language_directory), load_mode="readonly")
+        conn.row_factory = sqlite3.Row
+        try:
+            index = _indexes[key] = ModMorphIndex(conn)
+        finally:
+            conn.close()
+    return index
+
+
+def preload(languages, language_directory=None, freeze=True):
+    """
+    Строит индексы языковых моделей до создания процессов-обработчиков.
+    Процессы, порождённые через fork, получают индексы копированием страниц при записи,
+    то есть одна копия в памяти на все процессы. gc.freeze переносит построенные объекты
+    в постоянное поколение сборщика мусора, чтобы его проходы в обработчиках не копировали эти страницы.
+    :param languages: коды языков
+    :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+    :param freeze: вызвать gc.freeze после построения
+    """
+    for language in languages:
+        get_index(language, language_directory)
+    if freeze:
+        gc.collect()
+        gc.freeze()
+
+
+def shared_modmorph(language, language_directory=None, mmap_size=None):
+    """
+    Создаёт ModMorph с общим индексом процесса (см. get_index) и соединением с файлом модели
+    только для чтения: ни индекс, ни база не копируются заново для каждого анализатора
+    :param language: код языка модели
+    :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+    :param mmap_size: размер отображения файла модели в память в байтах (None - по умолчанию SQLite)
+    :return: ModMorph; закрывается вызывающим
+    """
+    return ModMorph(language, load_mode="readonly", mmap_size=mmap_size, language_directory=language_directory,
+                    index=get_index(language, language_directory))
+
+
+def check_analyzer_options(analyzer_options, shared_model=True):
+    """
+    Отклоняет параметры анализатора, несовместимые с пулом анализаторов, работающих в разных потоках
+    или процессах, а при shared_model - и с общей языковой моделью (см. shared_modmorph).
+    Используется всеми пулами (service, async_api, parallel), чтобы они одинаково принимали параметры
+    :param analyzer_options: словарь параметров ModMorphAnalyzer
+    :param shared_model: анализаторы пула используют общий индекс языковой модели
+    """
+    if shared_model:
+        ignored = [name for name in SHARED_MODEL_IGNORED_OPTIONS if name in analyzer_options]
+        if ignored:
+            raise ValueError(f"Options not supported with the shared language model: {', '.join(ignored)}")
+    unsupported = [name for name in POOLED_ANALYZER_UNSUPPORTED_OPTIONS if name in analyzer_options]
+    if unsupported:
+        raise ValueError(f"Options not supported by pooled analyzers: {', '.join(unsupported)}")
+
+
+def sharing_context():
+    """
+    Контекст multiprocessing для пулов обработчиков с общими индексами:
+    fork, если он доступен (индексы, построенные preload, наследуются процессами),
+    иначе контекст по умолчанию (каждый процесс строит индекс сам по файлу модели только для чтения)
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language")
+        exit()
+    started = time.perf_counter()
+    get_index(sys.argv[1])
+    print(f"Index built in {time.perf_counter() - started:.3f} s")
+    started = time.perf_counter()
+    shared_modmorph(sys.argv[1]).close()
+    print(f"Shared ModMorph opened in {time.perf_counter() - started:.6f} s")
@@ -0,0 +1,156 @@
+# Turkic Morpheme Model Library: Analysis Results Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import sys
+
+
+class RootRecord:
+    __slots__ = ("id", "value", "pos", "concept_id", "concept_name")
+
+    def __init__(self, id, value, pos, concept_id, concept_name):
+        self.id = id
+        self.value = value
+        self.pos = pos
+        self.concept_id = concept_id
+        self.concept_name = concept_name
+
+    def __eq__(self, other):
+        return isinstance(other, RootRecord) and self.to_tuple() == other.to_tuple()
+
+    def __hash__(self):
+        return hash(self.to_tuple())
+
+    def to_tuple(self):
+        return self.id, self.value, self.pos, self.concept_id, self.concept_name
+
+
+class MorphRecord:
+    __slots__ = ("id", "value", "gram_value_id", "gram_value")
+
+    def __init__(self, id, value, gram_value_id, gram_value):
+        self.id = id
+        self.value = value
+        self.gram_value_id = gram_value_id
+        self.gram_value = gram_value
+
+    def __eq__(self, other):
+        return isinstance(other, MorphRecord) and self.to_tuple() == other.to_tuple()
+
+    def __hash__(self):
+        return hash(self.to_tuple())
+
+    def to_tuple(self):
+        return self.id, self.value, self.gram_value_id, self.gram_value
+
+
+class AnalysisNode:
+    __slots__ = ("record", "children")
+
+    def __init__(self, record, children):
+        """
+        Узел компактного дерева морфоанализа. Узлы сравниваются по значению - по полям записей
+        и дочерним узлам, поэтому результаты разных вызовов и анализаторов равны при равном анализе.
+        :param record: общая (интернированная) запись корня или алломорфа - RootRecord или MorphRecord
+        :param children: кортеж дочерних узлов
+        """
+        self.record = record
+        self.children = children
+
+    def __len__(self):
+        return len(self.children)
+
+    def __eq__(self, other):
+        return isinstance(other, AnalysisNode) and self.record == other.record and self.children == other.children
+
+    def __hash__(self):
+        return hash((self.record, self.children))
+
+    def __repr__(self):
+        return repr(self.to_tuple())
+
+    def to_tuple(self):
+        """
+        :return: узел в формате кортежей process_words - поля записи и список дочерних узлов
+        """
+        return self.record.to_tuple() + ([child.to_tuple() for child in self.children], )
+
+
+class RecordPool:
+    def __init__(self):
+        """
+        Пул интернированных записей корней и алломорфов.
+        Каждая запись создаётся один раз на набор полей и разделяется всеми узлами деревьев анализа,
+        как построенных анализатором, так и восстановленных из формата кортежей (from_tuple).
+        """
+        # Записи по полям (у корня их 5, у алломорфа 4, поэтому ключи видов не пересекаются)
+        self.__records = {}
+        # Те же записи по (вид, id) строки модели - быстрый поиск без сборки полей
+        self.__records_by_id = {}
+
+    def __len__(self):
+        return len(self.__records)
+
+    def root(self, root):
+        key = ("root", root["id"])
+        record = self.__records_by_id.get(key)
+        if record is None:
+            record = self.__records_by_id[key] = self.__record(
+                (root["id"], root["value"], root["pos"], root["concept_id"],
+                 root["concept_en_name"] + " : " + root["concept_ru_name"]), True)
+        return record
+
+    def morph(self, kind, morph):
+        key = (kind, morph["id"])
+        record = self.__records_by_id.get(key)
+        if record is None:
+            record = self.__records_by_id[key] = self.__record(
+                (morph["id"], morph["value"], morph["gram_value_id"], morph["gram_value"]), False)
+        return record
+
+    def __record(self, fields, is_root):
+        record = self.__records.get(fields)
+        if record is None:
+            fields = tuple(_intern(field) for field in fields)
+            record = self.__records[fields] = RootRecord(*fields) if is_root else MorphRecord(*fields)
+        return record
+
+    def from_tuple(self, node, is_root=False):
+        """
+        Восстанавливает компактный узел из формата кортежей
+        :param node: кортеж узла корня (6 полей) или алломорфа (5 полей)
+        :param is_root: True для узла корня
+        :return: AnalysisNode с интернированной записью
+        """
+        return AnalysisNode(self.__record(tuple(node[:-1]), is_root),
+                            tuple(self.from_tuple(child) for child in node[-1]))
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def to_tuples(processing_result):
+    """
+    Преобразует результат анализа слова из компактных узлов в формат кортежей process_words
+    :param processing_result: кортеж узлов AnalysisNode или None
+    :return: список кортежей или None
+    """
+    if processing_result is None:
+        return None
+    return [node.to_tuple() for node in processing_result]
+
+
+def from_tuples(processing_result, records):
+    """
+    Преобразует результат анализа слова из формата кортежей process_words в компактные узлы
+    :param processing_result: список кортежей или None
+    :param records: пул интернированных записей RecordPool
+    :return: кортеж узлов AnalysisNode или None
+    """
+    if processing_result is None:
+        return None
+    return tuple(records.from_tuple(node, is_root=True) for node in processing_result)
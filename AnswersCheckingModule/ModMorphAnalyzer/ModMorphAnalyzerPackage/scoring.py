@@ -0,0 +1,182 @@
+# Turkic Morpheme Model Library: Answer Scoring Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import re
+
+import numpy as np
+
+sentence_boundary = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?)\s')
+
+
+def split_sentences(text):
+    """
+    Разбивает текст на предложения по точкам и вопросительным знакам, а также по переводам строк
+    """
+    return '\n'.join(sentence_boundary.split(text)).split('\n')
+
+
+def lemmatize_sentences(sentences, morph_analyzer):
+    """
+    Переводит предложения в списки лемм. Для каждого распознанного слова (словосочетания)
+    берутся различные значения его корней через пробел в порядке анализа (лемма не зависит от
+    хэширования строк, поэтому корпус стабилен между запусками), нераспознанные слова пропускаются.
+    Используется режим лемматизации анализатора без построения деревьев (см. ModMorphAnalyzer.lemmatize_documents).
+    :param sentences: список предложений (UNICODE)
+    :param morph_analyzer: ModMorphAnalyzer
+    :return: список предложений, каждое - список лемм
+    """
+    return [
+        [' '.join(lemmas) for _, lemmas in results if lemmas is not None]
+        for results in morph_analyzer.lemmatize_documents(sentences)
+    ]
+
+
+def lemmatize_text(text, morph_analyzer):
+    """
+    Переводит текст в единый список лемм всех его предложений (см. lemmatize_sentences)
+    """
+    return lemmatize_texts([text], morph_analyzer)[0]
+
+
+def lemmatize_texts(texts, morph_analyzer):
+    """
+    Переводит набор текстов в списки лемм за один пакетный проход анализатора:
+    каждая словоформа анализируется один раз на весь набор (см. ModMorphAnalyzer.lemmatize_documents)
+    :param texts: список текстов (UNICODE)
+    :param morph_analyzer: ModMorphAnalyzer
+    :return: список по текстам, каждый элемент - единый список лемм всех предложений текста
+    """
+    sentences = []
+    offsets = [0]
+    for text in texts:
+        sentences.extend(split_sentences(text))
+        offsets.append(len(sentences))
+    lemmatized = lemmatize_sentences(sentences, morph_analyzer)
+    return [[lemma for sentence in lemmatized[start:end] for lemma in sentence]
+            for start, end in zip(offsets, offsets[1:])]
+
+
+def sentence_vectors(sentences, word_vectors):
+    """
+    Векторы предложений как среднее векторов входящих в словарь модели слов.
+    Все слова за один проход переводятся в индексы словаря, векторы собираются в одну матрицу
+    и усредняются по предложениям сегментной редукцией.
+    :param sentences: список предложений, каждое - список слов
+    :param word_vectors: KeyedVectors модели Word2Vec
+    :return: матрица float32 (число предложений x размер вектора); предложение без известных слов - нулевой вектор
+    """
+    key_to_index = word_vectors.key_to_index
+    token_indices = []
+    sentence_ids = []
+    for sentence_id, sentence in enumerate(sentences):
+        for word in sentence:
+            index = key_to_index.get(word)
+            if index is not None:
+                token_indices.append(index)
+                sentence_ids.append(sentence_id)
+    return segment_means(word_vectors.vectors, token_indices, sentence_ids, len(sentences))
+
+
+def segment_means(vectors, token_indices, sentence_ids, sentences_count):
+    """
+    Средние векторы предложений по индексам слов, упорядоченным по предложениям
+    :param vectors: матрица векторов слов модели
+    :param token_indices: индексы векторов слов всех предложений подряд
+    :param sentence_ids: номер предложения каждого слова (неубывающий)
+    :param sentences_count: число предложений
+    :return: матрица float32 (sentences_count x размер вектора); предложение без слов - нулевой вектор
+    """
+    result = np.zeros((sentences_count, vectors.shape[1]), dtype=np.float32)
+    if len(token_indices) == 0:
+        return result
+    sentence_ids = np.asarray(sentence_ids, dtype=np.int64)
+    gathered = np.asarray(vectors[np.asarray(token_indices, dtype=np.int64)], dtype=np.float32)
+    segment_starts = np.flatnonzero(np.r_[True, sentence_ids[1:] != sentence_ids[:-1]])
+    segment_ids = sentence_ids[segment_starts]
+    counts = np.diff(np.r_[segment_starts, len(sentence_ids)])
+    result[segment_ids] = np.add.reduceat(gathered, segment_starts, axis=0) / counts[:, None].astype(np.float32)
+    return result
+
+
+def normalize_rows(matrix):
+    """
+    Нормирует строки матрицы на единичную длину; нулевые строки остаются нулевыми
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def cosine_scores(reference_vectors, answer_vectors):
+    """
+    Косинусная близость всех ответов ко всем эталонам одним матричным произведением
+    :param reference_vectors: матрица векторов эталонных ответов (или один вектор)
+    :param answer_vectors: матрица векторов ответов студентов
+    :return: матрица (число ответов x число эталонов); близость с нулевым вектором равна 0
+    """
+    reference_vectors = np.atleast_2d(reference_vectors)
+    return normalize_rows(answer_vectors) @ normalize_rows(reference_vectors).T
+
+
+def score_by_question(reference_vectors, reference_question_ids, answer_vectors, answer_question_ids,
+                      top_k=1, max_chunk_bytes=64 * 1024 * 1024):
+    """
+    Пакетная оценка ответов по вопросам: каждый ответ сравнивается со всеми эталонами своего вопроса.
+    Ответы и эталоны группируются по вопросам, и каждая группа ответов умножается только на эталоны
+    своего вопроса, поэтому объём вычислений не растёт с числом вопросов. Внутри группы ответы обрабатываются
+    блоками матричных произведений float32, размер блока матрицы близостей не превышает max_chunk_bytes.
+    :param reference_vectors: матрица векторов эталонных ответов
+    :param reference_question_ids: идентификатор вопроса каждого эталона
+    :param answer_vectors: матрица векторов ответов студентов
+    :param answer_question_ids: идентификатор вопроса каждого ответа
+    :param top_k: число ближайших эталонов на ответ
+    :param max_chunk_bytes: предел памяти блока матрицы близостей в байтах
+    :return: тройка (scores, top_references, top_scores):
+        scores - массив длины число ответов, близость к ближайшему эталону вопроса (nan, если эталонов нет);
+        top_references - матрица (число ответов x top_k) номеров эталонов по убыванию близости (-1 - нет эталона);
+        top_scores - матрица близостей к ним (nan - нет эталона)
+    """
+    references = normalize_rows(np.atleast_2d(reference_vectors))
+    answers = normalize_rows(np.atleast_2d(answer_vectors))
+    question_ids = list(reference_question_ids) + list(answer_question_ids)
+    questions, question_codes = np.unique(np.asarray(question_ids), return_inverse=True)
+    reference_codes = question_codes[:len(references)]
+    answer_codes = question_codes[len(references):]
+    answers_count = len(answers)
+    top_k = max(1, min(top_k, len(references)))
+    top_references = np.full((answers_count, top_k), -1, dtype=np.int64)
+    top_scores = np.full((answers_count, top_k), np.nan, dtype=np.float32)
+    if len(references) == 0 or answers_count == 0:
+        return top_scores[:, 0].copy(), top_references, top_scores
+    # Номера эталонов и ответов, упорядоченные по вопросам, и границы групп в них
+    codes = np.arange(len(questions) + 1)
+    reference_order = np.argsort(reference_codes, kind="stable")
+    reference_bounds = np.searchsorted(reference_codes[reference_order], codes)
+    answer_order = np.argsort(answer_codes, kind="stable")
+    answer_bounds = np.searchsorted(answer_codes[answer_order], codes)
+    for code in range(len(questions)):
+        group_answers = answer_order[answer_bounds[code]:answer_bounds[code + 1]]
+        group_references = reference_order[reference_bounds[code]:reference_bounds[code + 1]]
+        if len(group_answers) == 0 or len(group_references) == 0:
+            continue
+        group_reference_vectors = references[group_references].T
+        group_top_k = min(top_k, len(group_references))
+        rows = np.arange(group_top_k)
+        chunk_size = max(1, max_chunk_bytes // (4 * len(group_references)))
+        for start in range(0, len(group_answers), chunk_size):
+            chunk_answers = group_answers[start:start + chunk_size]
+            similarities = answers[chunk_answers] @ group_reference_vectors
+            if group_top_k < len(group_references):
+                candidates = np.argpartition(-similarities, group_top_k - 1, axis=1)[:, :group_top_k]
+            else:
+                candidates = np.broadcast_to(rows, (len(chunk_answers), group_top_k))
+            candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind="stable")
+            top_references[chunk_answers, :group_top_k] = group_references[np.take_along_axis(candidates, order, axis=1)]
+            top_scores[chunk_answers, :group_top_k] = np.take_along_axis(candidate_scores, order, axis=1)
+    return top_scores[:, 0].copy(), top_references, top_scores
@@ -0,0 +1,258 @@
+# Turkic Morpheme Model Library: Answer Scoring Service Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyzer import ModMorphAnalyzer
+from instrumentation import Instrumentation
+from model_store import load_word_vectors
+from registry import check_analyzer_options, shared_modmorph
+from scoring import lemmatize_texts, sentence_vectors, cosine_scores, score_by_question
+
+
+class ScoringService:
+    def __init__(self, language, model_path, workers=4, **analyzer_options):
+        """
+        Резидентный сервис оценки ответов. Языковая модель и векторы слов загружаются один раз при создании,
+        после чего запросы обрабатываются за миллисекунды.
+        Запросы и ответы - объекты JSON, по одному в строке (см. handle_request):
+            {"id": 1, "command": "score", "reference": "эталон", "answers": ["ответ", ...]}
+                -> {"id": 1, "scores": [косинусная близость каждого ответа к эталону, ...]}
+            {"id": 2, "command": "score_batch", "top_k": 3,
+             "references": [{"question_id": 7, "text": "эталон"}, ...],
+             "answers": [{"question_id": 7, "text": "ответ"}, ...]}
+                -> {"id": 2, "results": [{"score": 0.9, "top": [{"reference": 0, "score": 0.9}, ...]}, ...]}
+            {"command": "health"} -> {"status": "ok", ...}
+            {"command": "stats"} -> {"requests": ..., "errors": ..., "calls": ...}
+        Все анализаторы пула разделяют один индекс языковой модели процесса (см. registry). Соединение с файлом
+        модели открывается с check_same_thread=True и используется только в потоке, создавшем сервис
+        (алфавит и метаданные); методы анализа, вызываемые сервисом (process_documents, lemmatize_documents),
+        обслуживаются индексом без SQL-запросов, поэтому анализаторы можно использовать из любых потоков.
+        Геттеры ModMorph без индекса (например, get_root_morphemes_by_values) из других потоков вызывать нельзя.
+        :param language: код языка морфоанализа
+        :param model_path: путь к сохранённым векторам слов или модели Word2Vec (см. model_store);
+            None - только морфоанализ (process_text), без оценки ответов
+        :param workers: число одновременно обрабатываемых запросов (анализаторов в пуле)
+        :param analyzer_options: параметры ModMorphAnalyzer - cache_size, cache_memory_limit;
+            mmap_size - размер отображения файла модели в память. Параметры загрузки модели (indexed, load_mode)
+            не принимаются: анализаторы всегда используют общий индекс; persistent_cache не принимается:
+            анализаторы пула работают в разных потоках (см. registry.check_analyzer_options)
+        """
+        check_analyzer_options(analyzer_options)
+        self.__language = language
+        self.__workers = workers
+        self.__modmorph = shared_modmorph(language, mmap_size=analyzer_options.pop("mmap_size", None))
+        self.__analyzers = queue.Queue()
+        for _ in range(workers):
+            self.__analyzers.put(ModMorphAnalyzer(language, modmorph=self.__modmorph, **analyzer_options))
+        self.__word_vectors = load_word_vectors(model_path) if model_path is not None else None
+        self.__instrumentation = Instrumentation()
+        self.__lock = threading.Lock()
+        self.__started = time.time()
+        self.__requests = 0
+        self.__errors = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Закрывает анализаторы пула и языковую модель
+        """
+        while not self.__analyzers.empty():
+            self.__analyzers.get().close()
+        self.__modmorph.close()
+
+    def process_text(self, text):
+        """
+        Морфоаналитическая обработка текста свободным анализатором пула
+        :return: список результатов (см. ModMorphAnalyzer.process_text)
+        """
+        morph_analyzer = self.__analyzers.get()
+        try:
+            return list(morph_analyzer.process_text(text))
+        finally:
+            self.__analyzers.put(morph_analyzer)
+
+    def score(self, reference, answers):
+        """
+        Оценивает ответы по косинусной близости их средних векторов лемм к эталонному ответу
+        :param reference: текст эталонного ответа
+        :param answers: список текстов ответов
+        :return: список оценок в порядке ответов; ответ без известных модели слов получает 0
+        """
+        vectors = self.__text_vectors([reference] + list(answers))
+        return cosine_scores(vectors[0], vectors[1:])[:, 0].tolist()
+
+    def score_batch(self, references, answers, top_k=1):
+        """
+        Оценивает за один вызов ответы на множество вопросов (например, всю сессию экзамена):
+        каждый ответ сравнивается с эталонами своего вопроса (см. scoring.score_by_question)
+        :param references: список эталонов - словарей с полями question_id и text
+        :param answers: список ответов - словарей с полями question_id и text
+        :param top_k: число ближайших эталонов на ответ
+        :return: список по ответам - словари score (близость к ближайшему эталону, None - у вопроса нет эталонов)
+            и top (ближайшие эталоны: reference - номер в references, score - близость)
+        """
+        vectors = self.__text_vectors([reference["text"] for reference in references] +
+                                      [answer["text"] for answer in answers])
+        scores, top_references, top_scores = score_by_question(
+            vectors[:len(references)], [reference["question_id"] for reference in references],
+            vectors[len(references):], [answer["question_id"] for answer in answers], top_k=top_k)
+        return [
+            {
+                "score": float(score) if top_indices[0] >= 0 else None,
+                "top": [{"reference": int(index), "score": float(similarity)}
+                        for index, similarity in zip(top_indices, similarities) if index >= 0],
+            }
+            for score, top_indices, similarities in zip(scores, top_references.tolist(), top_scores.tolist())
+        ]
+
+    def __text_vectors(self, texts):
+        if self.__word_vectors is None:
+            raise RuntimeError("Scoring requires a service created with model_path")
+        morph_analyzer = self.__analyzers.get()
+        try:
+            sentences = lemmatize_texts(texts, morph_analyzer)
+        finally:
+            self.__analyzers.put(morph_analyzer)
+        return sentence_vectors(sentences, self.__word_vectors)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "language": self.__language,
+            "workers": self.__workers,
+            "vocabulary": len(self.__word_vectors.key_to_index) if self.__word_vectors is not None else 0,
+            "uptime": time.time() - self.__started,
+        }
+
+    def stats(self):
+        """
+        :return: число запросов и ошибок, число вызовов и время обработки по командам
+        """
+        with self.__lock:
+            snapshot = self.__instrumentation.stats()
+            snapshot["requests"] = self.__requests
+            snapshot["errors"] = self.__errors
+        return snapshot
+
+    def handle_request(self, request):
+        """
+        Обрабатывает один запрос протокола
+        :param request: словарь запроса с полем command (score, score_batch, health, stats) и необязательным id
+        :return: словарь ответа с тем же id; при ошибке - с полем error
+        """
+        started = time.perf_counter()
+        command = request.get("command") if isinstance(request, dict) else None
+        response = {"id": request.get("id")} if isinstance(request, dict) else {"id": None}
+        try:
+            if command == "score":
+                response["scores"] = self.score(request["reference"], request["answers"])
+            elif command == "score_batch":
+                response["results"] = self.score_batch(request["references"], request["answers"],
+                                                       request.get("top_k", 1))
+            elif command == "health":
+                response.update(self.health())
+            elif command == "stats":
+                response.update(self.stats())
+            else:
+                raise ValueError(f"Unknown command: {command}")
+        except Exception as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        with self.__lock:
+            self.__requests += 1
+            if "error" in response:
+                self.__errors += 1
+            self.__instrumentation.record(f"command.{command}", time.perf_counter() - started)
+        return response
+
+    def handle_line(self, line):
+        """
+        Обрабатывает строку протокола JSON-lines
+        :return: строка ответа без перевода строки
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            with self.__lock:
+                self.__requests += 1
+                self.__errors += 1
+            return json.dumps({"id": None, "error": f"{type(e).__name__}: {e}"}, ensure_ascii=False)
+        return json.dumps(self.handle_request(request), ensure_ascii=False)
+
+    def serve_stdio(self, input_stream=None, output_stream=None):
+        """
+        Обслуживает запросы из потока ввода, отвечая в поток вывода по мере готовности.
+        Запросы обрабатываются параллельно, поэтому ответы могут приходить не в порядке запросов -
+        их следует сопоставлять по id. Работа завершается по окончании потока ввода.
+        """
+        input_stream = input_stream if input_stream is not None else sys.stdin
+        output_stream = output_stream if output_stream is not None else sys.stdout
+        output_lock = threading.Lock()
+        pending = threading.BoundedSemaphore(2 * self.__workers)
+
+        def respond(future):
+            # Место освобождается и при ошибке записи (например, закрытом канале вывода),
+            # иначе цикл чтения запросов остановился бы в pending.acquire()
+            try:
+                with output_lock:
+                    output_stream.write(future.result() + "\n")
+                    output_stream.flush()
+            finally:
+                pending.release()
+
+        with ThreadPoolExecutor(self.__workers) as executor:
+            for line in input_stream:
+                if not line.strip():
+                    continue
+                pending.acquire()
+                executor.submit(self.handle_line, line).add_done_callback(respond)
+
+    def serve_tcp(self, host="127.0.0.1", port=8765):
+        """
+        Обслуживает запросы по локальному TCP-сокету: каждое соединение - поток JSON-lines,
+        ответы на запросы одного соединения приходят в порядке запросов, соединения обрабатываются параллельно
+        """
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    self.wfile.write((service.handle_line(line.decode("utf-8")) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        with Server((host, port), Handler) as server:
+            server.serve_forever()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language model_file [port]")
+        exit()
+    with ScoringService(sys.argv[1], sys.argv[2], cache_size=100000) as service:
+        if len(sys.argv) > 3:
+            service.serve_tcp(port=int(sys.argv[3]))
+        else:
+            service.serve_stdio()
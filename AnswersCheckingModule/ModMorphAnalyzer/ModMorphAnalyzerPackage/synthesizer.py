@@ -0,0 +1,249 @@
+# Turkic Morpheme Model Library: Morph Synthesizer Library
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import os
+import sys
+
+from registry import get_index
+
+
+def _group(pairs):
+    groups = {}
+    for key, value in pairs:
+        groups.setdefault(key, []).append(value)
+    return {key: tuple(values) for key, values in groups.items()}
+
+
+class ModMorphSynthesizer:
+    def __init__(self, language, index=None, language_directory=None):
+        """
+        Морфологический синтез - построение словоформ по корню и последовательности грамматических значений.
+        Работает по индексу языковой модели в памяти (см. registry) с предвычисленными переходами
+        (предшественник, грамматическое значение) -> алломорфы, поэтому синтез не выполняет SQL-запросов.
+        Правила сборки словоформы те же, что у анализатора: основа корня с усечением по морфонологическому типу,
+        первый аффикс с соединительными символами морфотактики, частица, послелог и вспомогательный глагол -
+        отдельным словом. Слово с частицей завершает словоформу: после аффиксов частицы не присоединяются
+        другие частицы, послелоги и вспомогательные глаголы; послелог или вспомогательный глагол не строится,
+        если его начало совпадает с частицей, допустимой в этом месте (анализатор разбирает такое слово
+        только как частицу), поэтому анализатор разбирает построенные словоформы обратно.
+        :param language: код языка модели
+        :param index: готовый ModMorphIndex (None - общий индекс процесса из registry)
+        :param language_directory: папка с файлами моделей (None - config.LANGUAGE_DIRECTORY)
+        """
+        index = index if index is not None else get_index(language, language_directory)
+        self.__allomorphs = index.allomorphs
+        self.__particles = index.particles
+        roots = sorted((root for root in index.roots.records() if root["type_id"] is not None),
+                       key=lambda root: root["id"])
+        self.__roots = {root["id"]: root for root in roots}
+        self.__roots_by_value = _group((root["value_lower"], root) for root in roots)
+        self.__roots_by_concept = _group((root["concept_id"], root) for root in roots)
+        self.__gram_value_ids = {}
+        for records in (index.allomorphs.values(), index.particles.values(),
+                        (row for rows in index.adpositions.values() for row in rows),
+                        (row for rows in index.auxilary_verbs.values() for row in rows)):
+            for record in records:
+                self.__gram_value_ids.setdefault(record["gram_value"], record["gram_value_id"])
+        allomorph_gram = {id: allomorph["gram_value_id"] for id, allomorph in index.allomorphs.items()}
+        particle_gram = {id: particle["gram_value_id"] for id, particle in index.particles.items()}
+        self.__type_allomorphs = _group(
+            ((type_id, allomorph_gram[allomorph_id]), (allomorph_id, link_chars or ""))
+            for type_id, links in index.type_allomorphs.items() for allomorph_id, link_chars in links
+            if allomorph_id in allomorph_gram)
+        self.__allomorph_allomorphs = _group(
+            ((allomorph1_id, allomorph_gram[allomorph2_id]), allomorph2_id)
+            for allomorph1_id, allomorph2_ids in index.allomorph_allomorphs.items() for allomorph2_id in allomorph2_ids
+            if allomorph2_id in allomorph_gram)
+        self.__particle_allomorphs = _group(
+            ((particle_id, allomorph_gram[allomorph_id]), allomorph_id)
+            for particle_id, allomorph_ids in index.particle_allomorphs.items() for allomorph_id in allomorph_ids
+            if allomorph_id in allomorph_gram)
+        self.__type_particles = _group(
+            ((type_id, particle_gram[particle_id]), particle_id)
+            for type_id, particle_ids in index.type_particles.items() for particle_id in particle_ids
+            if particle_id in particle_gram)
+        self.__allomorph_particles = _group(
+            ((allomorph_id, particle_gram[particle_id]), particle_id)
+            for allomorph_id, particle_ids in index.allomorph_particles.items() for particle_id in particle_ids
+            if particle_id in particle_gram)
+        # Значения всех частиц, допустимых после типа корня и после алломорфа
+        self.__type_particle_values = {
+            type_id: frozenset(index.particles[particle_id]["value"] for particle_id in particle_ids
+                               if particle_id in index.particles)
+            for type_id, particle_ids in index.type_particles.items()}
+        self.__allomorph_particle_values = {
+            allomorph_id: frozenset(index.particles[particle_id]["value"] for particle_id in particle_ids
+                                    if particle_id in index.particles)
+            for allomorph_id, particle_ids in index.allomorph_particles.items()}
+        self.__adpositions = _group(
+            (row["gram_value_id"], row["value"]) for rows in index.adpositions.values() for row in rows)
+        self.__auxilary_verbs = _group(
+            (row["gram_value_id"], row["value"]) for rows in index.auxilary_verbs.values() for row in rows)
+        self.__type_children = _group(
+            (type_id, (allomorph_id, link_chars or ""))
+            for type_id, links in index.type_allomorphs.items() for allomorph_id, link_chars in links
+            if allomorph_id in allomorph_gram)
+        self.__allomorph_children = {
+            allomorph1_id: tuple(allomorph2_id for allomorph2_id in allomorph2_ids if allomorph2_id in allomorph_gram)
+            for allomorph1_id, allomorph2_ids in index.allomorph_allomorphs.items()}
+        self.__type_suffixes = {}
+
+    def get_roots(self, root):
+        """
+        :param root: запись корня (словарь с id), id корня или значение корня в нижнем регистре
+        :return: кортеж записей корней (для значения - все омонимичные корни)
+        """
+        if isinstance(root, dict):
+            root = root["id"]
+        if isinstance(root, str):
+            return self.__roots_by_value.get(root, ())
+        found = self.__roots.get(root)
+        return (found, ) if found is not None else ()
+
+    def get_gram_value_id(self, gram_value):
+        """
+        :param gram_value: тег грамматического значения (например, "PL") или его id
+        :return: id грамматического значения
+        """
+        if isinstance(gram_value, str):
+            gram_value_id = self.__gram_value_ids.get(gram_value)
+            if gram_value_id is None:
+                raise ValueError(f"Unknown gram value: {gram_value}")
+            return gram_value_id
+        return gram_value
+
+    def synthesize(self, root, gram_values):
+        """
+        Строит словоформы корня с заданной последовательностью грамматических значений
+        :param root: запись корня, id корня или значение корня (см. get_roots)
+        :param gram_values: последовательность тегов или id грамматических значений
+        :return: список различных словоформ в порядке построения (пустой, если последовательность недопустима)
+        """
+        gram_value_ids = [self.get_gram_value_id(gram_value) for gram_value in gram_values]
+        forms = {}
+        for record in self.get_roots(root):
+            for form in self.__synthesize_root(record, gram_value_ids):
+                forms.setdefault(form)
+        return list(forms)
+
+    def synthesize_concept(self, concept_id, gram_values):
+        """
+        Строит словоформы всех корней понятия с заданной последовательностью грамматических значений
+        :return: список различных словоформ (см. synthesize)
+        """
+        gram_value_ids = [self.get_gram_value_id(gram_value) for gram_value in gram_values]
+        forms = {}
+        for record in self.__roots_by_concept.get(concept_id, ()):
+            for form in self.__synthesize_root(record, gram_value_ids):
+                forms.setdefault(form)
+        return list(forms)
+
+    def __synthesize_root(self, root, gram_value_ids):
+        value = root["value_lower"]
+        stem = value[:len(value) - root["strip"]]
+        # Состояние: (словоформа, вид последнего элемента, id последнего элемента). Вид "particle_allomorph" -
+        # аффикс слова с частицей, после него допустимы только следующие аффиксы
+        states = [(value, "root", root["type_id"])]
+        for gram_value_id in gram_value_ids:
+            next_states = []
+            for form, kind, id in states:
+                if kind == "root":
+                    for allomorph_id, link_chars in self.__type_allomorphs.get((id, gram_value_id), ()):
+                        next_states.append(
+                            (stem + link_chars + self.__allomorphs[allomorph_id]["value"], "allomorph", allomorph_id))
+                    for particle_id in self.__type_particles.get((id, gram_value_id), ()):
+                        next_states.append(
+                            (form + " " + self.__particles[particle_id]["value_lower"], "particle", particle_id))
+                elif kind == "allomorph" or kind == "particle_allomorph":
+                    for allomorph_id in self.__allomorph_allomorphs.get((id, gram_value_id), ()):
+                        next_states.append((form + self.__allomorphs[allomorph_id]["value"], kind, allomorph_id))
+                    if kind == "allomorph" and self.__allomorphs[id]["is_final"]:
+                        for particle_id in self.__allomorph_particles.get((id, gram_value_id), ()):
+                            next_states.append(
+                                (form + " " + self.__particles[particle_id]["value_lower"], "particle", particle_id))
+                elif kind == "particle":
+                    for allomorph_id in self.__particle_allomorphs.get((id, gram_value_id), ()):
+                        next_states.append(
+                            (form + self.__allomorphs[allomorph_id]["value"], "particle_allomorph", allomorph_id))
+                if kind == "root" or kind == "allomorph" and self.__allomorphs[id]["is_final"]:
+                    if kind == "root":
+                        particle_values = self.__type_particle_values.get(id, frozenset())
+                    else:
+                        particle_values = self.__allomorph_particle_values.get(id, frozenset())
+                    for word in self.__adpositions.get(gram_value_id, ()) + \
+                            self.__auxilary_verbs.get(gram_value_id, ()):
+                        if not any(word[:i] in particle_values for i in range(1, len(word) + 1)):
+                            next_states.append((form + " " + word, "word", None))
+            states = next_states
+            if not states:
+                return []
+        return [form for form, kind, id in states
+                if kind not in ("allomorph", "particle_allomorph") or self.__allomorphs[id]["is_final"]]
+
+    def inflections(self, root, max_affixes=2):
+        """
+        Перечисляет все однословные формы корня с цепочками до max_affixes аффиксов
+        :param root: запись корня, id корня или значение корня (см. get_roots)
+        :param max_affixes: максимальная длина цепочки аффиксов
+        :return: генератор пар (словоформа, кортеж тегов грамматических значений); первая пара - сам корень
+        """
+        for record in self.get_roots(root):
+            value = record["value_lower"]
+            stem = value[:len(value) - record["strip"]]
+            yield value, ()
+            for suffix, gram_values in self.__get_type_suffixes(record["type_id"], max_affixes):
+                yield stem + suffix, gram_values
+
+    def expand(self, roots, max_affixes=2):
+        """
+        Пакетное построение всех однословных форм набора корней (например, терминов эталонного ответа).
+        Цепочки аффиксов зависят только от морфонологического типа корня и строятся один раз на тип.
+        :param roots: итерируемый набор корней - записей, id или значений (см. get_roots)
+        :return: словарь id корня -> список различных словоформ (для значения - по каждому омонимичному корню)
+        """
+        forms = {}
+        for root in roots:
+            for record in self.get_roots(root):
+                forms[record["id"]] = list(dict.fromkeys(form for form, _ in self.inflections(record, max_affixes)))
+        return forms
+
+    def __get_type_suffixes(self, type_id, max_affixes):
+        key = (type_id, max_affixes)
+        suffixes = self.__type_suffixes.get(key)
+        if suffixes is not None:
+            return suffixes
+        suffixes = []
+        # Обход в глубину в порядке морфотактики: (окончание, id алломорфа, теги, число аффиксов)
+        stack = [(link_chars + self.__allomorphs[allomorph_id]["value"], allomorph_id,
+                  (self.__allomorphs[allomorph_id]["gram_value"], ), 1)
+                 for allomorph_id, link_chars in reversed(self.__type_children.get(type_id, ()))]
+        while stack:
+            suffix, allomorph_id, gram_values, depth = stack.pop()
+            if self.__allomorphs[allomorph_id]["is_final"]:
+                suffixes.append((suffix, gram_values))
+            if depth == max_affixes:
+                continue
+            for allomorph2_id in reversed(self.__allomorph_children.get(allomorph_id, ())):
+                allomorph2 = self.__allomorphs[allomorph2_id]
+                stack.append((suffix + allomorph2["value"], allomorph2_id,
+                              gram_values + (allomorph2["gram_value"], ), depth + 1))
+        self.__type_suffixes[key] = suffixes = tuple(suffixes)
+        return suffixes
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        program_name = os.path.relpath(sys.argv[0])
+        print(f"Usage: {program_name} language root [gram_value ...]")
+        exit()
+    synthesizer = ModMorphSynthesizer(sys.argv[1])
+    if len(sys.argv) > 3:
+        for form in synthesizer.synthesize(sys.argv[2], sys.argv[3:]):
+            print(form)
+    else:
+        for form, gram_values in synthesizer.inflections(sys.argv[2]):
+            print(f"{form} : {'+'.join(gram_values)}")
@@ -0,0 +1,47 @@
+# Turkic Morpheme Model Library: Morph Analyzer Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import pytest
+
+from analyzer import ModMorphAnalyzer
+
+# Слова, у которых разные ветви разбора приходят к одному состоянию остатка слова
+WORDS = ["торган", "чыккан", "булган", "барлыкка", "астында"]
+
+
+@pytest.fixture(scope="module")
+def morph_analyzer():
+    with ModMorphAnalyzer("TAT", indexed=True) as morph_analyzer:
+        yield morph_analyzer
+
+
+def children_lists(processing_result):
+    for node in processing_result:
+        yield node[-1]
+        yield from children_lists(node[-1])
+
+
+@pytest.mark.parametrize("word", WORDS)
+def test_branches_do_not_share_children(morph_analyzer, word):
+    (_, processing_result), = morph_analyzer.process_words([word])
+    lists = [processing_result] + list(children_lists(processing_result))
+    assert len({id(children) for children in lists}) == len(lists)
+
+
+@pytest.mark.parametrize("word", WORDS)
+def test_mutating_one_branch_keeps_the_others(morph_analyzer, word):
+    (_, processing_result), = morph_analyzer.process_words([word])
+    (_, expected), = morph_analyzer.process_words([word])
+    lists = [children for children in children_lists(processing_result) if len(children) > 0]
+    equal = [(first, second) for i, first in enumerate(lists) for second in lists[i + 1:] if first == second]
+    assert len(equal) > 0
+    first, second = equal[0]
+    copy = list(second)
+    first.clear()
+    assert second == copy
+    first.extend(copy)
+    assert processing_result == expected
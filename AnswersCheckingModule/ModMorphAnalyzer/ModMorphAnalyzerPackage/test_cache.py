@@ -0,0 +1,93 @@
+# Turkic Morpheme Model Library: Analysis Cache Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import pytest
+
+from analyzer import ModMorphAnalyzer
+from cache import ENTRY_SIZE, NODE_SIZE, AnalysisCache, freeze
+
+VALUE = ([(1, "китап", [])], False)
+VALUE_SIZE = ENTRY_SIZE + NODE_SIZE * freeze(VALUE)[1]
+
+
+def thaw(value):
+    # Закэшированные деревья - вложенные кортежи, без кэша - кортежи со списками дочерних узлов
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+def test_freeze_counts_nodes():
+    assert freeze(VALUE) == ((((1, "китап", ()), ), False), 4)
+    assert freeze("китап") == ("китап", 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnalysisCache(2)
+    cache.put(("a", None), VALUE)
+    cache.put(("b", None), VALUE)
+    assert cache.get(("a", None)) is not None
+    cache.put(("c", None), VALUE)
+    assert cache.get(("b", None)) is None
+    assert cache.get(("a", None)) is not None and cache.get(("c", None)) is not None
+    assert cache.stats() == {"entries": 2, "memory": 2 * VALUE_SIZE, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_memory_limit_evicts_oldest_entries():
+    cache = AnalysisCache(100, max_memory=2 * VALUE_SIZE)
+    for word in ("a", "b", "c"):
+        cache.put((word, None), VALUE)
+    assert cache.get(("a", None)) is None
+    assert cache.stats()["entries"] == 2 and cache.stats()["memory"] == 2 * VALUE_SIZE
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entry_over_memory_limit_is_not_kept():
+    cache = AnalysisCache(100, max_memory=VALUE_SIZE - 1)
+    assert cache.put(("a", None), VALUE) == freeze(VALUE)[0]
+    assert len(cache) == 0 and cache.stats()["memory"] == 0
+
+
+def test_replaced_entry_releases_its_memory():
+    cache = AnalysisCache(100)
+    cache.put(("a", None), VALUE)
+    cache.put(("a", None), ([], False))
+    assert cache.get(("a", None)) == ((), False)
+    assert cache.stats()["memory"] == ENTRY_SIZE + NODE_SIZE * 2
+
+
+def test_cached_values_are_shared_and_immutable():
+    cache = AnalysisCache(100)
+    stored = cache.put(("a", None), VALUE)
+    assert cache.get(("a", None)) is stored
+    assert stored == freeze(VALUE)[0]
+
+
+@pytest.mark.parametrize("analyzer_options", [
+    {"cache_size": 50},
+    {"cache_size": 100000, "cache_memory_limit": 64 * 1024},
+    {"cache_size": 50, "compact": True},
+])
+def test_bounded_cache_matches_uncached_analysis(sample_texts, analyzer_options):
+    compact = analyzer_options.get("compact", False)
+    with ModMorphAnalyzer("TAT", indexed=True, compact=compact) as morph_analyzer:
+        expected = [thaw(list(morph_analyzer.process_text(text))) for text in sample_texts]
+    with ModMorphAnalyzer("TAT", indexed=True, **analyzer_options) as morph_analyzer:
+        for _ in range(2):
+            assert [thaw(list(morph_analyzer.process_text(text))) for text in sample_texts] == expected
+        stats = morph_analyzer.cache_stats()
+    assert stats["hits"] > 0 and stats["evictions"] > 0
+    assert stats["entries"] <= analyzer_options["cache_size"]
+    assert stats["memory"] <= analyzer_options.get("cache_memory_limit", stats["memory"])
+
+
+def test_cache_ignores_next_word_that_cannot_be_processed():
+    with ModMorphAnalyzer("TAT", indexed=True, cache_size=100000) as morph_analyzer:
+        list(morph_analyzer.process_words(["китап", "укыйм"]))
+        list(morph_analyzer.process_words(["китап", "язам"]))
+        stats = morph_analyzer.cache_stats()
+    assert stats["hits"] == 1
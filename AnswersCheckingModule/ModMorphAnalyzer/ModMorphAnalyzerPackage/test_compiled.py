@@ -0,0 +1,94 @@
+# Turkic Morpheme Model Library: Compiled Language Model Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import compiled
+from analyzer import ModMorphAnalyzer
+from compiled import CompiledAnalyzer, compile_language, compiled_file_path, load_compiled
+from modmorph import language_file_path
+
+
+@pytest.fixture(scope="module")
+def compiled_path(tmp_path_factory):
+    return compile_language("TAT", str(tmp_path_factory.mktemp("compiled") / "modmorph_TAT.mmfst"))
+
+
+@pytest.fixture
+def language_directory(tmp_path, compiled_path):
+    # Копия файла модели со скомпилированной из неё моделью
+    shutil.copy(language_file_path("TAT"), tmp_path)
+    shutil.copy(compiled_path, compiled_file_path("TAT", str(tmp_path)))
+    return str(tmp_path)
+
+
+def change_build(language_path):
+    # Изменение содержимого без изменения размера файла
+    connection = sqlite3.connect(language_path)
+    try:
+        connection.execute('UPDATE "metadata" SET "build" = "build" + 1')
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def append_bytes(language_path):
+    with open(language_path, "ab") as language_file:
+        language_file.write(b"\0" * 4096)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_compiled_matches_indexed_analysis(sample_words, compiled_path, compact):
+    with CompiledAnalyzer(compiled_path, compact=compact) as compiled_analyzer, \
+            ModMorphAnalyzer("TAT", indexed=True, compact=compact) as morph_analyzer:
+        for words in sample_words:
+            assert list(compiled_analyzer.process_words(words)) == list(morph_analyzer.process_words(words))
+
+
+def test_source_language_file_is_accepted(language_directory):
+    language_path = language_file_path("TAT", language_directory)
+    with CompiledAnalyzer(compiled_file_path("TAT", language_directory), language_file=language_path) as analyzer:
+        assert analyzer.get_metadata()["language"] == "LANGUAGE_TATAR"
+
+
+@pytest.mark.parametrize("change", [change_build, append_bytes])
+def test_changed_language_file_is_rejected(language_directory, change):
+    language_path = language_file_path("TAT", language_directory)
+    change(language_path)
+    with pytest.raises(ValueError, match="out of date"):
+        CompiledAnalyzer(compiled_file_path("TAT", language_directory), language_file=language_path)
+
+
+def test_unsupported_file_is_rejected(tmp_path):
+    file_path = tmp_path / "modmorph_TAT.mmfst"
+    file_path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError, match="Unsupported"):
+        CompiledAnalyzer(str(file_path))
+
+
+def test_load_compiled_reuses_up_to_date_model(language_directory, monkeypatch):
+    def compile_not_expected(*args, **kwargs):
+        raise AssertionError("compile_language called for an up-to-date model")
+
+    monkeypatch.setattr(compiled, "compile_language", compile_not_expected)
+    with load_compiled("TAT", language_directory=language_directory) as compiled_analyzer:
+        assert compiled_analyzer.get_metadata()["language"] == "LANGUAGE_TATAR"
+
+
+def test_load_compiled_rebuilds_stale_model(language_directory, compiled_path):
+    language_path = language_file_path("TAT", language_directory)
+    change_build(language_path)
+    with CompiledAnalyzer(compiled_path) as compiled_analyzer:
+        build = compiled_analyzer.get_metadata()["build"]
+    with load_compiled("TAT", language_directory=language_directory) as compiled_analyzer:
+        assert compiled_analyzer.get_metadata()["build"] == build + 1
+    # Пересобранная модель принимается для изменённого файла
+    CompiledAnalyzer(compiled_file_path("TAT", language_directory), language_file=language_path).close()
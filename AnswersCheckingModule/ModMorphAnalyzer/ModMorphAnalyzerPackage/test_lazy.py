@@ -0,0 +1,87 @@
+# Turkic Morpheme Model Library: Lazy Analysis Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import pytest
+
+import analyzer
+from analyzer import ModMorphAnalyzer
+
+WORD = "кешеләрнең"
+
+
+def leaves(processing_result, parse=()):
+    # Пути от корня до листьев дерева process_words в порядке обхода в глубину
+    for node in processing_result:
+        node_parse = parse + (tuple(node[:-1]), )
+        if len(node[-1]) == 0:
+            yield node_parse
+        else:
+            yield from leaves(node[-1], node_parse)
+
+
+def query_count(morph_analyzer):
+    return sum(call["count"] for name, call in morph_analyzer.stats()["calls"].items() if name.startswith("ModMorph."))
+
+
+@pytest.fixture
+def morph_analyzer():
+    with ModMorphAnalyzer("TAT", indexed=True, instrument=True) as morph_analyzer:
+        yield morph_analyzer
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Управляемое время для проверки time_budget
+    now = [0.0]
+    monkeypatch.setattr(analyzer.time, "perf_counter", lambda: now[0])
+    return now
+
+
+def test_unbounded_parses_match_tree_leaves(sample_words):
+    with ModMorphAnalyzer("TAT", indexed=True) as morph_analyzer:
+        for words in sample_words:
+            expected = [(word, list(leaves(result)) if result is not None else None)
+                        for word, result in morph_analyzer.process_words(words)]
+            assert list(morph_analyzer.process_words_lazy(words)) == expected
+
+
+def test_first_parse_stops_search_early(morph_analyzer):
+    all_parses = list(morph_analyzer.iter_parses(WORD))
+    full_queries = query_count(morph_analyzer)
+    assert len(all_parses) > 1
+    morph_analyzer.reset_stats()
+    parses = morph_analyzer.iter_parses(WORD)
+    assert next(parses) == all_parses[0]
+    parses.close()
+    assert query_count(morph_analyzer) < full_queries
+    morph_analyzer.reset_stats()
+    assert list(morph_analyzer.iter_parses(WORD, max_parses=1)) == all_parses[:1]
+    assert query_count(morph_analyzer) < full_queries
+
+
+def test_max_depth_prunes_long_parses(morph_analyzer):
+    all_parses = [parse for parse, _ in morph_analyzer.iter_parses(WORD)]
+    parses = [parse for parse, _ in morph_analyzer.iter_parses(WORD, max_depth=1)]
+    assert parses == [parse for parse in all_parses if len(parse) - 1 <= 1]
+    assert len(parses) < len(all_parses)
+
+
+def test_time_budget_stops_generation(morph_analyzer, clock):
+    all_parses = list(morph_analyzer.iter_parses(WORD, time_budget=1.0))
+    assert len(all_parses) > 1
+    parses = morph_analyzer.iter_parses(WORD, time_budget=1.0)
+    assert next(parses) == all_parses[0]
+    clock[0] = 2.0
+    assert list(parses) == []
+
+
+def test_expired_budget_keeps_word_without_next_word(morph_analyzer, clock):
+    # Без построенных разборов следующее слово не объединяется со словом
+    assert list(morph_analyzer.process_words_lazy(["кешеләр", "белән"], time_budget=-1.0)) == \
+        [("кешеләр", None), ("белән", None)]
+    merged = list(morph_analyzer.process_words_lazy(["кешеләр", "белән"], time_budget=1.0))
+    assert [word for word, _ in merged] == ["кешеләр белән"]
@@ -0,0 +1,90 @@
+# Turkic Morpheme Model Library: Lemmatization Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import pytest
+
+from analyzer import ModMorphAnalyzer
+from scoring import lemmatize_sentences, split_sentences
+
+PAIRS = [("кешеләр", "белән"), ("ягыннан", "да"), ("китапны", "да"), ("китап", "укыйм")]
+
+
+def root_values(processing_result):
+    # Различные значения корней в порядке дерева морфоанализа
+    if processing_result is None:
+        return None
+    return tuple(dict.fromkeys(root[1] for root in processing_result))
+
+
+def leaves(processing_result):
+    # Листья дерева морфоанализа
+    for node in processing_result:
+        if len(node[-1]) == 0:
+            yield node
+        else:
+            yield from leaves(node[-1])
+
+
+def query_count(morph_analyzer):
+    return sum(call["count"] for name, call in morph_analyzer.stats()["calls"].items() if name.startswith("ModMorph."))
+
+
+@pytest.fixture
+def morph_analyzer():
+    with ModMorphAnalyzer("TAT", indexed=True, instrument=True) as morph_analyzer:
+        yield morph_analyzer
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_lemma_sets_match_full_analysis(sample_words, indexed):
+    with ModMorphAnalyzer("TAT", indexed=indexed) as morph_analyzer:
+        for words in sample_words:
+            expected = [(word, frozenset(result[1] for result in results) if results is not None else None)
+                        for word, results in morph_analyzer.process_words(words)]
+            assert list(morph_analyzer.lemmatize_words(words)) == expected
+
+
+def test_root_is_accepted_at_first_parse(morph_analyzer):
+    # У слова несколько разборов с корнем "кеше" - лемматизации достаточно первого найденного
+    (_, processing_result), = morph_analyzer.process_words(["кешеләрнең"])
+    full_queries = query_count(morph_analyzer)
+    assert len(list(leaves(processing_result))) > 1
+    morph_analyzer.reset_stats()
+    assert list(morph_analyzer.lemmatize_words(["кешеләрнең"])) == [("кешеләрнең", frozenset(["кеше"]))]
+    assert query_count(morph_analyzer) < full_queries
+
+
+def test_repeated_pairs_are_lemmatized_once(morph_analyzer):
+    words = ["китап", "укыйм", "китап", "язам", "китап"]
+    lemmas = list(morph_analyzer.lemmatize_words(words))
+    assert [word for word, _ in lemmas] == words
+    assert lemmas[0][1] == lemmas[2][1] == lemmas[4][1] == frozenset(["китап"])
+    # Следующие слова "укыйм" и "язам" не обрабатываются, поэтому пара ("китап", None) лемматизируется один раз
+    assert morph_analyzer.stats()["counters"]["words"] == 3
+
+
+def test_next_word_is_merged_like_process_words(morph_analyzer):
+    for pair in PAIRS:
+        expected = [(word, frozenset(root_values(result)) if result is not None else None)
+                    for word, result in morph_analyzer.process_words(pair)]
+        assert list(morph_analyzer.lemmatize_words(pair)) == expected
+    assert [word for word, _ in morph_analyzer.lemmatize_words(PAIRS[0])] == ["кешеләр белән"]
+
+
+def test_lemmatized_documents_keep_tree_order(sample_texts):
+    with ModMorphAnalyzer("TAT", indexed=True) as morph_analyzer:
+        expected = [[(word, root_values(result)) for word, result in results]
+                    for results in morph_analyzer.process_documents(sample_texts)]
+        assert morph_analyzer.lemmatize_documents(sample_texts) == expected
+
+
+def test_lemmatized_sentences_keep_recognized_words(sample_texts):
+    sentences = [sentence for text in sample_texts for sentence in split_sentences(text)]
+    with ModMorphAnalyzer("TAT", indexed=True) as morph_analyzer:
+        expected = [[' '.join(root_values(result)) for _, result in results if result is not None]
+                    for results in morph_analyzer.process_documents(sentences)]
+        assert lemmatize_sentences(sentences, morph_analyzer) == expected
@@ -0,0 +1,50 @@
+# Turkic Morpheme Model Library: Word Vectors Model Store Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import errno
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import model_store
+from model_store import ModelStore
+
+SENTENCES = [["китап", "укы", "кеше"], ["кеше", "китап", "ал"], ["укы", "кеше", "китап"]] * 5
+HYPERPARAMETERS = {"vector_size": 8, "window": 2, "min_count": 1, "epochs": 2, "seed": 1, "workers": 1}
+
+
+def test_trained_vectors_are_reused(tmp_path):
+    store = ModelStore(str(tmp_path))
+    key, word_vectors = store.get_or_train(SENTENCES, **HYPERPARAMETERS)
+    assert store.get(key) is not None
+    assert os.listdir(tmp_path) == [key]
+    reused_key, reused_vectors = store.get_or_train(SENTENCES, **HYPERPARAMETERS)
+    assert reused_key == key
+    assert np.array_equal(reused_vectors.vectors, word_vectors.vectors)
+
+
+def test_model_saved_by_another_process_is_loaded(tmp_path, monkeypatch):
+    def replace_after_other_process(source, destination):
+        shutil.copytree(source, destination)
+        raise OSError(errno.ENOTEMPTY, os.strerror(errno.ENOTEMPTY), destination)
+
+    monkeypatch.setattr(model_store.os, "replace", replace_after_other_process)
+    key, word_vectors = ModelStore(str(tmp_path)).get_or_train(SENTENCES, **HYPERPARAMETERS)
+    assert word_vectors is not None
+    assert os.listdir(tmp_path) == [key]
+
+
+def test_save_failure_is_raised(tmp_path, monkeypatch):
+    def replace_without_permission(source, destination):
+        raise PermissionError(errno.EACCES, os.strerror(errno.EACCES), destination)
+
+    monkeypatch.setattr(model_store.os, "replace", replace_without_permission)
+    with pytest.raises(PermissionError):
+        ModelStore(str(tmp_path)).get_or_train(SENTENCES, **HYPERPARAMETERS)
+    assert os.listdir(tmp_path) == []
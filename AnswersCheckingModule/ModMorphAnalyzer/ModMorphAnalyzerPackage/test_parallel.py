@@ -0,0 +1,35 @@
+# Turkic Morpheme Model Library: Parallel Morph Analyzer Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import pytest
+
+from analyzer import ModMorphAnalyzer
+from parallel import ModMorphParallelAnalyzer
+
+TEXTS = ["китаплар белән", "кешеләрне күрдем", "өстәл өстендә китап да бар"] * 3
+
+
+@pytest.mark.parametrize("option", ["indexed", "load_mode"])
+def test_shared_model_rejects_model_loading_options(option):
+    with pytest.raises(ValueError, match=option):
+        ModMorphParallelAnalyzer("TAT", workers=1, **{option: None})
+
+
+@pytest.mark.parametrize("shared_model", [True, False])
+def test_persistent_cache_is_rejected(tmp_path, shared_model):
+    with pytest.raises(ValueError, match="persistent_cache"):
+        ModMorphParallelAnalyzer("TAT", workers=1, shared_model=shared_model,
+                                 persistent_cache=str(tmp_path / "cache.sqlite"))
+
+
+@pytest.mark.parametrize("shared_model, analyzer_options", [(True, {}), (False, {"indexed": True})])
+def test_parallel_results_match_process_documents(shared_model, analyzer_options):
+    with ModMorphAnalyzer("TAT", indexed=True) as morph_analyzer:
+        expected = morph_analyzer.process_documents(TEXTS)
+    with ModMorphParallelAnalyzer("TAT", workers=2, chunk_size=2, shared_model=shared_model,
+                                  **analyzer_options) as parallel_analyzer:
+        assert list(parallel_analyzer.process_texts(TEXTS)) == expected
@@ -0,0 +1,94 @@
+# Turkic Morpheme Model Library: Persistent Analysis Cache Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from alphabetter import ModMorphAlphabetter
+from analyzer import ModMorphAnalyzer
+from persistent_cache import PersistentAnalysisCache, prewarm
+
+METADATA = {"language": "LANGUAGE_TATAR", "version": 1, "build": 1}
+TEXT = "Кешеләр белән китапны да укыйм. Китаплар өстәлдә ята."
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache.sqlite")
+
+
+@pytest.fixture
+def frequency_list(tmp_path):
+    alphabetter = ModMorphAlphabetter("TAT")
+    path = tmp_path / "frequency.txt"
+    path.write_text("\n".join(sorted({alphabetter.lower(word) for word in alphabetter.tokenize(TEXT)})),
+                    encoding="utf-8")
+    return str(path)
+
+
+def test_entries_survive_reopen(cache_path):
+    cache = PersistentAnalysisCache(cache_path, METADATA)
+    cache.put("китап", None, ([(1, "китап")], False))
+    cache.put("китап", "да", ([(1, "китап")], True))
+    cache.close()
+    cache = PersistentAnalysisCache(cache_path, METADATA)
+    try:
+        assert cache.get("китап") == ([(1, "китап")], False)
+        assert cache.get("китап", "да") == ([(1, "китап")], True)
+        assert cache.get("кеше") is None
+        assert cache.stats() == {"entries": 2, "hits": 2, "misses": 1, "writes": 0}
+    finally:
+        cache.close()
+
+
+def test_stamp_change_clears_entries(cache_path):
+    cache = PersistentAnalysisCache(cache_path, METADATA)
+    cache.put("китап", None, ([(1, "китап")], False))
+    cache.close()
+    cache = PersistentAnalysisCache(cache_path, dict(METADATA, build=METADATA["build"] + 1))
+    try:
+        assert cache.get("китап") is None
+        assert cache.stats()["entries"] == 0
+    finally:
+        cache.close()
+
+
+def test_second_writer_is_rejected(cache_path):
+    cache = PersistentAnalysisCache(cache_path, METADATA)
+    try:
+        with pytest.raises(RuntimeError):
+            PersistentAnalysisCache(cache_path, METADATA)
+    finally:
+        cache.close()
+    PersistentAnalysisCache(cache_path, METADATA).close()
+
+
+def assert_prewarmed(cache_path):
+    with ModMorphAnalyzer("TAT", indexed=True) as morph_analyzer:
+        expected = list(morph_analyzer.process_text(TEXT))
+    with ModMorphAnalyzer("TAT", indexed=True, persistent_cache=cache_path) as morph_analyzer:
+        assert list(morph_analyzer.process_text(TEXT)) == expected
+        stats = morph_analyzer.persistent_cache_stats()
+    assert stats["hits"] > 0 and stats["writes"] == stats["misses"] < stats["hits"]
+
+
+def test_prewarmed_cache_is_hit_after_reopen(cache_path, frequency_list):
+    with ModMorphAnalyzer("TAT", indexed=True, persistent_cache=cache_path) as morph_analyzer:
+        assert prewarm(morph_analyzer, frequency_list, frequency_list=True) > 0
+        assert morph_analyzer.persistent_cache_stats()["entries"] > 0
+    assert_prewarmed(cache_path)
+
+
+def test_command_line_prewarm(cache_path, frequency_list):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "persistent_cache.py")
+    completed = subprocess.run([sys.executable, script, "TAT", cache_path, frequency_list, "--frequency-list"],
+                               cwd=os.path.dirname(script), capture_output=True, text=True, check=True)
+    assert completed.stdout.startswith("Processed ")
+    assert_prewarmed(cache_path)
@@ -0,0 +1,117 @@
+# Turkic Morpheme Model Library: Answer Scoring Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import numpy as np
+import pytest
+from gensim.models import KeyedVectors
+
+from scoring import cosine_scores, score_by_question, segment_means, sentence_vectors
+
+VECTOR_SIZE = 50
+
+
+@pytest.fixture(scope="module")
+def word_vectors():
+    random = np.random.default_rng(0)
+    word_vectors = KeyedVectors(VECTOR_SIZE)
+    word_vectors.add_vectors([f"w{i}" for i in range(200)], random.normal(size=(200, VECTOR_SIZE)).astype(np.float32))
+    return word_vectors
+
+
+@pytest.fixture(scope="module")
+def sentences():
+    random = np.random.default_rng(1)
+    # Слова вне словаря и предложения без известных слов дают нулевые векторы
+    sentences = [[f"w{i}" for i in random.integers(0, 260, size=random.integers(0, 30))] for _ in range(300)]
+    return sentences + [[], ["unknown"]]
+
+
+def reference_sentence_vectors(sentences, word_vectors):
+    result = []
+    for sentence in sentences:
+        known = [word_vectors[word] for word in sentence if word in word_vectors.key_to_index]
+        result.append(np.mean(known, axis=0) if known else np.zeros(word_vectors.vector_size))
+    return np.array(result)
+
+
+def reference_cosine_scores(reference_vectors, answer_vectors):
+    result = np.zeros((len(answer_vectors), len(reference_vectors)))
+    for i, answer in enumerate(answer_vectors):
+        for j, reference in enumerate(reference_vectors):
+            norms = np.linalg.norm(answer) * np.linalg.norm(reference)
+            result[i, j] = np.dot(answer, reference) / norms if norms != 0 else 0
+    return result
+
+
+def test_sentence_vectors_match_per_sentence_means(sentences, word_vectors):
+    vectors = sentence_vectors(sentences, word_vectors)
+    assert vectors.dtype == np.float32 and vectors.shape == (len(sentences), VECTOR_SIZE)
+    assert np.allclose(vectors, reference_sentence_vectors(sentences, word_vectors), atol=1e-6)
+    assert not vectors[-2:].any()
+
+
+def test_segment_means_skip_sentences_without_words():
+    vectors = np.arange(12, dtype=np.float32).reshape(4, 3)
+    means = segment_means(vectors, [0, 1, 3, 2], [1, 1, 3, 3], 5)
+    assert np.allclose(means, [[0, 0, 0], [1.5, 2.5, 3.5], [0, 0, 0], [7.5, 8.5, 9.5], [0, 0, 0]])
+    assert not segment_means(vectors, [], [], 2).any()
+
+
+def test_cosine_scores_match_pairwise_loop(sentences, word_vectors):
+    vectors = sentence_vectors(sentences, word_vectors)
+    references, answers = vectors[:40], vectors[40:]
+    scores = cosine_scores(references, answers)
+    assert scores.shape == (len(answers), len(references))
+    assert np.allclose(scores, reference_cosine_scores(references, answers), atol=1e-6)
+    assert np.allclose(cosine_scores(references[0], answers), scores[:, :1])
+
+
+def reference_score_by_question(reference_vectors, reference_question_ids, answer_vectors, answer_question_ids,
+                                top_k):
+    top_references = np.full((len(answer_vectors), top_k), -1)
+    top_scores = np.full((len(answer_vectors), top_k), np.nan)
+    for i, (answer, question_id) in enumerate(zip(answer_vectors, answer_question_ids)):
+        references = [j for j, reference_question_id in enumerate(reference_question_ids)
+                      if reference_question_id == question_id]
+        scores = reference_cosine_scores(reference_vectors[references], answer[None, :])[0]
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        top_references[i, :len(order)] = np.array(references)[order]
+        top_scores[i, :len(order)] = scores[order]
+    return top_scores[:, 0], top_references, top_scores
+
+
+@pytest.mark.parametrize("top_k, max_chunk_bytes", [(1, 64 * 1024 * 1024), (3, 64 * 1024 * 1024), (3, 64)])
+def test_score_by_question_matches_per_answer_loop(sentences, word_vectors, top_k, max_chunk_bytes):
+    vectors = sentence_vectors(sentences, word_vectors)
+    references, answers = vectors[:40], vectors[40:]
+    # Вопрос "d" без эталонов, вопрос "e" без ответов, у вопроса "c" эталонов меньше top_k
+    reference_question_ids = ["a"] * 20 + ["b"] * 17 + ["c"] * 2 + ["e"]
+    answer_question_ids = [["a", "b", "c", "d"][i % 4] for i in range(len(answers))]
+    scores, top_references, top_scores = score_by_question(references, reference_question_ids, answers,
+                                                           answer_question_ids, top_k, max_chunk_bytes)
+    expected_scores, expected_references, expected_top_scores = reference_score_by_question(
+        references, reference_question_ids, answers, answer_question_ids, top_k)
+    assert np.allclose(scores, expected_scores, atol=1e-6, equal_nan=True)
+    assert np.allclose(top_scores, expected_top_scores, atol=1e-6, equal_nan=True)
+    # Номера эталонов сравниваются там, где близости различимы
+    distinct = np.abs(np.diff(np.nan_to_num(expected_top_scores, nan=-2), axis=1)).min(axis=1, initial=1) > 1e-5
+    assert np.array_equal(top_references[distinct], expected_references[distinct])
+
+
+def test_question_without_references_gets_no_score():
+    references = np.eye(3, dtype=np.float32)
+    answers = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+    scores, top_references, top_scores = score_by_question(references, [1, 1, 2], answers, [1, 3, 2], top_k=2)
+    assert np.allclose(scores, [1, np.nan, 1], equal_nan=True)
+    assert top_references.tolist() == [[0, 1], [-1, -1], [2, -1]]
+    assert np.allclose(top_scores, [[1, 0], [np.nan, np.nan], [1, np.nan]], equal_nan=True)
+
+
+def test_score_by_question_without_references():
+    scores, top_references, top_scores = score_by_question(np.zeros((0, 3)), [], np.ones((2, 3)), [1, 2])
+    assert np.isnan(scores).all() and np.isnan(top_scores).all()
+    assert top_references.tolist() == [[-1], [-1]]
@@ -0,0 +1,31 @@
+# Turkic Morpheme Model Library: Answer Scoring Service Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from registry import check_analyzer_options
+from service import ScoringService
+
+
+@pytest.mark.parametrize("option", ["indexed", "load_mode", "modmorph", "persistent_cache"])
+def test_pooled_analyzers_reject_unsupported_options(option):
+    with pytest.raises(ValueError, match=option):
+        check_analyzer_options({option: None})
+
+
+def test_service_rejects_persistent_cache(tmp_path):
+    with pytest.raises(ValueError, match="persistent_cache"):
+        ScoringService("TAT", None, workers=2, persistent_cache=str(tmp_path / "cache.sqlite"))
+
+
+def test_service_analyzes_from_other_threads():
+    with ScoringService("TAT", None, workers=2, cache_size=1000) as service, ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(service.process_text, ["китаплар белән"] * 8))
+    assert results[0][0][0] == "китаплар белән"
+    assert results.count(results[0]) == len(results)
@@ -0,0 +1,87 @@
+# Turkic Morpheme Model Library: Morph Synthesizer Tests
+#
+# Copyright (C) 2021-present ModMorph Project
+# Author: Nikolai Prokopyev <nikolai.prokopyev@gmail.com>
+# URL: <http://modmorph.turklang.net>
+# For license information, see LICENSE.TXT
+
+import pytest
+
+from analyzer import ModMorphAnalyzer
+from registry import get_index
+from synthesizer import ModMorphSynthesizer
+
+
+@pytest.fixture(scope="module")
+def index():
+    return get_index("TAT")
+
+
+@pytest.fixture(scope="module")
+def synthesizer(index):
+    return ModMorphSynthesizer("TAT", index=index)
+
+
+@pytest.fixture(scope="module")
+def morph_analyzer(index):
+    with ModMorphAnalyzer("TAT", indexed=True) as morph_analyzer:
+        yield morph_analyzer
+
+
+def sample_roots(index, step=4000):
+    return sorted(root["id"] for root in index.roots.records() if root["type_id"] is not None)[::step]
+
+
+def next_word_gram_values(index):
+    # Грамматические значения частиц, послелогов и вспомогательных глаголов
+    rows = [row for rows in list(index.adpositions.values()) + list(index.auxilary_verbs.values()) for row in rows]
+    return sorted({particle["gram_value"] for particle in index.particles.values()} |
+                  {row["gram_value"] for row in rows})
+
+
+def particle_suffix_gram_values(index):
+    # Грамматические значения аффиксов, присоединяемых к частицам
+    return sorted({index.allomorphs[allomorph_id]["gram_value"]
+                   for allomorph_ids in index.particle_allomorphs.values() for allomorph_id in allomorph_ids
+                   if allomorph_id in index.allomorphs})
+
+
+def assert_parsed_back(morph_analyzer, root_id, form):
+    results = list(morph_analyzer.process_words(form.split(" ")))
+    assert [word for word, _ in results] == [form]
+    assert results[0][1] is not None and root_id in {root[0] for root in results[0][1]}, form
+
+
+def test_inflections_parse_back_to_their_root(index, synthesizer, morph_analyzer):
+    for root_id in sample_roots(index, step=1000):
+        for form, _ in synthesizer.inflections(root_id, max_affixes=2):
+            assert_parsed_back(morph_analyzer, root_id, form)
+
+
+def test_multiword_forms_parse_back_to_their_root(index, synthesizer, morph_analyzer):
+    next_word = next_word_gram_values(index)
+    particle_suffixes = particle_suffix_gram_values(index)
+    forms = 0
+    for root_id in sample_roots(index):
+        for _, gram_values in synthesizer.inflections(root_id, max_affixes=1):
+            for gram_value in next_word:
+                sequences = [list(gram_values) + [gram_value]]
+                sequences += [list(gram_values) + [gram_value, suffix] for suffix in particle_suffixes]
+                for sequence in sequences:
+                    for form in synthesizer.synthesize(root_id, sequence):
+                        assert_parsed_back(morph_analyzer, root_id, form)
+                        forms += 1
+    assert forms > 0
+
+
+def test_no_next_word_after_particle_suffixes(synthesizer):
+    assert synthesizer.synthesize("китап", ["NEG", "NMLZ"]) == ["китап түгеллек"]
+    assert synthesizer.synthesize("китап", ["NEG", "NMLZ", "LIM"]) == []
+
+
+def test_expand_accepts_root_records_ids_and_values(synthesizer):
+    roots = synthesizer.get_roots("китап")
+    expanded = synthesizer.expand(roots)
+    assert list(expanded) == [root["id"] for root in roots]
+    assert synthesizer.expand([roots[0]["id"]]) == synthesizer.expand(["китап"]) == expanded
+    assert expanded[roots[0]["id"]][0] == "китап"
@@ -5,7 +5,9 @@
 # URL: <http://modmorph.turklang.net>
 # For license information, see LICENSE.TXT
 
+import json
 import os
+import pathlib
 import sqlite3
 from io import StringIO
 
@@ -16,6 +18,10 @@ def remove_prefix(text, prefix):
     return text
 
 
+def json_list(values):
+    return json.dumps(list(values), ensure_ascii=False)
+
+
 def sqlite_connect_file_to_memory(file_path):
     conn = sqlite3.connect(file_path)
     tempfile = StringIO()
@@ -30,6 +36,31 @@ def sqlite_connect_file_to_memory(file_path):
     return conn_memory
 
 
+def sqlite_backup_file_to_memory(file_path):
+    conn = sqlite3.connect(sqlite_file_uri(file_path, read_only=True), uri=True)
+    conn_memory = sqlite3.connect(":memory:")
+    conn.backup(conn_memory)
+    conn.close()
+    return conn_memory
+
+
+def sqlite_connect_file_read_only(file_path, immutable=True, mmap_size=None):
+    conn = sqlite3.connect(sqlite_file_uri(file_path, read_only=True, immutable=immutable), uri=True)
+    if mmap_size is not None:
+        conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    return conn
+
+
+def sqlite_file_uri(file_path, read_only=False, immutable=False):
+    uri = pathlib.Path(file_path).absolute().as_uri()
+    params = []
+    if read_only:
+        params.append("mode=ro")
+    if immutable:
+        params.append("immutable=1")
+    return uri + ("?" + "&".join(params) if params else "")
+
+
 def sqlite_dump_connection_memory_to_file(conn, file_path):
     tempfile = StringIO()
     for line in conn.iterdump():